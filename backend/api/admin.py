@@ -4,7 +4,8 @@ Admin configuration for the API app.
 from django.contrib import admin
 from .models import (
     Profile, Module, ModuleProgress, Mission,
-    MissionProgress, Achievement, UserAchievement, Streak, LevelTitle
+    MissionProgress, Achievement, UserAchievement, Streak, LevelTitle,
+    UserProgressSummary, XPEvent, SlowQuery, Task
 )
 
 @admin.register(Profile)
@@ -61,3 +62,25 @@ class StreakAdmin(admin.ModelAdmin):
 class LevelTitleAdmin(admin.ModelAdmin):
     list_display = ['level', 'title']
     search_fields = ['title']
+
+@admin.register(UserProgressSummary)
+class UserProgressSummaryAdmin(admin.ModelAdmin):
+    list_display = ['user', 'modules_unlocked', 'missions_completed', 'achievements_earned', 'updated_at']
+    search_fields = ['user__username']
+
+@admin.register(XPEvent)
+class XPEventAdmin(admin.ModelAdmin):
+    list_display = ['user', 'source', 'reference', 'amount', 'created_at']
+    list_filter = ['source']
+    search_fields = ['user__username', 'reference']
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display = ['call_site', 'line', 'duration_ms', 'fingerprint', 'created_at']
+    search_fields = ['call_site', 'sql']
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ['key', 'function', 'state', 'attempts', 'run_after', 'created_at']
+    list_filter = ['state']
+    search_fields = ['key', 'last_error']
@@ -6,3 +6,8 @@ class ApiConfig(AppConfig):
 
     def ready(self):
         import api.models  # noqa
+        from api.utils import changes, metrics, slow_queries
+        metrics.instrument_serializers()
+        metrics.install()
+        slow_queries.install()
+        changes.install()
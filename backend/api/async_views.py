@@ -0,0 +1,193 @@
+"""
+Vistas async de lectura para el modo ASGI (uvicorn).
+
+Reemplazan a sus equivalentes de DRF en `api/urls.py` cuando
+`ASYNC_READ_VIEWS` está activo (lo activa `dividis/asgi.py`) y devuelven el
+mismo JSON. Las consultas de cada vista pasan por
+`api.utils.async_queries.gather`: en orden sobre la conexión del request, o en
+paralelo con `ASYNC_PARALLEL_QUERIES`.
+"""
+
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.http.response import HttpResponseBase
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_safe
+from rest_framework import status
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .models import MissionProgress, ModuleProgress, Streak, UserProgressSummary
+from .serializers import (
+    MissionProgressSerializer, ModuleProgressSerializer, ProgressOverviewSerializer, StreakSerializer
+)
+from .utils import events
+from .utils.async_queries import gather
+from .utils.catalog import get_catalog
+from .utils.mission_board import abuild_mission_board
+from .utils.serializers_helpers import overview_data
+from .wellness_survey.models import WellnessSurveySession
+from .wellness_survey.views import (
+    WellnessSurveyAnswerListCreateView, attempt_payload, attempt_rows, is_stale, parse_attempt_params
+)
+
+_jwt = JWTAuthentication()
+_renderer = JSONRenderer()
+
+
+def _render(data, status_code=status.HTTP_200_OK):
+    return HttpResponse(_renderer.render(data), status=status_code, content_type='application/json')
+
+
+async def _authenticate(request):
+    """JWT (como JWTAuthentication) o, sin header, la sesión de Django."""
+    header = _jwt.get_header(request)
+    if header is None:
+        user = await request.auser()
+        return user if user.is_authenticated else None
+    raw_token = _jwt.get_raw_token(header)
+    if raw_token is None:
+        return None
+    token = _jwt.get_validated_token(raw_token)
+    return await sync_to_async(_jwt.get_user)(token)
+
+
+def async_api_view(view=None, *, authenticate=_authenticate):
+    """Autenticación y manejo de errores equivalentes a una APIView de solo lectura."""
+    if view is None:
+        return lambda view: async_api_view(view, authenticate=authenticate)
+
+    @require_safe
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            user = await authenticate(request)
+            if user is None:
+                raise NotAuthenticated()
+            request.user = user
+            result = await view(request, *args, **kwargs)
+            return result if isinstance(result, HttpResponseBase) else _render(result)
+        except APIException as exc:
+            response = _render(exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail},
+                               exc.status_code)
+            if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+                response['WWW-Authenticate'] = _jwt.authenticate_header(request)
+            return response
+        except Http404 as exc:
+            return _render({'detail': str(exc) or 'Not found.'}, status.HTTP_404_NOT_FOUND)
+    return wrapper
+
+
+@async_api_view
+async def user_missions(request):
+    return await abuild_mission_board(request.user)
+
+
+@async_api_view
+async def progress_overview(request):
+    summary, catalog = await gather(
+        lambda: UserProgressSummary.for_user(request.user),
+        get_catalog,
+    )
+    title = catalog.level_title(summary.user.profile.current_level)
+    return ProgressOverviewSerializer(overview_data(summary, title)).data
+
+
+@async_api_view
+async def module_progress(request, module_id):
+    user = request.user
+    catalog, progress, missions, streak = await gather(
+        get_catalog,
+        lambda: ModuleProgress.objects.filter(user=user, module_id=module_id).select_related('module').first(),
+        lambda: list(MissionProgress.objects
+            .filter(user=user, mission__module_id=module_id)
+            .select_related('mission__module')),
+        lambda: Streak.objects.filter(user=user, module_id=module_id).select_related('module').first(),
+    )
+    module = catalog.module(module_id)
+    if module is None:
+        raise Http404('No Module matches the given query.')
+    return {
+        'progress': ModuleProgressSerializer(progress or ModuleProgress(user=user, module=module)).data,
+        'missions': MissionProgressSerializer(missions, many=True).data,
+        'streak': StreakSerializer(streak or Streak(user=user, module=module)).data
+    }
+
+
+@async_api_view
+async def _wellness_answers_list(request):
+    # El intento elegido decide qué filas leer, así que estas consultas van en orden
+    attempt, since = parse_attempt_params(request.GET)
+    attempts = WellnessSurveySession.objects.filter(user=request.user, is_completed=True)
+    if attempt is not None:
+        session = await attempts.filter(id=attempt).afirst()
+    else:
+        session = await attempts.order_by('-finished_at', '-id').afirst()
+        if is_stale(session, since):
+            session = None
+    if session is None:
+        return attempt_payload(None, [])
+    rows = [row async for row in attempt_rows(request.user, session)]
+    return attempt_payload(session, rows)
+
+
+_wellness_answers_sync = WellnessSurveyAnswerListCreateView.as_view()
+
+
+@csrf_exempt
+async def wellness_survey_answers(request):
+    """GET async; el POST (guardar respuestas) sigue en la vista de DRF."""
+    if request.method in ('GET', 'HEAD'):
+        return await _wellness_answers_list(request)
+    return await sync_to_async(_wellness_answers_sync)(request)
+
+
+async def _authenticate_stream(request):
+    """
+    EventSource no permite headers: el stream acepta en `?token=` el token de
+    `/api/events/token/`, que solo vale aquí y caduca en EVENTS_TOKEN_MAX_AGE
+    segundos. Nunca el JWT de acceso, que quedaría en los logs con la URL.
+    """
+    token = request.GET.get('token')
+    if token is None:
+        return await _authenticate(request)
+    user_id = events.read_stream_token(token)
+    if user_id is None:
+        raise AuthenticationFailed('Token de stream inválido o caducado.')
+    return await User.objects.filter(pk=user_id, is_active=True).afirst()
+
+
+async def _event_stream(user_id):
+    broker = events.get_broker()
+    subscription = broker.subscribe(user_id)
+    try:
+        yield f"retry: {settings.EVENTS_RETRY_MS}\n\n"
+        while True:
+            event = await subscription.get(settings.EVENTS_HEARTBEAT_SECONDS)
+            # El comentario mantiene viva la conexión a través de proxies
+            yield events.format_sse(event) if event else ": ping\n\n"
+    finally:
+        broker.unsubscribe(subscription)
+
+
+@async_api_view(authenticate=_authenticate_stream)
+async def events_stream(request):
+    """
+    Server-sent events del usuario: `module_unlocked`, `mission_completed` y
+    `xp_awarded`. Cada conexión ocupa una tarea del event loop, así que solo
+    se sirve bajo ASGI.
+    """
+    if not isinstance(request, ASGIRequest):
+        return _render({'detail': 'El stream de eventos requiere el servidor ASGI (uvicorn).'},
+                       status.HTTP_503_SERVICE_UNAVAILABLE)
+    response = StreamingHttpResponse(_event_stream(request.user.pk), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Nginx y similares no deben acumular la respuesta
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,62 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.models import Declaration, Mission, MissionProgress, Module, Streak, UnlockedPillar
+from api.utils.benchmarking import measure, rollback_after
+
+# Secuencia que hace el frontend al iniciar sesión
+LOGIN_SEQUENCE = ['me', 'progress-overview', 'module-list', 'user-missions', 'unlockedpillar-list']
+
+
+class Command(BaseCommand):
+    help = "Compara /bootstrap/ con la secuencia de cinco llamadas de la carga inicial del dashboard"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--declarations', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        if not Module.objects.exists():
+            raise CommandError("No hay módulos: carga antes los fixtures iniciales.")
+        with rollback_after():
+            user = self._seed(options['declarations'])
+            client = Client()
+            # JWT real: cada llamada autentica como en producción
+            headers = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(user)}'}
+            paths = [reverse(name) for name in LOGIN_SEQUENCE]
+            bootstrap = reverse('bootstrap')
+
+            def five_calls():
+                for path in paths:
+                    client.get(path, **headers)
+
+            sequence_queries, sequence_ms = measure(five_calls, options['repeat'])
+            bootstrap_queries, bootstrap_ms = measure(lambda: client.get(bootstrap, **headers), options['repeat'])
+
+        self.stdout.write(f"{'':<14} {'requests':>9} {'consultas':>10} {'ms':>9}")
+        self.stdout.write(f"{'cinco llamadas':<14} {len(paths):>9} {sequence_queries:>10} {sequence_ms:>9.1f}")
+        self.stdout.write(f"{'/bootstrap/':<14} {1:>9} {bootstrap_queries:>10} {bootstrap_ms:>9.1f}")
+
+    def _seed(self, declarations):
+        user = User.objects.create_user(username='bench-bootstrap', password='bench')
+        modules = list(Module.objects.order_by('order'))
+        MissionProgress.objects.bulk_create([
+            MissionProgress(user=user, mission=mission, state='completed' if i % 3 == 0 else 'active')
+            for i, mission in enumerate(Mission.objects.filter(module__isnull=False))
+        ])
+        Streak.objects.bulk_create([
+            Streak(user=user, module=module, current_streak=i % 5) for i, module in enumerate(modules)
+        ])
+        pillars = [choice[0] for choice in Declaration.PILLAR_CHOICES]
+        Declaration.objects.bulk_create([
+            Declaration(user=user, module=modules[i % len(modules)], pillar=pillars[i % len(pillars)],
+                        text=f'Declaración {i}')
+            for i in range(declarations)
+        ])
+        UnlockedPillar.objects.bulk_create([
+            UnlockedPillar(user=user, module=module, pillar=pillar) for module in modules[:3] for pillar in pillars
+        ])
+        return user
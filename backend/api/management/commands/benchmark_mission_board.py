@@ -0,0 +1,59 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from api.models import Mission, MissionProgress, Module, ModuleProgress
+from api.utils.benchmarking import measure, rollback_after
+from api.utils.mission_board import build_mission_board
+
+BENCH_MODULES = 9
+
+
+def _per_row_board(user):
+    """Recorrido anterior: una consulta de progreso y una de módulo por misión."""
+    for mission in Mission.objects.all():
+        MissionProgress.objects.filter(user=user, mission=mission).first()
+        if mission.module_id:
+            mission.module
+
+
+class Command(BaseCommand):
+    help = "Mide consultas y latencia de /user-missions/ con catálogos de distinto tamaño"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[50, 500, 5000])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'misiones':>9} {'consultas':>10} {'ms':>9} {'por fila':>10} {'ms':>9}")
+        for size in options['sizes']:
+            with rollback_after():
+                user = self._seed(size)
+                queries, ms = measure(lambda: build_mission_board(user), options['repeat'])
+                legacy_queries, legacy_ms = measure(lambda: _per_row_board(user), options['repeat'])
+            self.stdout.write(f"{size:>9} {queries:>10} {ms:>9.1f} {legacy_queries:>10} {legacy_ms:>9.1f}")
+
+    def _seed(self, size):
+        user = User.objects.create_user(username='bench-mission-board', password='bench')
+        modules = Module.objects.bulk_create([
+            Module(id=f'bench-{i}', name=f'Bench {i}', description='', icon='star', order=1000 + i)
+            for i in range(BENCH_MODULES)
+        ])
+        ModuleProgress.objects.bulk_create([
+            ModuleProgress(user=user, module=module, state='unlocked' if i % 2 == 0 else 'locked')
+            for i, module in enumerate(modules)
+        ])
+        frequencies = ['daily', 'weekly', None]
+        missions = Mission.objects.bulk_create([
+            Mission(
+                module=None if i % 10 == 0 else modules[i % BENCH_MODULES],
+                title=f"Misión {i}" + (" racha" if i % 20 == 0 else ""),
+                description='',
+                frequency=frequencies[i % 3],
+            )
+            for i in range(size)
+        ])
+        MissionProgress.objects.bulk_create([
+            MissionProgress(user=user, mission=mission, state='completed' if i % 4 == 0 else 'active')
+            for i, mission in enumerate(missions) if i % 2 == 0
+        ])
+        return user
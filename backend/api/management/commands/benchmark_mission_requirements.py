@@ -0,0 +1,75 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.models import Declaration, Mission, MissionProgress, Module, ModuleProgress
+from api.utils.benchmarking import measure, rollback_after
+from api.utils.mission_logic import check_and_complete_missions, get_requirement_graph
+
+
+def _per_requirement_loop(user, module, pillar=None):
+    """Evaluación anterior: una consulta por requisito y un get_or_create por misión."""
+    for mission in Mission.objects.filter(module=module):
+        satisfied = True
+        for req in mission.requirements:
+            if req.get("type") == "mission":
+                satisfied = MissionProgress.objects.filter(
+                    user=user, mission_id=req.get("id"), state="completed").first() is not None
+            elif req.get("type") == "module":
+                satisfied = ModuleProgress.objects.filter(
+                    user=user, module_id=req.get("id"), state="unlocked").first() is not None
+            elif req.get("type") == "pillar":
+                satisfied = Declaration.objects.filter(
+                    user=user, module=module, pillar=req.get("id")).exists()
+            if not satisfied:
+                break
+        if satisfied:
+            mp, _ = MissionProgress.objects.get_or_create(user=user, mission=mission)
+            if mp.state != "completed":
+                mp.complete()
+
+
+def _reverted(fn):
+    """Ejecuta `fn` en un savepoint revertido para medir siempre desde el mismo estado."""
+    def run():
+        with transaction.atomic():
+            fn()
+            transaction.set_rollback(True)
+    return run
+
+
+class Command(BaseCommand):
+    help = "Compara la evaluación compilada de requisitos de misiones con el recorrido por requisito"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'misiones':>9} {'consultas':>10} {'ms':>9} {'por requisito':>14} {'ms':>9}")
+        for size in options['sizes']:
+            with rollback_after():
+                user, module = self._seed(size)
+                get_requirement_graph()
+                compiled = _reverted(lambda: check_and_complete_missions(user, module, 'Vision'))
+                legacy = _reverted(lambda: _per_requirement_loop(user, module, 'Vision'))
+                queries, ms = measure(compiled, options['repeat'])
+                legacy_queries, legacy_ms = measure(legacy, options['repeat'])
+            self.stdout.write(f"{size:>9} {queries:>10} {ms:>9.1f} {legacy_queries:>14} {legacy_ms:>9.1f}")
+
+    def _seed(self, size):
+        user = User.objects.create_user(username='bench-requirements', password='bench')
+        module = Module.objects.create(id='bench-requirements', name='Bench', description='', icon='star', order=1000)
+        ModuleProgress.objects.update_or_create(user=user, module=module, defaults={'state': 'unlocked'})
+        Declaration.objects.create(user=user, module=module, pillar='Vision', text='bench')
+        missions = []
+        for i in range(size):
+            requirements = [{"type": "pillar", "id": "Vision"}]
+            if missions and i % 3 == 0:
+                requirements.append({"type": "mission", "id": str(missions[-1].id)})
+            if i % 5 == 0:
+                requirements.append({"type": "module", "id": module.id})
+            missions.append(Mission.objects.create(
+                module=module, title=f"Requisitos {i}", description='', requirements=requirements
+            ))
+        return user, module
@@ -0,0 +1,94 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+# Servidor → comando; {workers} y {port} se completan al lanzarlo
+SERVERS = {
+    'gunicorn': ['gunicorn', 'dividis.wsgi:application', '--workers', '{workers}', '--bind', '127.0.0.1:{port}'],
+    'uvicorn': ['uvicorn', 'dividis.asgi:application', '--workers', '{workers}', '--port', '{port}',
+                '--no-access-log'],
+}
+
+
+def _wait_for_port(port, process, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+class Command(BaseCommand):
+    help = "Compara gunicorn (WSGI) y uvicorn (ASGI, vistas async) con la mezcla de lecturas de loadtest"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', nargs='+', choices=sorted(SERVERS), default=['gunicorn', 'uvicorn'])
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--prefix', default='synth')
+        parser.add_argument('--startup-timeout', type=float, default=30)
+
+    def handle(self, *args, **options):
+        results = {}
+        for name in options['servers']:
+            self.stdout.write(f"== {name} ==")
+            results[name] = self._run(name, options)
+
+        self.stdout.write(f"{'servidor':<10} {'req/s':>8} {'p50':>8} {'p95':>8} {'errores':>8}")
+        for name, report in results.items():
+            endpoints = report['endpoints'].values()
+            total = sum(row['requests'] for row in endpoints)
+            # p50/p95 globales aproximados: promedio ponderado por endpoint
+            p50 = sum(row['p50_ms'] * row['requests'] for row in endpoints) / total
+            p95 = sum(row['p95_ms'] * row['requests'] for row in endpoints) / total
+            errors = sum(row['errors'] for row in endpoints)
+            self.stdout.write(
+                f"{name:<10} {total / report['elapsed_s']:>8.1f} {p50:>8.1f} {p95:>8.1f} {errors:>8}"
+            )
+
+    def _run(self, name, options):
+        port = options['port']
+        command = [part.format(workers=options['workers'], port=port) for part in SERVERS[name]]
+        process = subprocess.Popen(
+            [sys.executable, '-m', *command],
+            cwd=settings.BASE_DIR,
+            env=os.environ.copy(),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            if not _wait_for_port(port, process, options['startup_timeout']):
+                raise CommandError(f"{name} no respondió en el puerto {port}.")
+            with tempfile.NamedTemporaryFile(suffix='.json') as report:
+                call_command(
+                    'loadtest',
+                    url=f'http://127.0.0.1:{port}',
+                    mix='reads',
+                    requests=options['requests'],
+                    concurrency=options['concurrency'],
+                    users=options['users'],
+                    prefix=options['prefix'],
+                    json_path=report.name,
+                    stdout=self.stdout,
+                )
+                with open(report.name, encoding='utf-8') as f:
+                    return json.load(f)
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
@@ -0,0 +1,33 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.utils.hot_queries import HOT_QUERIES, explain
+
+
+class Command(BaseCommand):
+    help = "Imprime el plan (EXPLAIN) de las consultas calientes para un usuario"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Nombre de usuario (por defecto, el que tiene más declaraciones)")
+        parser.add_argument('--module', default='salud')
+        parser.add_argument('--analyze', action='store_true', help="Ejecuta las consultas (EXPLAIN ANALYZE, solo PostgreSQL)")
+        parser.add_argument('--query', action='append', choices=sorted(HOT_QUERIES), help="Limita a estas consultas")
+
+    def handle(self, *args, **options):
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+        else:
+            from django.db.models import Count
+            user = User.objects.annotate(n=Count('declaration')).order_by('-n').first()
+        if user is None:
+            raise CommandError("No hay usuarios para explicar las consultas")
+
+        explain_options = {}
+        if options['analyze'] and connection.vendor == 'postgresql':
+            explain_options = {'analyze': True, 'buffers': True}
+
+        for name in options['query'] or HOT_QUERIES:
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(explain(name, user, options['module'], **explain_options))
+            self.stdout.write("")
@@ -0,0 +1,195 @@
+import csv
+import io
+import random
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from api.models import (
+    ActivityCalendar, Declaration, Mission, MissionProgress, Module, ModuleProgress,
+    Profile, Streak, UnlockedPillar, UserProgressSummary, XPEvent
+)
+from api.utils import day_bitmap
+from api.utils.xp import level_for
+
+PILLARS = [choice[0] for choice in Declaration.PILLAR_CHOICES]
+
+
+@contextmanager
+def _explicit_timestamps(model, *fields):
+    """Permite fijar campos auto_now_add/auto_now al insertar datos históricos."""
+    saved = []
+    for name in fields:
+        field = model._meta.get_field(name)
+        saved.append((field, field.auto_now, field.auto_now_add))
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = "Genera usuarios y actividad sintética a escala de producción (determinista según --seed)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000)
+        parser.add_argument('--declarations', type=int, default=30, help="Declaraciones promedio por usuario")
+        parser.add_argument('--days', type=int, default=180, help="Días de historia")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=2000, help="Usuarios por transacción")
+        parser.add_argument('--prefix', default='synth')
+        parser.add_argument('--password', default='synthetic-pass', help="Contraseña común de los usuarios generados")
+        parser.add_argument('--copy', action='store_true', help="Inserta las declaraciones con COPY (solo PostgreSQL)")
+        parser.add_argument('--clear', action='store_true', help="Borra antes los usuarios con el mismo prefijo")
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if options['clear']:
+            deleted, _ = User.objects.filter(username__startswith=f'{prefix}-').delete()
+            self.stdout.write(f"Filas borradas: {deleted}")
+
+        self.modules = list(Module.objects.order_by('order'))
+        if not self.modules:
+            self.stderr.write("No hay módulos: carga antes los fixtures (initial_modules, initial_missions).")
+            return
+        self.missions_by_module = {}
+        for mission in Mission.objects.all():
+            self.missions_by_module.setdefault(mission.module_id, []).append(mission.id)
+        self.password = make_password(options['password'])
+        self.use_copy = options['copy'] and connection.vendor == 'postgresql'
+        self.today = timezone.now().date()
+
+        total = options['users']
+        started = timezone.now()
+        for start in range(0, total, options['batch_size']):
+            count = min(options['batch_size'], total - start)
+            # Una semilla por lote: el resultado no depende del tamaño de lote anterior
+            rng = random.Random(f"{options['seed']}:{start}")
+            with transaction.atomic():
+                rows = self._generate_batch(rng, prefix, start, count, options)
+            self.stdout.write(f"  usuarios {start + count}/{total} ({rows} filas)")
+
+        elapsed = (timezone.now() - started).total_seconds()
+        self.stdout.write(self.style.SUCCESS(f"Listo en {elapsed:.1f} s."))
+
+    def _generate_batch(self, rng, prefix, start, count, options):
+        now = timezone.now()
+        users = User.objects.bulk_create([
+            User(username=f'{prefix}-{start + i:07d}', email=f'{prefix}-{start + i:07d}@example.com',
+                 password=self.password, date_joined=now)
+            for i in range(count)
+        ])
+        user_ids = [user.pk for user in users]
+
+        profiles, xp_events, module_rows, mission_rows = [], [], [], []
+        declarations, activity, pillars = [], {}, {}
+        for user_id in user_ids:
+            # Los módulos se desbloquean en orden; el primero siempre está abierto
+            unlocked = 1 + min(int(rng.expovariate(0.8)), len(self.modules) - 1)
+            for index, module in enumerate(self.modules):
+                module_rows.append(ModuleProgress(
+                    user_id=user_id, module=module,
+                    state='unlocked' if index < unlocked else 'locked',
+                    auto_unlocked=index == 0
+                ))
+            open_modules = self.modules[:unlocked]
+
+            for module in [None] + open_modules:
+                for mission_id in self.missions_by_module.get(module.id if module else None, []):
+                    completed = rng.random() < 0.4
+                    mission_rows.append(MissionProgress(
+                        user_id=user_id, mission_id=mission_id,
+                        state='completed' if completed else 'active',
+                        completed_at=now if completed else None
+                    ))
+
+            for n in range(max(0, int(rng.gauss(options['declarations'], options['declarations'] / 3)))):
+                module = rng.choice(open_modules)
+                pillar = rng.choice(PILLARS)
+                moment = self._moment(rng, options['days'])
+                declarations.append((user_id, module.id, pillar, f"Declaración sintética {n}", moment))
+                key = (user_id, module.id, pillar)
+                pillars[key] = min(pillars.get(key, moment), moment)
+                activity.setdefault((user_id, None), set()).add(moment.date())
+                activity.setdefault((user_id, module.id), set()).add(moment.date())
+
+            xp = rng.randint(0, 250) * 10
+            profiles.append(Profile(user_id=user_id, experience_points=xp, current_level=level_for(xp)))
+            if xp:
+                xp_events.append(XPEvent(user_id=user_id, source='adjustment', reference='opening-balance', amount=xp))
+
+        Profile.objects.bulk_create(profiles)
+        XPEvent.objects.bulk_create(xp_events)
+        ModuleProgress.objects.bulk_create(module_rows)
+        MissionProgress.objects.bulk_create(mission_rows)
+        self._insert_declarations(declarations)
+        with _explicit_timestamps(UnlockedPillar, 'unlocked_at'):
+            UnlockedPillar.objects.bulk_create([
+                UnlockedPillar(user_id=user_id, module_id=module_id, pillar=pillar, unlocked_at=moment)
+                for (user_id, module_id, pillar), moment in pillars.items()
+            ])
+        calendars, streaks = self._calendars(activity)
+        ActivityCalendar.objects.bulk_create(calendars)
+        Streak.objects.bulk_create(streaks)
+        UserProgressSummary.objects.bulk_create([
+            UserProgressSummary(user_id=user_id, **values)
+            for user_id, values in UserProgressSummary.compute(user_ids).items()
+        ])
+        return (len(users) * 2 + len(xp_events) + len(module_rows) + len(mission_rows)
+                + len(declarations) + len(pillars) + len(calendars) + len(streaks) + len(user_ids))
+
+    def _moment(self, rng, days):
+        day = self.today - timedelta(days=min(int(rng.expovariate(1 / 20)), days - 1))
+        moment = datetime.combine(day, time(hour=rng.randint(6, 22), minute=rng.randint(0, 59)))
+        return timezone.make_aware(moment)
+
+    def _insert_declarations(self, rows):
+        if not self.use_copy:
+            with _explicit_timestamps(Declaration, 'created_at', 'updated_at'):
+                Declaration.objects.bulk_create([
+                    Declaration(user_id=user_id, module_id=module_id, pillar=pillar, text=text,
+                                created_at=moment, updated_at=moment)
+                    for user_id, module_id, pillar, text, moment in rows
+                ], batch_size=5000)
+            return
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for user_id, module_id, pillar, text, moment in rows:
+            writer.writerow([user_id, module_id, pillar, text, moment.isoformat(), moment.isoformat(), 't'])
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {Declaration._meta.db_table} "
+                "(user_id, module_id, pillar, text, created_at, updated_at, synced) FROM STDIN WITH CSV",
+                buffer
+            )
+
+    def _calendars(self, activity):
+        calendars, streaks = [], []
+        for (user_id, module_id), days in activity.items():
+            origin = min(days)
+            bits = 0
+            for day in days:
+                bits |= 1 << (day - origin).days
+            calendar = ActivityCalendar(
+                user_id=user_id, module_id=module_id, origin=origin,
+                days=day_bitmap.to_bytes(bits),
+                longest_streak=day_bitmap.longest_run(bits),
+                last_active=max(days)
+            )
+            calendars.append(calendar)
+            if module_id is not None:
+                streaks.append(Streak(
+                    user_id=user_id, module_id=module_id,
+                    current_streak=calendar.current_streak(self.today),
+                    longest_streak=calendar.longest_streak
+                ))
+        return calendars, streaks
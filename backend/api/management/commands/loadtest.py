@@ -0,0 +1,202 @@
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.test import Client
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.models import Declaration, Module
+from api.utils.benchmarking import percentile
+from api.utils.catalog import get_catalog
+
+PILLARS = [choice[0] for choice in Declaration.PILLAR_CHOICES]
+
+# (nombre, peso): mezcla aproximada del tráfico de la app
+TRAFFIC_MIX = [
+    ('me', 15),
+    ('user-missions', 20),
+    ('progress-overview', 15),
+    ('module-list', 10),
+    ('declaration-create', 25),
+    ('mission-complete', 15),
+]
+
+# Solo lecturas: las vistas que tienen versión async (api/async_views.py)
+READ_MIX = [
+    ('user-missions', 30),
+    ('progress-overview', 30),
+    ('module-progress', 25),
+    ('wellness-survey-answers', 15),
+]
+
+MIXES = {'app': TRAFFIC_MIX, 'reads': READ_MIX}
+
+
+class InProcessTransport:
+    """Envía las peticiones al handler de Django en el mismo proceso."""
+
+    def __init__(self):
+        self.client = Client(raise_request_exception=False)
+
+    def request(self, method, path, token, body=None):
+        response = getattr(self.client, method)(
+            path,
+            data=json.dumps(body) if body is not None else None,
+            content_type='application/json',
+            HTTP_AUTHORIZATION=f'Bearer {token}',
+        )
+        return response.status_code
+
+
+class HttpTransport:
+    """Envía las peticiones a un servidor en ejecución (gunicorn, runserver...)."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, path, token, body=None):
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=json.dumps(body).encode() if body is not None else None,
+            method=method.upper(),
+            headers={'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as error:
+            return error.code
+
+
+class Command(BaseCommand):
+    help = "Reproduce una mezcla de tráfico del dashboard, declaraciones y misiones y reporta latencias por endpoint"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000, help="Total de peticiones")
+        parser.add_argument('--duration', type=float, help="Segundos de prueba (reemplaza --requests)")
+        parser.add_argument('--concurrency', type=int, default=4, help="Hilos concurrentes")
+        parser.add_argument('--users', type=int, default=1000, help="Usuarios distintos a usar")
+        parser.add_argument('--prefix', default='synth', help="Prefijo de los usuarios (generate_synthetic_data)")
+        parser.add_argument('--url', help="URL base de un servidor; sin ella se usa la app WSGI en el proceso")
+        parser.add_argument('--mix', choices=sorted(MIXES), default='app',
+                            help="app: tráfico completo; reads: solo endpoints de lectura")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--json', dest='json_path', help="Guarda el reporte en un archivo JSON")
+
+    def handle(self, *args, **options):
+        users = list(User.objects
+            .filter(username__startswith=f"{options['prefix']}-")
+            .order_by('id')[:options['users']])
+        if not users:
+            raise CommandError("No hay usuarios sintéticos: ejecuta antes generate_synthetic_data.")
+        # Los tokens se firman localmente; no pasan por /api/token/
+        self.tokens = [str(RefreshToken.for_user(user).access_token) for user in users]
+
+        # Misiones del primer módulo: siempre está desbloqueado
+        first_module = Module.objects.order_by('order').values_list('id', flat=True).first()
+        self.missions = [str(m.id) for m in get_catalog().missions_for_module(first_module)]
+        self.first_module = first_module
+        traffic = MIXES[options['mix']]
+        self.mix = [name for name, _ in traffic if name != 'mission-complete' or self.missions]
+        self.weights = [weight for name, weight in traffic if name in self.mix]
+
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+        self.remaining = options['requests']
+        # Distingue los textos de cada ejecución aunque se repita la semilla
+        self.run_id = uuid.uuid4().hex[:8]
+        deadline = time.monotonic() + options['duration'] if options['duration'] else None
+
+        workers = [
+            threading.Thread(target=self._worker, args=(index, options, deadline))
+            for index in range(options['concurrency'])
+        ]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+        self._report(elapsed, options.get('json_path'))
+
+    def _next(self, deadline):
+        if deadline is not None:
+            return time.monotonic() < deadline
+        with self.lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+    def _worker(self, index, options, deadline):
+        rng = random.Random(f"{options['seed']}:{index}")
+        transport = HttpTransport(options['url']) if options['url'] else InProcessTransport()
+        sequence = 0
+        try:
+            while self._next(deadline):
+                sequence += 1
+                name = rng.choices(self.mix, self.weights)[0]
+                method, path, body = self._build(name, rng, f'{self.run_id}-{index}-{sequence}')
+                token = rng.choice(self.tokens)
+                start = time.perf_counter()
+                status = transport.request(method, path, token, body)
+                ms = (time.perf_counter() - start) * 1000
+                with self.lock:
+                    self.samples[name].append(ms)
+                    if status >= 400:
+                        self.errors[name] += 1
+        finally:
+            close_old_connections()
+
+    def _build(self, name, rng, tag):
+        if name == 'declaration-create':
+            # Texto único para no chocar con la restricción de unicidad
+            body = {
+                'module': self.first_module,
+                'pillar': rng.choice(PILLARS),
+                'text': f'Declaración de carga {tag}',
+            }
+            return 'post', reverse('declaration-list'), body
+        if name == 'mission-complete':
+            return 'post', reverse(name, kwargs={'mission_id': rng.choice(self.missions)}), None
+        if name == 'module-progress':
+            return 'get', reverse(name, kwargs={'module_id': self.first_module}), None
+        return 'get', reverse(name), None
+
+    def _report(self, elapsed, json_path):
+        total = sum(len(samples) for samples in self.samples.values())
+        self.stdout.write(
+            f"{'endpoint':<24} {'peticiones':>10} {'errores':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'req/s':>8}"
+        )
+        report = {}
+        for name in sorted(self.samples):
+            samples = sorted(self.samples[name])
+            row = {
+                'requests': len(samples),
+                'errors': self.errors[name],
+                'p50_ms': percentile(samples, 50),
+                'p95_ms': percentile(samples, 95),
+                'p99_ms': percentile(samples, 99),
+                'throughput': len(samples) / elapsed,
+            }
+            report[name] = row
+            self.stdout.write(
+                f"{name:<24} {row['requests']:>10} {row['errors']:>8} {row['p50_ms']:>8.1f} "
+                f"{row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['throughput']:>8.1f}"
+            )
+        self.stdout.write(f"Total: {total} peticiones en {elapsed:.1f} s ({total / elapsed:.1f} req/s)")
+        if json_path:
+            with open(json_path, 'w', encoding='utf-8') as f:
+                json.dump({'elapsed_s': elapsed, 'endpoints': report}, f, indent=2)
@@ -0,0 +1,57 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.models import UserProgressSummary
+
+FIELDS = UserProgressSummary.COUNTERS + ('current_streaks',)
+
+
+class Command(BaseCommand):
+    help = "Recalcula por bloques los resúmenes de progreso y reporta las diferencias encontradas"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help="Solo reporta diferencias, no guarda")
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        user_ids = list(User.objects.order_by('pk').values_list('pk', flat=True))
+        drift = {field: 0 for field in FIELDS}
+        missing = 0
+        for start in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[start:start + chunk_size]
+            with transaction.atomic():
+                missing += self._rebuild_chunk(chunk, drift, options['dry_run'])
+
+        self.stdout.write(f"Usuarios revisados: {len(user_ids)}. Resúmenes faltantes: {missing}.")
+        for field, count in drift.items():
+            style = self.style.WARNING if count else self.style.SUCCESS
+            self.stdout.write(style(f"  {field}: {count} usuarios con diferencias"))
+
+    def _rebuild_chunk(self, user_ids, drift, dry_run):
+        expected = UserProgressSummary.compute(user_ids)
+        current = {
+            summary.user_id: summary
+            for summary in UserProgressSummary.objects.select_for_update().filter(user_id__in=user_ids)
+        }
+        to_create = []
+        to_update = []
+        for user_id, values in expected.items():
+            summary = current.get(user_id)
+            if summary is None:
+                to_create.append(UserProgressSummary(user_id=user_id, **values))
+                continue
+            changed = False
+            for field in FIELDS:
+                if getattr(summary, field) != values[field]:
+                    drift[field] += 1
+                    setattr(summary, field, values[field])
+                    changed = True
+            if changed:
+                to_update.append(summary)
+
+        if not dry_run:
+            UserProgressSummary.objects.bulk_create(to_create, ignore_conflicts=True)
+            UserProgressSummary.objects.bulk_update(to_update, FIELDS)
+        return len(to_create)
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.wellness_survey.histograms import compute_histograms
+from api.wellness_survey.models import WellnessAnswerHistogram
+
+
+class Command(BaseCommand):
+    help = "Recalcula los histogramas de la encuesta de bienestar desde el último intento de cada usuario"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Solo reporta diferencias, no guarda")
+
+    def handle(self, *args, **options):
+        expected = compute_histograms()
+        with transaction.atomic():
+            current = {
+                (row.category, row.question): row
+                for row in WellnessAnswerHistogram.objects.select_for_update()
+            }
+            drift = sum(
+                1 for key in set(expected) | set(current)
+                if expected.get(key) != (current[key].counts if key in current else None)
+            )
+            if not options['dry_run']:
+                WellnessAnswerHistogram.objects.all().delete()
+                WellnessAnswerHistogram.objects.bulk_create([
+                    WellnessAnswerHistogram(category=category, question=question, counts=counts, total=sum(counts))
+                    for (category, question), counts in sorted(expected.items())
+                ])
+
+        style = self.style.WARNING if drift else self.style.SUCCESS
+        self.stdout.write(style(f"Histogramas: {len(expected)}. Con diferencias: {drift}."))
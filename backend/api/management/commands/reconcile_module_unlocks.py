@@ -0,0 +1,30 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from api.utils.module_unlocks import evaluate_module_unlocks_bulk
+
+
+class Command(BaseCommand):
+    help = "Reevalúa en lote los desbloqueos de módulos de todos los usuarios existentes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        user_ids = User.objects.order_by('pk').values_list('pk', flat=True)
+        users = 0
+        unlocked = 0
+        chunk = []
+        for user_id in user_ids.iterator(chunk_size=chunk_size):
+            chunk.append(user_id)
+            if len(chunk) == chunk_size:
+                unlocked += len(evaluate_module_unlocks_bulk(chunk))
+                users += len(chunk)
+                chunk = []
+        if chunk:
+            unlocked += len(evaluate_module_unlocks_bulk(chunk))
+            users += len(chunk)
+        self.stdout.write(self.style.SUCCESS(
+            f"Usuarios revisados: {users}. Módulos desbloqueados: {unlocked}."
+        ))
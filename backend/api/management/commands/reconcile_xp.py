@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+
+from api.models import Profile, XPEvent
+from api.utils.xp import level_for
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el XP total y el nivel de cada perfil a partir del ledger XPEvent"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help="Solo reporta diferencias, no guarda")
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        user_ids = list(Profile.objects.order_by('user_id').values_list('user_id', flat=True))
+        drifted = 0
+        for start in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[start:start + chunk_size]
+            with transaction.atomic():
+                totals = dict(
+                    XPEvent.objects.filter(user_id__in=chunk)
+                    .order_by()
+                    .values('user_id')
+                    .annotate(total=Sum('amount'))
+                    .values_list('user_id', 'total')
+                )
+                to_update = []
+                for profile in Profile.objects.select_for_update().filter(user_id__in=chunk):
+                    total = totals.get(profile.user_id, 0)
+                    level = level_for(total)
+                    if profile.experience_points != total or profile.current_level != level:
+                        profile.experience_points = total
+                        profile.current_level = level
+                        to_update.append(profile)
+                drifted += len(to_update)
+                if not options['dry_run']:
+                    Profile.objects.bulk_update(to_update, ['experience_points', 'current_level'])
+
+        style = self.style.WARNING if drifted else self.style.SUCCESS
+        self.stdout.write(style(f"Perfiles revisados: {len(user_ids)}. Con diferencias: {drifted}."))
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.utils import tasks
+from api.utils.declaration_sync import requeue_pending_declarations
+
+
+class Command(BaseCommand):
+    help = "Worker de la cola de efectos diferidos (DEFERRED_TASKS, ver api/utils/tasks.py)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Ejecuta las tareas listas y termina")
+        parser.add_argument('--sleep', type=float, default=1.0, help="Segundos de espera con la cola vacía")
+
+    def handle(self, *args, **options):
+        # Declaraciones cuyo encolado se perdió (p. ej. el proceso murió justo tras el commit)
+        pending_users = requeue_pending_declarations()
+        if pending_users:
+            self.stdout.write(f"Usuarios con declaraciones pendientes: {pending_users}")
+
+        processed = 0
+        try:
+            while True:
+                count = tasks.run_pending()
+                processed += count
+                if options['once']:
+                    break
+                if not count:
+                    time.sleep(options['sleep'])
+                close_old_connections()
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Tareas ejecutadas: {processed}."))
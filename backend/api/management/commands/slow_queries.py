@@ -0,0 +1,58 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Avg, Count, Max, Sum
+from django.utils import timezone
+
+from api.models import SlowQuery
+
+
+class Command(BaseCommand):
+    help = "Muestra los lugares del código con más tiempo en consultas lentas (SlowQuery)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=24, help="Ventana de tiempo a considerar")
+        parser.add_argument('--limit', type=int, default=15)
+        parser.add_argument('--by', choices=['call_site', 'fingerprint'], default='call_site',
+                            help="Agrupar por lugar del código o por consulta normalizada")
+        parser.add_argument('--plans', action='store_true', help="Incluye el último EXPLAIN de cada grupo")
+        parser.add_argument('--clear', action='store_true', help="Borra los registros y termina")
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            deleted, _ = SlowQuery.objects.all().delete()
+            self.stdout.write(f"Registros borrados: {deleted}")
+            return
+
+        key = options['by']
+        since = timezone.now() - timedelta(hours=options['hours'])
+        recent = SlowQuery.objects.filter(created_at__gte=since)
+        groups = (recent
+            .values(key)
+            .annotate(count=Count('id'), total=Sum('duration_ms'), avg=Avg('duration_ms'), worst=Max('duration_ms'))
+            .order_by('-total')[:options['limit']])
+        if not groups:
+            self.stdout.write("Sin consultas lentas en la ventana indicada.")
+            return
+
+        self.stdout.write(f"{'total ms':>10} {'n':>6} {'prom ms':>9} {'máx ms':>9}  {key}")
+        for group in groups:
+            self.stdout.write(
+                f"{group['total']:>10.0f} {group['count']:>6} {group['avg']:>9.1f} {group['worst']:>9.1f}  {group[key]}"
+            )
+            sample = recent.filter(**{key: group[key]}).order_by('-duration_ms').first()
+            if key == 'call_site':
+                lines = sorted(set(recent.filter(call_site=group[key]).values_list('line', flat=True)))
+                self.stdout.write(f"{'':>38}líneas {', '.join(map(str, lines))}")
+            else:
+                self.stdout.write(f"{'':>38}{sample.call_site}:{sample.line}")
+            self.stdout.write(f"{'':>38}{sample.sql[:160]}")
+            if options['plans']:
+                planned = (recent
+                    .filter(fingerprint=sample.fingerprint)
+                    .exclude(plan='')
+                    .order_by('-created_at')
+                    .first())
+                if planned:
+                    for line in planned.plan.splitlines():
+                        self.stdout.write(f"{'':>40}{line}")
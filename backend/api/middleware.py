@@ -0,0 +1,53 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from api.utils import metrics, slow_queries
+
+
+class RequestMetricsMiddleware:
+    """
+    Mide cada request (consultas SQL, tiempo en la base, serialización y total),
+    lo informa en el header `Server-Timing` y lo acumula en los histogramas por
+    vista que expone `/metrics`. Al final guarda las consultas lentas del request.
+    Funciona tanto con WSGI como con ASGI (vistas async).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timings, token = metrics.start_request(request)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.finish_request(token)
+        self._finish(request, response, timings, time.perf_counter() - start)
+        slow_queries.flush()
+        return response
+
+    async def __acall__(self, request):
+        timings, token = metrics.start_request(request)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.finish_request(token)
+        self._finish(request, response, timings, time.perf_counter() - start)
+        if slow_queries.pending():
+            await sync_to_async(slow_queries.flush)()
+        return response
+
+    def _finish(self, request, response, timings, total):
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        response['Server-Timing'] = timings.server_timing(total)
+        metrics.observe_request(view, request.method, response.status_code, timings, total)
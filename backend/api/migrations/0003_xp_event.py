@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_opening_balances(apps, schema_editor):
+    # El XP acumulado antes del ledger se registra como saldo inicial
+    Profile = apps.get_model('api', 'Profile')
+    XPEvent = apps.get_model('api', 'XPEvent')
+    XPEvent.objects.bulk_create([
+        XPEvent(user_id=user_id, source='adjustment', reference='opening-balance', amount=xp)
+        for user_id, xp in Profile.objects.exclude(experience_points=0).values_list('user_id', 'experience_points')
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_user_progress_summary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='XPEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('mission', 'Misión completada'), ('declaration', 'Primera declaración en un pilar'), ('achievement', 'Logro'), ('adjustment', 'Ajuste')], max_length=20)),
+                ('reference', models.CharField(blank=True, default='', max_length=100)),
+                ('amount', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='xp_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('reference', ''), _negated=True), fields=('user', 'source', 'reference'), name='unique_xp_event_reference')],
+            },
+        ),
+        migrations.RunPython(create_opening_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from api.utils import day_bitmap
+
+
+def backfill_calendars(apps, schema_editor):
+    # Reconstruye los días activos desde las declaraciones y misiones completadas
+    Declaration = apps.get_model('api', 'Declaration')
+    MissionProgress = apps.get_model('api', 'MissionProgress')
+    ActivityCalendar = apps.get_model('api', 'ActivityCalendar')
+
+    days = {}
+    activity = [
+        Declaration.objects.order_by().values_list('user_id', 'module_id', 'created_at'),
+        MissionProgress.objects.filter(state='completed', completed_at__isnull=False)
+        .order_by().values_list('user_id', 'mission__module_id', 'completed_at'),
+    ]
+    for rows in activity:
+        for user_id, module_id, moment in rows.iterator():
+            day = moment.date()
+            days.setdefault((user_id, None), set()).add(day)
+            if module_id:
+                days.setdefault((user_id, module_id), set()).add(day)
+
+    calendars = []
+    for (user_id, module_id), active in days.items():
+        origin = min(active)
+        bits = 0
+        for day in active:
+            bits |= 1 << (day - origin).days
+        calendars.append(ActivityCalendar(
+            user_id=user_id,
+            module_id=module_id,
+            origin=origin,
+            days=day_bitmap.to_bytes(bits),
+            longest_streak=day_bitmap.longest_run(bits),
+            last_active=max(active),
+        ))
+    ActivityCalendar.objects.bulk_create(calendars, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_xp_event'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityCalendar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('origin', models.DateField()),
+                ('days', models.BinaryField(default=bytes)),
+                ('longest_streak', models.IntegerField(default=0)),
+                ('last_active', models.DateField(blank=True, null=True)),
+                ('module', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='api.module')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity_calendars', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'module'), name='unique_activity_calendar_module'), models.UniqueConstraint(condition=models.Q(('module__isnull', True)), fields=('user',), name='unique_activity_calendar_global')],
+            },
+        ),
+        migrations.RunPython(backfill_calendars, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_activity_calendar'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wellnesssurveyanswer',
+            name='question_set',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def group_legacy_answers(apps, schema_editor):
+    # Las respuestas existentes pasan a ser el intento más reciente de cada usuario
+    WellnessSurveyAnswer = apps.get_model('api', 'WellnessSurveyAnswer')
+    WellnessSurveySession = apps.get_model('api', 'WellnessSurveySession')
+
+    answers = {}
+    rows = (WellnessSurveyAnswer.objects
+        .filter(session__isnull=True)
+        .order_by()
+        .values_list('user_id', 'category', 'answer', 'created_at'))
+    for user_id, category, answer, created_at in rows.iterator():
+        answers.setdefault(user_id, []).append((category, answer, created_at))
+
+    for user_id, user_answers in answers.items():
+        totals = {}
+        for category, answer, _ in user_answers:
+            total, count = totals.get(category, (0, 0))
+            totals[category] = (total + answer, count + 1)
+        averages = {
+            category: round(total / count, 2)
+            for category, (total, count) in sorted(totals.items())
+        }
+        finished_at = max(created_at for _, _, created_at in user_answers)
+
+        session = (WellnessSurveySession.objects
+            .filter(user_id=user_id)
+            .order_by('-started_at', '-id')
+            .first())
+        if session is None:
+            session = WellnessSurveySession(user_id=user_id, current_step=1)
+        session.is_completed = True
+        session.finished_at = session.finished_at or finished_at
+        session.category_averages = averages
+        session.answer_count = len(user_answers)
+        session.save()
+
+        WellnessSurveyAnswer.objects.filter(user_id=user_id, session__isnull=True).update(session=session)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_wellness_answer_question_set'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wellnesssurveyanswer',
+            name='session',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='api.wellnesssurveysession'),
+        ),
+        migrations.AddField(
+            model_name='wellnesssurveysession',
+            name='answer_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='wellnesssurveysession',
+            name='category_averages',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='wellnesssurveysession',
+            name='question_set',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.AddIndex(
+            model_name='wellnesssurveysession',
+            index=models.Index(fields=['user', '-finished_at'], name='wellness_session_user_idx'),
+        ),
+        migrations.RunPython(group_legacy_answers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:18
+
+from django.db import migrations, models
+
+
+def fill_histograms(apps, schema_editor):
+    # Sin los intentos de 0006, el primer reenvío de cada usuario restaría uno que nunca se contó
+    from api.wellness_survey.histograms import compute_histograms
+
+    WellnessAnswerHistogram = apps.get_model('api', 'WellnessAnswerHistogram')
+    counts = compute_histograms(apps.get_model('api', 'WellnessSurveyAnswer'),
+                                apps.get_model('api', 'WellnessSurveySession'))
+    WellnessAnswerHistogram.objects.bulk_create([
+        WellnessAnswerHistogram(category=category, question=question, counts=row, total=sum(row))
+        for (category, question), row in sorted(counts.items())
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_wellness_survey_attempts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WellnessAnswerHistogram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(max_length=50)),
+                ('question', models.CharField(blank=True, default='', max_length=255)),
+                ('counts', models.JSONField(default=list)),
+                ('total', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('category', 'question'), name='unique_wellness_histogram')],
+            },
+        ),
+        migrations.RunPython(fill_histograms, migrations.RunPython.noop),
+    ]
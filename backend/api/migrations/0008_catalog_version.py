@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+def create_catalog_version(apps, schema_editor):
+    CatalogVersion = apps.get_model('api', 'CatalogVersion')
+    CatalogVersion.objects.get_or_create(name='catalog', defaults={'version': 1})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_wellness_answer_histogram'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='userprogresssummary',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(create_catalog_version, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_catalog_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='declaration',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='declaration_user_cursor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='habit',
+            index=models.Index(fields=['user', '-id'], name='habit_user_cursor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='unlockedpillar',
+            index=models.Index(fields=['user', '-unlocked_at', '-id'], name='unlockedpillar_user_cursor_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_keyset_pagination_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='declaration',
+            index=models.Index(fields=['user', 'module', '-created_at'], name='declaration_user_module_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='missionprogress',
+            index=models.Index(fields=['user', 'state'], name='missionprogress_user_state_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='missionprogress',
+            index=models.Index(condition=models.Q(('state', 'completed')), fields=['user', 'mission'], name='missionprogress_completed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='moduleprogress',
+            index=models.Index(fields=['user', 'state', 'last_activity'], name='moduleprogress_user_state_idx'),
+        ),
+    ]
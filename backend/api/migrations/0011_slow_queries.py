@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=16)),
+                ('sql', models.TextField()),
+                ('call_site', models.CharField(max_length=255)),
+                ('line', models.PositiveIntegerField(default=0)),
+                ('duration_ms', models.FloatField()),
+                ('plan', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_at'], name='slowquery_created_idx')],
+            },
+        ),
+    ]
@@ -2,15 +2,27 @@
 """
 Data models for the Dividis application.
 """
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.conf import settings
 import uuid
 
-import json
-import os
+from .utils import day_bitmap, events
+
+class UserStateModel(models.Model):
+    """
+    Estado del usuario que se informa en /sync/changes/. El guardado y su
+    anotación en el registro de cambios (post_save, ver api/utils/changes.py)
+    van en la misma transacción.
+    """
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
 
 class LevelTitle(models.Model):
     level = models.PositiveIntegerField(unique=True)
@@ -26,17 +38,10 @@ class Profile(models.Model):
     experience_points = models.IntegerField(default=0)
     current_level = models.IntegerField(default=1)
 
-    # Cargar títulos de nivel una sola vez
-    _level_titles = None
-
     @classmethod
     def get_titles_dict(cls):
-        if cls._level_titles is None:
-            fixture_path = os.path.join(os.path.dirname(__file__), "fixtures", "level_titles.json")
-            with open(fixture_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                cls._level_titles = {item["level"]: item["title"] for item in data}
-        return cls._level_titles
+        from .utils.catalog import get_catalog
+        return get_catalog().level_titles
 
     def get_level_title(self):
         titles = self.get_titles_dict()
@@ -48,10 +53,43 @@ class Profile(models.Model):
         self.current_level = (self.experience_points // 100) + 1
         self.save()
 
+class XPEvent(models.Model):
+    """
+    Ledger append-only de experiencia otorgada.
+    El total de Profile se mantiene a partir de estos eventos y puede
+    reconstruirse desde ellos. `reference` identifica la recompensa para que
+    no se otorgue dos veces (por ejemplo, el id de la misión).
+    """
+    SOURCE_CHOICES = [
+        ('mission', 'Misión completada'),
+        ('declaration', 'Primera declaración en un pilar'),
+        ('achievement', 'Logro'),
+        ('adjustment', 'Ajuste'),
+    ]
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='xp_events')
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    reference = models.CharField(max_length=100, blank=True, default='')
+    amount = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'source', 'reference'],
+                condition=~models.Q(reference=''),
+                name='unique_xp_event_reference',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username}: {self.amount:+d} XP ({self.source})"
+
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
         Profile.objects.create(user=instance)
+        UserProgressSummary.objects.create(user=instance)
         # Desbloquear automáticamente el primer módulo (orden 1)
         from .models import Module, ModuleProgress
         first_module = Module.objects.order_by('order').first()
@@ -61,6 +99,9 @@ def create_user_profile(sender, instance, created, **kwargs):
                 progress.unlock()
                 progress.auto_unlocked = True
                 progress.save()
+        # Crear el progreso del resto de módulos en una sola pasada
+        from .utils.module_unlocks import evaluate_module_unlocks
+        evaluate_module_unlocks(instance)
 
 class Module(models.Model):
     STATES = (
@@ -107,7 +148,7 @@ class Module(models.Model):
         self.state = 'completed'
         self.save(update_fields=['state'])
 
-class ModuleProgress(models.Model):
+class ModuleProgress(UserStateModel):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     module = models.ForeignKey(Module, on_delete=models.CASCADE)
     state = models.CharField(
@@ -121,6 +162,9 @@ class ModuleProgress(models.Model):
 
     class Meta:
         unique_together = ['user', 'module']
+        indexes = [
+            models.Index(fields=['user', 'state', 'last_activity'], name='moduleprogress_user_state_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username}'s progress in {self.module.name}"
@@ -142,22 +186,32 @@ class ModuleProgress(models.Model):
         """Transition from locked to unlocked state"""
         self._validate_transition('unlocked')
         self.state = 'unlocked'
-        self.save(update_fields=['state'])
+        with transaction.atomic():
+            self.save(update_fields=['state'])
+            UserProgressSummary.bump(self.user_id, modules_unlocked=1)
+            events.publish(self.user_id, events.MODULE_UNLOCKED, module_id=self.module_id)
 
     def complete(self):
         """Transition from unlocked to completed state"""
         self._validate_transition('completed')
         self.state = 'completed'
-        self.save(update_fields=['state'])
+        with transaction.atomic():
+            self.save(update_fields=['state'])
+            UserProgressSummary.bump(self.user_id, modules_unlocked=-1)
 
     def force_unlock(self, auto_unlock=False):
         """
         Admin/special case unlock that bypasses normal validation
         Sets auto_unlocked flag if specified
         """
+        was_unlocked = self.state == 'unlocked'
         self.state = 'unlocked'
         self.auto_unlocked = auto_unlock
-        self.save(update_fields=['state', 'auto_unlocked'])
+        with transaction.atomic():
+            self.save(update_fields=['state', 'auto_unlocked'])
+            if not was_unlocked:
+                UserProgressSummary.bump(self.user_id, modules_unlocked=1)
+                events.publish(self.user_id, events.MODULE_UNLOCKED, module_id=self.module_id)
 
 from django.db.models import JSONField
 
@@ -185,7 +239,7 @@ class Mission(models.Model):
     def __str__(self):
         return self.title
 
-class MissionProgress(models.Model):
+class MissionProgress(UserStateModel):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     mission = models.ForeignKey(Mission, on_delete=models.CASCADE)
     state = models.CharField(
@@ -198,6 +252,15 @@ class MissionProgress(models.Model):
 
     class Meta:
         unique_together = ['user', 'mission']
+        indexes = [
+            models.Index(fields=['user', 'state'], name='missionprogress_user_state_idx'),
+            # Misiones completadas por usuario (desbloqueos y requisitos de misiones)
+            models.Index(
+                fields=['user', 'mission'],
+                condition=models.Q(state='completed'),
+                name='missionprogress_completed_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.username}'s progress on {self.mission.title}"
@@ -222,7 +285,10 @@ class MissionProgress(models.Model):
         self._validate_transition('completed')
         self.state = 'completed'
         self.completed_at = timezone.now()
-        self.save(update_fields=['state', 'completed_at'])
+        with transaction.atomic():
+            self.save(update_fields=['state', 'completed_at'])
+            UserProgressSummary.bump(self.user_id, missions_completed=1)
+            events.publish(self.user_id, events.MISSION_COMPLETED, mission_id=str(self.mission_id))
 
     def fail(self):
         """Transition from active to failed state"""
@@ -232,9 +298,13 @@ class MissionProgress(models.Model):
 
     def reset(self):
         """Reset progress back to active state (admin/special cases)"""
+        was_completed = self.state == 'completed'
         self.state = 'active'
         self.completed_at = None
-        self.save(update_fields=['state', 'completed_at'])
+        with transaction.atomic():
+            self.save(update_fields=['state', 'completed_at'])
+            if was_completed:
+                UserProgressSummary.bump(self.user_id, missions_completed=-1)
 
 class Achievement(models.Model):
     name = models.CharField(max_length=100)
@@ -254,7 +324,12 @@ class UserAchievement(models.Model):
     def __str__(self):
         return f"{self.user.username} unlocked {self.achievement.name}"
 
-class Streak(models.Model):
+@receiver(post_save, sender=UserAchievement)
+def count_user_achievement(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserProgressSummary.bump(instance.user_id, achievements_earned=1)
+
+class Streak(UserStateModel):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     module = models.ForeignKey(Module, on_delete=models.CASCADE)
     current_streak = models.IntegerField(default=0)
@@ -265,30 +340,121 @@ class Streak(models.Model):
     def __str__(self):
         return f"{self.user.username}'s streak in {self.module.name}"
     def update_streak(self):
+        """
+        Registra actividad hoy en el calendario del módulo y en el global, y
+        recalcula la racha desde el bitmap: varias acciones el mismo día
+        cuentan como un solo día.
+        """
         from django.utils import timezone
         now = timezone.now()
-        if (now - self.last_activity).days <= 1:
-            self.current_streak += 1
-            if self.current_streak > self.longest_streak:
-                self.longest_streak = self.current_streak
-        else:
-            self.current_streak = 1
+        today = now.date()
+        calendar, _ = ActivityCalendar.record(self.user_id, self.module_id, today)
+        _, first_activity_today = ActivityCalendar.record(self.user_id, None, today)
+        self.current_streak = calendar.current_streak(today)
+        self.longest_streak = max(self.longest_streak, calendar.longest_streak)
         self.last_activity = now
         self.save()
+        UserProgressSummary.set_streak(self.user_id, self.module_id, self.current_streak)
 
         # --- Lógica para misión global de racha de 1 día ---
-        if self.current_streak >= 1:
-            try:
-                from .models import Mission, MissionProgress
-                mission = Mission.objects.get(id="46e39fc7-8a77-4e39-9559-283a73655d12")
+        # Solo puede cambiar con el primer día activo nuevo del usuario
+        if first_activity_today:
+            from .utils.catalog import get_catalog
+            mission = get_catalog().mission("46e39fc7-8a77-4e39-9559-283a73655d12")
+            if mission is not None:
                 mp, created = MissionProgress.objects.get_or_create(user=self.user, mission=mission)
                 if mp.state != "completed":
                     mp.complete()
                     mp.save()
-            except Mission.DoesNotExist:
-                pass
 
-class Declaration(models.Model):
+class ActivityCalendar(models.Model):
+    """
+    Días con actividad de un usuario en un módulo (o global, con module=None),
+    guardados como bitmap: el bit i indica actividad el día `origin + i`.
+    Las rachas y los conteos de "actividad en los últimos N días" se calculan
+    con operaciones de bits sobre una sola fila.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='activity_calendars')
+    module = models.ForeignKey(Module, on_delete=models.CASCADE, null=True, blank=True)
+    origin = models.DateField()
+    days = models.BinaryField(default=bytes)
+    longest_streak = models.IntegerField(default=0)
+    last_active = models.DateField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'module'], name='unique_activity_calendar_module'),
+            models.UniqueConstraint(
+                fields=['user'],
+                condition=models.Q(module__isnull=True),
+                name='unique_activity_calendar_global',
+            ),
+        ]
+
+    def __str__(self):
+        scope = self.module_id or 'global'
+        return f"Calendario de {self.user.username} ({scope})"
+
+    @property
+    def bits(self):
+        return day_bitmap.from_bytes(self.days)
+
+    def _index(self, day):
+        return (day - self.origin).days
+
+    def is_active(self, day):
+        index = self._index(day)
+        return index >= 0 and bool(self.bits >> index & 1)
+
+    def mark(self, day):
+        """Marca el día como activo. Devuelve True si no lo estaba."""
+        bits = self.bits
+        index = self._index(day)
+        if index < 0:
+            bits <<= -index
+            self.origin = day
+            index = 0
+        if bits >> index & 1:
+            return False
+        bits |= 1 << index
+        self.days = day_bitmap.to_bytes(bits)
+        self.longest_streak = day_bitmap.longest_run(bits)
+        if self.last_active is None or day > self.last_active:
+            self.last_active = day
+        return True
+
+    def current_streak(self, today):
+        """Días consecutivos activos hasta hoy (o hasta ayer si hoy aún no hay actividad)."""
+        bits = self.bits
+        index = self._index(today)
+        streak = day_bitmap.run_ending_at(bits, index)
+        return streak or day_bitmap.run_ending_at(bits, index - 1)
+
+    def active_days(self, today, days):
+        """Cantidad de días activos en los últimos `days` días, incluido hoy."""
+        return day_bitmap.count_in_window(self.bits, self._index(today), days)
+
+    @classmethod
+    def record(cls, user_id, module_id, day):
+        """Registra actividad del usuario en el día. Devuelve (calendario, día_nuevo)."""
+        try:
+            return cls._record(user_id, module_id, day)
+        except IntegrityError:
+            # Otro request creó el calendario entre la lectura y el insert: ahora se bloquea el existente
+            return cls._record(user_id, module_id, day)
+
+    @classmethod
+    def _record(cls, user_id, module_id, day):
+        with transaction.atomic():
+            calendar, _ = cls.objects.select_for_update().get_or_create(
+                user_id=user_id, module_id=module_id, defaults={'origin': day}
+            )
+            marked = calendar.mark(day)
+            if marked:
+                calendar.save(update_fields=['origin', 'days', 'longest_streak', 'last_active'])
+        return calendar, marked
+
+class Declaration(UserStateModel):
     PILLAR_CHOICES = [
         ('Vision', 'Visión'),
         ('Proposito', 'Propósito'),
@@ -301,14 +467,26 @@ class Declaration(models.Model):
     text = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # False hasta aplicar XP, rachas y misiones (api/utils/declaration_sync.py)
     synced = models.BooleanField(default=True)
+    # Id generado por el cliente offline; hace idempotentes los reintentos de sync
+    client_id = models.CharField(max_length=64, null=True, blank=True)
     class Meta:
         ordering = ['-created_at']
         unique_together = ['user', 'module', 'pillar', 'text']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'client_id'], name='declaration_user_client_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='declaration_user_cursor_idx'),
+            models.Index(fields=['user', 'module', '-created_at'], name='declaration_user_module_idx'),
+            # Solo las pendientes de efectos: el índice se mantiene casi vacío
+            models.Index(fields=['user'], condition=models.Q(synced=False), name='declaration_unsynced_idx'),
+        ]
     def __str__(self):
         return f"{self.user.username} - {self.module.name} - {self.pillar}: {self.text[:30]}"
 
-class UnlockedPillar(models.Model):
+class UnlockedPillar(UserStateModel):
     """Pilares desbloqueados por usuario en un módulo/área."""
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     module = models.ForeignKey(Module, on_delete=models.CASCADE)
@@ -316,10 +494,13 @@ class UnlockedPillar(models.Model):
     unlocked_at = models.DateTimeField(auto_now_add=True)
     class Meta:
         unique_together = ['user', 'module', 'pillar']
+        indexes = [
+            models.Index(fields=['user', '-unlocked_at', '-id'], name='unlockedpillar_user_cursor_idx'),
+        ]
     def __str__(self):
         return f"{self.user.username} - {self.module.name} - {self.pillar}"
 
-class Habit(models.Model):
+class Habit(UserStateModel):
     DIFFICULTY_CHOICES = [
         ('fácil', 'Fácil'),
         ('media', 'Media'),
@@ -340,10 +521,14 @@ class Habit(models.Model):
     nivel = models.PositiveIntegerField(default=1)
     estado = models.CharField(max_length=16, choices=STATE_CHOICES, default='incubando')
     ataque = models.DecimalField(max_digits=5, decimal_places=2, default=1.0)
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-id'], name='habit_user_cursor_idx'),
+        ]
     def __str__(self):
         return f"{self.nombre} ({self.user.username})"
 
-class ComfortWall(models.Model):
+class ComfortWall(UserStateModel):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     hp_actual = models.FloatField(default=100)
     hp_max = models.FloatField(default=100)
@@ -352,6 +537,235 @@ class ComfortWall(models.Model):
     def __str__(self):
         return f"Muro de {self.user.username} (Nivel {self.nivel_muro})"
 
+class UserProgressSummary(models.Model):
+    """
+    Proyección de los contadores de progreso del usuario.
+    La mantienen las rutas de escritura dentro de su misma transacción, de modo
+    que el resumen de progreso se sirve con una sola consulta.
+    """
+    COUNTERS = ('modules_unlocked', 'missions_completed', 'achievements_earned')
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='progress_summary')
+    modules_unlocked = models.IntegerField(default=0)
+    missions_completed = models.IntegerField(default=0)
+    achievements_earned = models.IntegerField(default=0)
+    current_streaks = JSONField(default=dict, blank=True)
+    # Se incrementa con cada cambio; sirve como validador HTTP del estado del usuario
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Resumen de progreso de {self.user.username}"
+
+    @classmethod
+    def compute(cls, user_ids):
+        """Recalcula los contadores desde las tablas de origen para varios usuarios."""
+        from django.db.models import Count
+        user_ids = list(user_ids)
+        values = {
+            user_id: {'modules_unlocked': 0, 'missions_completed': 0,
+                      'achievements_earned': 0, 'current_streaks': {}}
+            for user_id in user_ids
+        }
+        sources = (
+            ('modules_unlocked', ModuleProgress.objects.filter(state='unlocked')),
+            ('missions_completed', MissionProgress.objects.filter(state='completed')),
+            ('achievements_earned', UserAchievement.objects.all()),
+        )
+        for field, queryset in sources:
+            counts = (queryset.filter(user_id__in=user_ids)
+                .order_by()
+                .values('user_id')
+                .annotate(total=Count('id'))
+                .values_list('user_id', 'total'))
+            for user_id, total in counts:
+                values[user_id][field] = total
+        streaks = Streak.objects.filter(user_id__in=user_ids).values_list(
+            'user_id', 'module_id', 'current_streak'
+        )
+        for user_id, module_id, current_streak in streaks:
+            values[user_id]['current_streaks'][module_id] = current_streak
+        return values
+
+    @classmethod
+    def rebuild(cls, user_id):
+        """Recalcula y guarda el resumen de un usuario."""
+        from django.db.models import F
+        summary, _ = cls.objects.update_or_create(user_id=user_id, defaults=cls.compute([user_id])[user_id])
+        cls.objects.filter(pk=summary.pk).update(version=F('version') + 1)
+        summary.refresh_from_db(fields=['version'])
+        return summary
+
+    @classmethod
+    def for_user(cls, user):
+        """Devuelve el resumen del usuario (con su perfil), creándolo si no existe."""
+        summary = cls.objects.select_related('user__profile').filter(user=user).first()
+        if summary is None:
+            cls.rebuild(user.pk)
+            summary = cls.objects.select_related('user__profile').get(user=user)
+        return summary
+
+    @classmethod
+    def bump(cls, user_id, **deltas):
+        """Suma `deltas` a los contadores con una única actualización atómica."""
+        from django.db.models import F
+        from django.utils import timezone
+        changes = {field: F(field) + delta for field, delta in deltas.items() if delta}
+        if not changes:
+            return
+        changes['version'] = F('version') + 1
+        if not cls.objects.filter(user_id=user_id).update(updated_at=timezone.now(), **changes):
+            # Usuarios previos a la proyección: el recálculo ya incluye esta escritura
+            cls.rebuild(user_id)
+
+    @classmethod
+    def set_streak(cls, user_id, module_id, current_streak):
+        """Actualiza la racha actual de un módulo en el resumen."""
+        from django.db import transaction
+        with transaction.atomic():
+            summary = cls.objects.select_for_update().filter(user_id=user_id).first()
+            if summary is None:
+                cls.rebuild(user_id)
+                return
+            summary.current_streaks[str(module_id)] = current_streak
+            summary.version += 1
+            summary.save(update_fields=['current_streaks', 'version', 'updated_at'])
+
+
+class CatalogVersion(models.Model):
+    """
+    Versión del catálogo estático (módulos, misiones, logros y títulos).
+    Se incrementa con cada guardado o borrado, incluidas las cargas de fixtures,
+    y sirve como validador HTTP y como clave de invalidación de cachés.
+    """
+    CATALOG = 'catalog'
+
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+    @classmethod
+    def bump(cls, name=CATALOG):
+        from django.db.models import F
+        from django.utils import timezone
+        if not cls.objects.filter(name=name).update(version=F('version') + 1, updated_at=timezone.now()):
+            cls.objects.get_or_create(name=name, defaults={'version': 1})
+
+    @classmethod
+    def current(cls, name=CATALOG):
+        """Devuelve (versión, fecha de modificación) del catálogo."""
+        return cls.objects.filter(name=name).values_list('version', 'updated_at').first() or (0, None)
+
+
+
+class ChangeSequence(models.Model):
+    """Contador por usuario de los cambios registrados en UserChange."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='change_sequence')
+    value = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.value}"
+
+
+class UserChange(models.Model):
+    """
+    Último cambio de cada fila del estado de un usuario (progreso, rachas,
+    declaraciones, hábitos...). Hay una fila por objeto: cada cambio la
+    actualiza con el siguiente valor de ChangeSequence, y los borrados quedan
+    como tombstones con `deleted=True`. Ver api/utils/changes.py.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='changes')
+    kind = models.CharField(max_length=30)
+    object_id = models.BigIntegerField()
+    seq = models.PositiveBigIntegerField()
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'kind', 'object_id'], name='userchange_object_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'seq'], name='userchange_user_seq_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.kind}:{self.object_id} #{self.seq}"
+
+
+class SlowQuery(models.Model):
+    """
+    Consulta que superó `SLOW_QUERY_MS`, con el lugar del código que la hizo.
+    La tabla se mantiene acotada a las últimas `SLOW_QUERY_MAX_ROWS` filas.
+    """
+    fingerprint = models.CharField(max_length=16)
+    sql = models.TextField()
+    call_site = models.CharField(max_length=255)
+    line = models.PositiveIntegerField(default=0)
+    duration_ms = models.FloatField()
+    # EXPLAIN (ANALYZE) de una fracción de las consultas (SLOW_QUERY_EXPLAIN_RATE)
+    plan = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='slowquery_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.call_site} ({self.duration_ms:.0f} ms)"
+
+
+class Task(models.Model):
+    """
+    Efecto secundario diferido que ejecuta el worker `run_tasks` (ver
+    api/utils/tasks.py). Solo puede haber una tarea pendiente por `key`: las
+    que llegan mientras tanto se fusionan con ella.
+    """
+    STATE_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('failed', 'Failed'),
+    ]
+    key = models.CharField(max_length=200)
+    # Ruta de la función, p. ej. api.utils.declaration_sync.apply_pending_declarations
+    function = models.CharField(max_length=200)
+    kwargs = models.JSONField(default=dict)
+    state = models.CharField(max_length=10, choices=STATE_CHOICES, default='pending')
+    run_after = models.DateTimeField()
+    attempts = models.PositiveSmallIntegerField(default=0)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['key'], condition=models.Q(state='pending'),
+                                    name='task_pending_key_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['state', 'run_after'], name='task_state_run_after_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.state})"
+
+@receiver(post_save, sender=Module)
+@receiver(post_save, sender=Mission)
+@receiver(post_save, sender=Achievement)
+@receiver(post_save, sender=LevelTitle)
+@receiver(post_delete, sender=Module)
+@receiver(post_delete, sender=Mission)
+@receiver(post_delete, sender=Achievement)
+@receiver(post_delete, sender=LevelTitle)
+def bump_catalog_version(sender, **kwargs):
+    from .utils.catalog import invalidate_catalog
+    CatalogVersion.bump()
+    invalidate_catalog()
+
 # --- DESBLOQUEO SECUENCIAL DE CONSTELACIONES ---
 from django.db.models.signals import post_save
 from django.dispatch import receiver
@@ -364,12 +778,18 @@ def check_and_unlock_next_module(sender, instance, created, **kwargs):
     Cuando el usuario tiene al menos una declaración en cada pilar de un módulo,
     desbloquea el siguiente módulo (constelación) en orden.
     """
-    logger = logging.getLogger("api.models")
-    if not created:
+    # Las pendientes (synced=False) se procesan en api/utils/declaration_sync.py
+    if not created or not instance.synced:
         return
+    unlock_next_module_if_declared(instance.user, instance.module_id)
 
-    user = instance.user
-    module = instance.module
+def unlock_next_module_if_declared(user, module_id):
+    """
+    Desbloquea el módulo siguiente a `module_id` si el usuario ya declaró en
+    todos sus pilares. También lo usa la sincronización en lote, donde
+    `bulk_create` no dispara post_save.
+    """
+    logger = logging.getLogger("api.models")
 
     # Obtener todos los pilares requeridos para el módulo actual
     required_pillars = [choice[0] for choice in Declaration.PILLAR_CHOICES]
@@ -377,28 +797,17 @@ def check_and_unlock_next_module(sender, instance, created, **kwargs):
     # Verificar si el usuario tiene al menos una declaración en cada pilar de este módulo
     user_pillars = Declaration.objects.filter(
         user=user,
-        module=module
+        module_id=module_id
     ).values_list('pillar', flat=True).distinct()
 
-    logger.info(f"[DEBUG] Declaraciones para usuario {user.username} en módulo {module.id}: {list(user_pillars)}")
-    logger.info(f"[DEBUG] Pilares requeridos: {required_pillars}")
-
     if set(required_pillars).issubset(set(user_pillars)):
-        logger.info(f"[DEBUG] Usuario {user.username} completó todos los pilares de {module.id}. Intentando desbloquear siguiente módulo...")
         # Buscar el siguiente módulo por orden
-        next_module = Module.objects.filter(order__gt=module.order).order_by('order').first()
+        from .utils.catalog import get_catalog
+        next_module = get_catalog().next_module(module_id)
         if next_module:
-            logger.info(f"[DEBUG] Siguiente módulo a desbloquear: {next_module.id}")
             # Desbloquear el siguiente módulo para el usuario
             progress, created = ModuleProgress.objects.get_or_create(user=user, module=next_module)
-            logger.info(f"[DEBUG] Estado actual de ModuleProgress: {progress.state}")
             if progress.state == 'locked':
                 progress.unlock()
                 progress.save()
-                logger.info(f"[DEBUG] Módulo {next_module.id} desbloqueado para {user.username}")
-            else:
-                logger.info(f"[DEBUG] Módulo {next_module.id} ya estaba desbloqueado para {user.username}")
-        else:
-            logger.info(f"[DEBUG] No hay siguiente módulo para desbloquear.")
-    else:
-        logger.info(f"[DEBUG] Usuario {user.username} aún no tiene declaraciones en todos los pilares de {module.id}")
+                logger.info("Módulo %s desbloqueado para el usuario %s", next_module.id, user.pk)
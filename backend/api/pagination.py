@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Paginación por cursor (keyset) para los listados del usuario.
+"""
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Paginación por cursor sobre (created_at, id) o el orden que declare la vista
+    en `cursor_ordering`. Cada página es un rango del índice compuesto, así que
+    su costo no depende de la profundidad.
+
+    A diferencia de CursorPagination, la posición del cursor guarda todos los
+    campos del orden y no solo el primero: las filas con la misma fecha se
+    separan por id, sin recurrir al desplazamiento (offset) de DRF.
+
+    Es opcional: solo se pagina si la petición trae `cursor` o `page_size`; sin
+    ellos la respuesta sigue siendo la lista completa, como antes.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def get_ordering(self, request, queryset, view):
+        return getattr(view, 'cursor_ordering', self.ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        # DRF filtra solo por el primer campo; el filtro compuesto se aplica aquí
+        cursor = super().decode_cursor(request)
+        position = cursor.position if cursor else None
+        if position is not None:
+            ordering = self.get_ordering(request, queryset, view)
+            queryset = queryset.filter(self._after(ordering, self._values(position, ordering), cursor.reverse))
+
+        page = super().paginate_queryset(queryset, request, view)
+        if position is not None:
+            if self.cursor.reverse:
+                self.has_next, self.next_position = True, position
+            else:
+                self.has_previous, self.previous_position = True, position
+            self.display_page_controls = self.template is not None
+        return page
+
+    def decode_cursor(self, request):
+        # paginate_queryset ya filtró por la posición
+        cursor = super().decode_cursor(request)
+        return cursor._replace(position=None) if cursor else None
+
+    def _get_position_from_instance(self, instance, ordering):
+        fields = [field.lstrip('-') for field in ordering]
+        if isinstance(instance, dict):
+            return json.dumps([str(instance[field]) for field in fields])
+        return json.dumps([str(getattr(instance, field)) for field in fields])
+
+    def _values(self, position, ordering):
+        try:
+            values = json.loads(position)
+        except ValueError:
+            values = None
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    @staticmethod
+    def _after(ordering, values, reverse):
+        """Filas posteriores a la posición en el sentido del recorrido."""
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') != reverse else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
@@ -25,6 +25,8 @@ from .habit_serializers import HabitSerializer
 from .comfortwall_serializers import ComfortWallSerializer
 from .misc_serializers import (
     DeclarationSerializer,
+    DeclarationSyncItemSerializer,
+    DeclarationSyncSerializer,
     UnlockedPillarSerializer,
     ProgressOverviewSerializer,
 )
@@ -46,6 +48,8 @@ __all__ = [
     "HabitSerializer",
     "ComfortWallSerializer",
     "DeclarationSerializer",
+    "DeclarationSyncItemSerializer",
+    "DeclarationSyncSerializer",
     "UnlockedPillarSerializer",
     "ProgressOverviewSerializer",
 ]
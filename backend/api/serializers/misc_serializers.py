@@ -1,5 +1,5 @@
 """
-Serializers misceláneos: Declaration, UnlockedPillar, ProgressOverview.
+Serializers misceláneos: Declaration (y su sincronización en lote), UnlockedPillar, ProgressOverview.
 """
 
 from rest_framework import serializers
@@ -9,8 +9,33 @@ class DeclarationSerializer(serializers.ModelSerializer):
     """Serializer for user declarations."""
     class Meta:
         model = Declaration
-        fields = ('id', 'user', 'module', 'pillar', 'text', 'created_at', 'updated_at', 'synced')
-        read_only_fields = ('id', 'created_at', 'updated_at', 'user')
+        fields = ('id', 'user', 'module', 'pillar', 'text', 'created_at', 'updated_at', 'synced', 'client_id')
+        read_only_fields = ('id', 'created_at', 'updated_at', 'user', 'client_id', 'synced')
+
+class DeclarationSyncItemSerializer(serializers.Serializer):
+    """Declaración creada offline; el módulo se valida contra el catálogo en memoria."""
+    client_id = serializers.CharField(max_length=64)
+    module = serializers.CharField()
+    pillar = serializers.ChoiceField(choices=Declaration.PILLAR_CHOICES)
+    text = serializers.CharField()
+
+    def validate_module(self, value):
+        from ..utils.catalog import get_catalog
+        if get_catalog().module(value) is None:
+            raise serializers.ValidationError(f'Módulo "{value}" no existe.')
+        return value
+
+class DeclarationSyncSerializer(serializers.Serializer):
+    """Lote de /declarations/sync/; cada elemento se valida por separado."""
+    declarations = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+
+    def validate_declarations(self, value):
+        from django.conf import settings
+        if len(value) > settings.DECLARATION_SYNC_MAX_ITEMS:
+            raise serializers.ValidationError(
+                f'Máximo {settings.DECLARATION_SYNC_MAX_ITEMS} declaraciones por lote.'
+            )
+        return value
 
 class UnlockedPillarSerializer(serializers.ModelSerializer):
     """Serializer for unlocked pillars."""
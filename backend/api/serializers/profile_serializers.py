@@ -6,7 +6,8 @@ from rest_framework import serializers
 from .user_serializers import UserSerializer, UserWriteSerializer
 from ..models import Profile
 from ..utils.serializers_helpers import (
-    get_title, get_first_name, get_last_name, update_user_fields, get_active_missions
+    get_title, get_first_name, get_last_name, update_user_fields, get_active_missions,
+    attach_modules, user_rows
 )
 
 class ProfileSerializer(serializers.ModelSerializer):
@@ -63,22 +64,30 @@ class UserProfileDetailSerializer(serializers.ModelSerializer):
     def get_module_progress(self, obj):
         from .module_serializers import ModuleProgressSerializer
         from ..models import ModuleProgress
-        return ModuleProgressSerializer(ModuleProgress.objects.filter(user=obj.user), many=True).data
+        progress = attach_modules(
+            user_rows(self.context, 'module_progress', ModuleProgress.objects.filter(user=obj.user)), self.context
+        )
+        return ModuleProgressSerializer(progress, many=True).data
 
     def get_achievements(self, obj):
         from .achievement_serializers import UserAchievementSerializer
         from ..models import UserAchievement
-        return UserAchievementSerializer(UserAchievement.objects.filter(user=obj.user), many=True).data
+        achievements = UserAchievement.objects.filter(user=obj.user).select_related('achievement')
+        return UserAchievementSerializer(achievements, many=True).data
 
     def get_streaks(self, obj):
         from .streak_serializers import StreakSerializer
         from ..models import Streak
-        return StreakSerializer(Streak.objects.filter(user=obj.user), many=True).data
+        streaks = attach_modules(
+            user_rows(self.context, 'streaks', Streak.objects.filter(user=obj.user)), self.context
+        )
+        return StreakSerializer(streaks, many=True).data
 
     def get_active_missions(self, obj):
         from drf_spectacular.utils import extend_schema_field
         from .mission_serializers import MissionProgressSerializer
-        active_missions = get_active_missions(obj.user)
+        active_missions = list(user_rows(self.context, 'active_missions', get_active_missions(obj.user)))
+        attach_modules((mp.mission for mp in active_missions), self.context)
         return MissionProgressSerializer(active_missions, many=True).data
 
     def get_first_name(self, obj):
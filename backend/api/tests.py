@@ -1,3 +1,1612 @@
-from django.test import TestCase
+"""
+Pruebas de la API Dividis.
+"""
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from collections import namedtuple
+from datetime import date, timedelta
+from importlib import import_module
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.apps import apps as django_apps
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, QuerySet
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .models import (
+    Achievement, ActivityCalendar, ComfortWall, Declaration, Habit, Mission, MissionProgress, Module, ModuleProgress,
+    Profile, SlowQuery, Streak, Task, UnlockedPillar, UserAchievement, UserChange, UserProgressSummary,
+    XPEvent
+)
+from . import async_views, urls as api_urls
+from .utils.async_queries import gather
+from .utils.benchmarking import rollback_after
+from .wellness_survey import histograms
+from .wellness_survey.models import WellnessAnswerHistogram, WellnessSurveyAnswer, WellnessSurveySession
+from .wellness_survey.questions import get_question_set
+from .wellness_survey.serializers import WellnessSurveyAnswerListSerializer
+from .utils.catalog import get_catalog
+from .utils import day_bitmap, events, metrics, module_unlocks, slow_queries, tasks, xp
+from .utils.hot_queries import HOT_QUERIES, explain
+from .utils.mission_logic import check_and_complete_missions
+
+
+class MissionBoardTests(TestCase):
+    """Tablero de /user-missions/: estado de cada misión y progreso de las globales."""
+    fixtures = ['initial_modules', 'initial_missions']
+
+    def setUp(self):
+        self.user = User.objects.create_user('tablero', 'tablero@example.com', 'clave-segura-123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # Una misión global por evaluador; las de los fixtures no tienen progreso calculado
+        for frequency, title in [('daily', 'Declara hoy'), ('weekly', 'Racha de cinco días'),
+                                 ('weekly', 'Desbloquea un módulo')]:
+            Mission.objects.create(title=title, description='', frequency=frequency, xp_reward=10)
+
+    def board(self):
+        response = self.client.get(reverse('user-missions'))
+        self.assertEqual(response.status_code, 200)
+        return {row['title']: row for row in response.json()}
+
+    def summary(self, row):
+        return (row['type'], row.get('module_id'), row['state'], row['progress'])
+
+    def test_new_user(self):
+        board = self.board()
+        self.assertEqual(len(board), 23)
+        self.assertEqual(board['Muévete hoy'], {
+            'id': '11111111-1111-1111-1111-111111111111',
+            'title': 'Muévete hoy',
+            'description': 'Registra 15 minutos de actividad física, como caminar, estirarte o hacer ejercicio.',
+            'xp_reward': 20,
+            'frequency': 'daily',
+            'requirements': [],
+            'type': 'module',
+            'module_id': 'salud',
+            'state': 'active',
+            'progress': None,
+            'started_at': None,
+            'completed_at': None,
+        })
+        self.assertEqual(self.summary(board['Declara hoy']),
+                         ('global', None, 'active', {'current': 0, 'target': 1, 'label': '0/1 declaraciones hoy'}))
+        self.assertEqual(self.summary(board['Racha de cinco días']), ('global', None, 'active', {
+            'current': 0, 'target': 5, 'label': '0/5 días de racha consecutiva'}))
+        self.assertEqual(self.summary(board['Desbloquea un módulo']), ('global', None, 'active', {
+            'current': 0, 'target': 1, 'label': '0/1 módulos desbloqueados esta semana'}))
+        self.assertEqual(self.summary(board['Equilibrio semanal']), ('global', None, 'active', None))
+        # Solo salud está desbloqueado para un usuario nuevo
+        self.assertEqual(
+            {row['module_id'] for row in board.values() if row['type'] == 'module' and row['state'] != 'blocked'},
+            {'salud'})
+
+    def test_progress_and_global_missions(self):
+        progress = {}
+        for title, state in [('Muévete hoy', 'completed'), ('Afirmación positiva', 'failed'),
+                             ('Organiza tu día laboral', 'active')]:
+            progress[title] = MissionProgress.objects.create(
+                user=self.user, mission=Mission.objects.get(title=title), state=state,
+                completed_at=timezone.now() if state == 'completed' else None)
+        # Declaración de hoy, racha global de 5 días y personalidad desbloqueado a mano esta semana
+        Declaration.objects.create(user=self.user, module_id='salud', pillar='Vision', text='Hoy')
+        today = timezone.now().date()
+        for offset in range(5):
+            ActivityCalendar.record(self.user.pk, None, today - timedelta(days=offset))
+        ModuleProgress.objects.filter(user=self.user, module_id='personalidad').update(
+            state='unlocked', auto_unlocked=False, last_activity=timezone.now())
+
+        board = self.board()
+        self.assertEqual(self.summary(board['Declara hoy']),
+                         ('global', None, 'completed', {'current': 1, 'target': 1, 'label': '1/1 declaraciones hoy'}))
+        self.assertEqual(self.summary(board['Racha de cinco días']), ('global', None, 'completed', {
+            'current': 5, 'target': 5, 'label': '5/5 días de racha consecutiva'}))
+        self.assertEqual(self.summary(board['Desbloquea un módulo']), ('global', None, 'completed', {
+            'current': 1, 'target': 1, 'label': '1/1 módulos desbloqueados esta semana'}))
+        self.assertEqual(self.summary(board['Muévete hoy']), ('module', 'salud', 'completed', None))
+        self.assertEqual(self.summary(board['Afirmación positiva']), ('module', 'personalidad', 'failed', None))
+        self.assertEqual(self.summary(board['Autoconocimiento profundo']), ('module', 'personalidad', 'active', None))
+        # Carrera sigue bloqueado aunque tenga progreso
+        self.assertEqual(self.summary(board['Organiza tu día laboral']), ('module', 'carrera', 'blocked', None))
+
+        completed = progress['Muévete hoy']
+        self.assertEqual(parse_datetime(board['Muévete hoy']['started_at']), completed.started_at)
+        self.assertEqual(parse_datetime(board['Muévete hoy']['completed_at']), completed.completed_at)
+        self.assertIsNone(board['Semana activa']['started_at'])
+
+
+class ModuleUnlockEngineTests(TestCase):
+    """Desbloqueo en lote de módulos por XP y, para Personalidad, por la misión de racha."""
+    fixtures = ['initial_modules', 'initial_missions']
+
+    def setUp(self):
+        # La misión de racha global no está en los fixtures
+        self.streak_mission = Mission.objects.create(
+            id=module_unlocks.STREAK_MISSION_ID, title="Racha", description="Racha global")
+
+    def make_user(self, name, experience_points, streak_done=False, drop_rows=False):
+        user = User.objects.create_user(name, f'{name}@example.com', 'clave-segura-123')
+        Profile.objects.filter(user=user).update(experience_points=experience_points)
+        if streak_done:
+            MissionProgress.objects.create(user=user, mission=self.streak_mission, state='completed')
+        if drop_rows:
+            ModuleProgress.objects.filter(user=user).exclude(state='unlocked').delete()
+        return user
+
+    def unlocked_modules(self, user):
+        return set(ModuleProgress.objects.filter(user=user, state='unlocked').values_list('module_id', flat=True))
+
+    def test_unlocks_by_rules(self):
+        later = ['intelecto', 'carrera', 'finanzas', 'calidad-vida', 'emocionalidad', 'relaciones', 'vision']
+        users = [
+            self.make_user('motor0', 0),
+            self.make_user('motor1', 150, drop_rows=True),
+            # Personalidad pide 200 XP y la misión de racha, no su xp_required
+            self.make_user('motor2', 250),
+            self.make_user('motor3', 250, streak_done=True, drop_rows=True),
+            self.make_user('motor4', 5000, streak_done=True),
+        ]
+        summaries_before = dict(UserProgressSummary.objects.values_list('user_id', 'modules_unlocked'))
+
+        unlocked = module_unlocks.evaluate_module_unlocks_bulk([user.pk for user in users])
+        self.assertEqual(sorted(unlocked), sorted(
+            [(users[3].pk, 'personalidad')] + [(users[4].pk, module_id) for module_id in ['personalidad'] + later]))
+        self.assertEqual([self.unlocked_modules(user) for user in users], [
+            {'salud'}, {'salud'}, {'salud'}, {'salud', 'personalidad'}, {'salud', 'personalidad', *later},
+        ])
+        for user in users:
+            # Las filas borradas se recrean bloqueadas
+            self.assertEqual(ModuleProgress.objects.filter(user=user).count(), Module.objects.count())
+            self.assertEqual(UserProgressSummary.objects.get(user=user).modules_unlocked,
+                             summaries_before[user.pk] + len(self.unlocked_modules(user)) - 1)
+        # Sin cambios en las entradas, una segunda pasada no hace nada
+        self.assertEqual(module_unlocks.evaluate_module_unlocks_bulk([user.pk for user in users]), [])
+
+    def test_xp_threshold_is_inclusive(self):
+        user = self.make_user('umbral', 999)
+        self.assertEqual(module_unlocks.evaluate_module_unlocks(user), [])
+        Profile.objects.filter(user=user).update(experience_points=1000)
+        self.assertEqual(module_unlocks.evaluate_module_unlocks(user), [(user.pk, 'intelecto')])
+        self.assertEqual(self.unlocked_modules(user), {'salud', 'intelecto'})
+
+
+class ProgressSummaryTests(TestCase):
+    """Los contadores de /progress/overview/ siguen a las escrituras y se pueden reconstruir."""
+    fixtures = ['initial_modules', 'initial_missions']
+    fields = ('total_xp', 'modules_unlocked', 'missions_completed', 'achievements_earned', 'current_streaks')
+
+    def setUp(self):
+        self.user = User.objects.create_user('resumen', 'resumen@example.com', 'clave-segura-123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def overview(self):
+        data = self.client.get(reverse('progress-overview')).json()
+        return tuple(data[field] for field in self.fields)
+
+    def test_overview_follows_writes(self):
+        # Usuario nuevo: solo Salud desbloqueado
+        self.assertEqual(self.overview(), (0, 1, 0, 0, {}))
+
+        # 20 XP por pilar de Salud; la primera declaración completa Muévete hoy (sin requisitos) y su cadena
+        for pillar in ('Vision', 'Proposito'):
+            response = self.client.post(reverse('declaration-list'), {
+                'module': 'salud', 'pillar': pillar, 'text': f'Declaración {pillar}'}, format='json')
+            self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.overview(), (40, 1, 3, 0, {'salud': 1}))
+
+        Profile.objects.filter(user=self.user).update(experience_points=F('experience_points') + 2000)
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.client.post(reverse('module-unlock', kwargs={'module_id': 'carrera'})).status_code, 200)
+        self.assertEqual(self.overview(), (2040, 2, 3, 0, {'salud': 1}))
+
+        # La misión suma 15 XP y reevalúa los desbloqueos: Intelecto y Finanzas ya tienen XP suficiente
+        mission = Mission.objects.get(title='Organiza tu día laboral')
+        response = self.client.post(reverse('mission-complete', kwargs={'mission_id': mission.pk}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.overview(), (2055, 4, 4, 0, {'salud': 1, 'carrera': 1}))
+
+        achievement = Achievement.objects.create(name='Primer paso', description='', icon='star')
+        UserAchievement.objects.create(user=self.user, achievement=achievement)
+        self.assertEqual(self.overview(), (2055, 4, 4, 1, {'salud': 1, 'carrera': 1}))
+
+    def test_rebuild_command_repairs_drift(self):
+        other = User.objects.create_user('resumen2', 'resumen2@example.com', 'clave-segura-123')
+        MissionProgress.objects.create(user=self.user, mission=Mission.objects.get(title='Muévete hoy'),
+                                       state='completed')
+        Streak.objects.create(user=self.user, module_id='salud', current_streak=2)
+        UserProgressSummary.objects.filter(user=self.user).update(missions_completed=7, modules_unlocked=0)
+        UserProgressSummary.objects.filter(user=other).delete()
+
+        out = io.StringIO()
+        call_command('rebuild_progress_summaries', dry_run=True, stdout=out)
+        self.assertIn('Resúmenes faltantes: 1', out.getvalue())
+        self.assertIn('missions_completed: 1 usuarios con diferencias', out.getvalue())
+        self.assertIn('modules_unlocked: 1 usuarios con diferencias', out.getvalue())
+        self.assertEqual(UserProgressSummary.objects.get(user=self.user).missions_completed, 7)
+        self.assertFalse(UserProgressSummary.objects.filter(user=other).exists())
+
+        call_command('rebuild_progress_summaries', chunk_size=1, stdout=io.StringIO())
+        fields = UserProgressSummary.COUNTERS + ('current_streaks',)
+        self.assertEqual(
+            {user.username: tuple(getattr(UserProgressSummary.objects.get(user=user), field) for field in fields)
+             for user in (self.user, other)},
+            {'resumen': (1, 1, 0, {'salud': 2}), 'resumen2': (1, 0, 0, {})})
+
+        out = io.StringIO()
+        call_command('rebuild_progress_summaries', dry_run=True, stdout=out)
+        self.assertIn('Resúmenes faltantes: 0', out.getvalue())
+        self.assertNotIn(' 1 usuarios con diferencias', out.getvalue())
+
+
+@override_settings(DOMAIN_CATALOG_CHECK_SECONDS=3600)
+class QueryCountTests(TestCase):
+    """
+    Fija el número de consultas de los endpoints que anidan ModuleSerializer.
+    Los listados condicionales suman una consulta para su validador. El catálogo
+    de dominio se precarga para que su construcción no entre en la cuenta.
+    """
+    fixtures = ['initial_modules', 'initial_missions']
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('tester', 'tester@example.com', 'clave-segura-123')
+        ModuleProgress.objects.filter(user=cls.user, module_id__in=['personalidad', 'intelecto']).update(state='unlocked')
+        for mission in Mission.objects.filter(module__isnull=False):
+            MissionProgress.objects.create(user=cls.user, mission=mission)
+        for module in Module.objects.all():
+            Streak.objects.create(user=cls.user, module=module, current_streak=1)
+        achievement = Achievement.objects.create(name='Primer paso', description='', icon='star')
+        UserAchievement.objects.create(user=cls.user, achievement=achievement)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        get_catalog()
+
+    def add_modules(self, count):
+        """Amplía el catálogo para comprobar que las consultas no crecen con él."""
+        for i in range(count):
+            module = Module.objects.create(id=f'extra-{i}', name=f'Extra {i}', description='', icon='star', order=100 + i)
+            ModuleProgress.objects.create(user=self.user, module=module, state='unlocked')
+            Streak.objects.create(user=self.user, module=module)
+            mission = Mission.objects.create(module=module, title=f'Extra {i}', description='')
+            MissionProgress.objects.create(user=self.user, mission=mission)
+        get_catalog()
+
+    def test_me_query_count(self):
+        with self.assertNumQueries(6):
+            response = self.client.get(reverse('me'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['module_progress']), Module.objects.count())
+
+        self.add_modules(5)
+        with self.assertNumQueries(6):
+            self.client.get(reverse('me'))
+
+    def test_missions_query_count(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('mission-list'))
+        self.assertEqual(response.status_code, 200)
+        states = {mission['module']['id']: mission['module']['state'] for mission in response.data}
+        self.assertEqual(states['personalidad'], 'unlocked')
+
+        self.add_modules(5)
+        with self.assertNumQueries(3):
+            self.client.get(reverse('mission-list'))
+
+    def test_modules_query_count(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('module-list'))
+        states = {module['id']: module['state'] for module in response.data}
+        self.assertEqual(states['salud'], 'unlocked')
+        self.assertEqual(states['vision'], 'locked')
+
+
+class RequirementGraphTests(TestCase):
+    """La evaluación compilada completa las misiones cuyos requisitos (pilar, módulo, misión) se cumplen."""
+    fixtures = ['initial_modules', 'initial_missions']
+
+    def setUp(self):
+        self.user = User.objects.create_user('requisitos', 'requisitos@example.com', 'clave-segura-123')
+        self.module = Module.objects.create(id='requisitos', name='Requisitos', description='', icon='star', order=99)
+        ModuleProgress.objects.update_or_create(user=self.user, module=self.module, defaults={'state': 'unlocked'})
+        Declaration.objects.create(user=self.user, module=self.module, pillar='Vision', text='Visión')
+
+        def mission(title, *requirements):
+            return Mission.objects.create(module=self.module, title=title, description='',
+                                          requirements=list(requirements))
+
+        vision = mission('Visión', {'type': 'pillar', 'id': 'Vision'})
+        chained = mission('Encadenada', {'type': 'mission', 'id': str(vision.pk)}, {'type': 'pillar', 'id': 'Vision'})
+        mission('Doble cadena', {'type': 'mission', 'id': str(chained.pk)})
+        mission('Módulo propio', {'type': 'module', 'id': self.module.pk})
+        mission('Sin requisitos')
+        mission('Pilar faltante', {'type': 'pillar', 'id': 'Creencias'})
+        mission('Módulo bloqueado', {'type': 'module', 'id': 'carrera'})
+        mission('Cadena rota', {'type': 'mission', 'id': str(uuid.uuid4())})
+
+    def states(self):
+        return dict(MissionProgress.objects.filter(user=self.user, mission__module=self.module)
+                    .values_list('mission__title', 'state'))
+
+    def test_completes_satisfied_missions(self):
+        completed = check_and_complete_missions(self.user, self.module, 'Vision')
+        # Las cadenas se resuelven en la misma pasada; las misiones sin cumplir no tienen progreso
+        self.assertEqual(self.states(), {
+            'Visión': 'completed', 'Encadenada': 'completed', 'Doble cadena': 'completed',
+            'Módulo propio': 'completed', 'Sin requisitos': 'completed',
+        })
+        self.assertEqual(sorted(completed), sorted(str(pk) for pk in MissionProgress.objects.filter(
+            user=self.user, mission__module=self.module).values_list('mission_id', flat=True)))
+        self.assertEqual(UserProgressSummary.objects.get(user=self.user).missions_completed, 5)
+        self.assertEqual(check_and_complete_missions(self.user, self.module, 'Vision'), [])
+
+    def test_failed_mission_is_skipped(self):
+        failed = Mission.objects.get(module=self.module, title='Sin requisitos')
+        MissionProgress.objects.create(user=self.user, mission=failed, state='failed')
+        # La transición failed -> completed no es válida: se salta esa misión y sigue con las demás
+        completed = check_and_complete_missions(self.user, self.module, 'Vision')
+        self.assertNotIn(str(failed.pk), completed)
+        self.assertEqual(len(completed), 4)
+        self.assertEqual(self.states(), {
+            'Visión': 'completed', 'Encadenada': 'completed', 'Doble cadena': 'completed',
+            'Módulo propio': 'completed', 'Sin requisitos': 'failed',
+        })
+
+
+class ConditionalGetTests(TestCase):
+    """Respuestas 304 de los endpoints de catálogo."""
+    fixtures = ['initial_modules', 'initial_missions']
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('tester', 'tester@example.com', 'clave-segura-123')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_not_modified_skips_queryset(self):
+        for name in ('module-list', 'mission-list', 'achievement-list'):
+            etag = self.client.get(reverse(name))['ETag']
+            with self.assertNumQueries(1):
+                response = self.client.get(reverse(name), HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+
+    def test_catalog_change_invalidates(self):
+        etag = self.client.get(reverse('achievement-list'))['ETag']
+        Achievement.objects.create(name='Nuevo', description='', icon='star')
+        response = self.client.get(reverse('achievement-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+
+    def test_user_state_change_invalidates(self):
+        etag = self.client.get(reverse('module-list'))['ETag']
+        ModuleProgress.objects.get(user=self.user, module_id='salud').complete()
+        response = self.client.get(reverse('module-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        states = {module['id']: module['state'] for module in response.data}
+        self.assertEqual(states['salud'], 'completed')
+
+
+class DomainCatalogTests(TestCase):
+    fixtures = ['initial_modules', 'initial_missions']
+
+    def test_indexes_follow_module_order(self):
+        catalog = get_catalog()
+        orders = [catalog.order_of(module_id) for module_id in catalog.module_order]
+        self.assertEqual(orders, sorted(orders))
+        first, second = catalog.module_order[:2]
+        self.assertEqual(catalog.next_module(first).id, second)
+        self.assertIsNone(catalog.next_module(catalog.module_order[-1]))
+
+    def test_local_change_rebuilds_catalog(self):
+        catalog = get_catalog()
+        Module.objects.create(id='extra', name='Extra', description='', icon='star', order=999)
+        rebuilt = get_catalog()
+        self.assertIsNot(rebuilt, catalog)
+        self.assertGreater(rebuilt.version, catalog.version)
+        self.assertEqual(rebuilt.next_module(catalog.module_order[-1]).id, 'extra')
+
+    def test_views_that_resolve_catalog_objects(self):
+        user = User.objects.create_user('catalogo', 'catalogo@example.com', 'clave-segura-123')
+        client = APIClient()
+        client.force_authenticate(user)
+        mission = Mission.objects.filter(module_id='salud').first()
+        response = client.post(reverse('mission-complete', kwargs={'mission_id': mission.pk}))
+        self.assertEqual((response.status_code, response.data['state']), (200, 'completed'))
+        self.assertEqual(client.post(reverse('mission-complete', kwargs={'mission_id': uuid.uuid4()})).status_code, 404)
+
+        response = client.get(reverse('module-progress', kwargs={'module_id': 'salud'}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([m['mission']['id'] for m in response.data['missions']], [str(mission.pk)])
+        self.assertEqual(client.get(reverse('module-progress', kwargs={'module_id': 'no-existe'})).status_code, 404)
+
+
+# Marcas de recorrido completo de tabla en la salida de EXPLAIN de cada motor
+FULL_SCAN = {
+    'postgresql': re.compile(r'Seq Scan'),
+    'sqlite': re.compile(r'\bSCAN '),
+}
+
+
+@skipUnless(connection.vendor in FULL_SCAN, "EXPLAIN no soportado para este motor")
+class HotQueryPlanTests(TestCase):
+    """Las consultas de HOT_QUERIES deben resolverse con índices."""
+    fixtures = ['initial_modules', 'initial_missions']
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = None
+        for n in range(5):
+            user = User.objects.create_user(f'usuario{n}', f'usuario{n}@example.com', 'clave-segura-123')
+            Declaration.objects.bulk_create([
+                Declaration(user=user, module_id=module_id, pillar=pillar, text=f'{module_id}-{pillar}-{i}')
+                for module_id in ('salud', 'personalidad')
+                for pillar, _ in Declaration.PILLAR_CHOICES
+                for i in range(10)
+            ])
+            MissionProgress.objects.bulk_create([
+                MissionProgress(user=user, mission=mission, state='completed' if i % 2 else 'active')
+                for i, mission in enumerate(Mission.objects.all())
+            ])
+            cls.user = cls.user or user
+
+    def test_hot_queries_avoid_full_scans(self):
+        full_scan = FULL_SCAN[connection.vendor]
+        if connection.vendor == 'postgresql':
+            # Con pocas filas el planificador prefiere Seq Scan aunque exista el índice
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        for name in HOT_QUERIES:
+            with self.subTest(query=name):
+                plan = explain(name, self.user, 'salud')
+                self.assertIsNone(full_scan.search(plan), f"{name} recorre la tabla completa:\n{plan}")
+
+
+# Presupuesto por endpoint: consultas máximas y milisegundos (mediana) máximos.
+# Los milisegundos solo se verifican con API_BUDGET_TIMING=1 (dependen de la máquina).
+# Cada escritura de estado del usuario suma 2 consultas del registro de cambios
+# (contador y UserChange, en su misma transacción; ver api/utils/changes.py).
+# `kwargs` y `data` reciben el caso de prueba para usar los objetos sembrados.
+Endpoint = namedtuple('Endpoint', 'name method kwargs data status max_queries max_ms')
+
+ENDPOINTS = [
+    Endpoint('register', 'post', None, lambda t: {
+        'username': 'nuevo', 'email': 'nuevo@example.com', 'password': 'clave-segura-123'}, 201, 30, 200),
+    Endpoint('me', 'get', None, None, 200, 6, 150),
+    Endpoint('me', 'patch', None, lambda t: {'first_name': 'Ana'}, 200, 9, 150),
+    Endpoint('profile-update', 'patch', None, lambda t: {'last_name': 'Pérez'}, 200, 1, 100),
+    Endpoint('module-unlock', 'post', lambda t: {'module_id': 'carrera'}, None, 200, 11, 100),
+    Endpoint('mission-complete', 'post', lambda t: {'mission_id': t.mission.pk}, None, 200, 52, 250),
+    Endpoint('user-missions', 'get', None, None, 200, 3, 150),
+    Endpoint('progress-overview', 'get', None, None, 200, 1, 100),
+    Endpoint('module-progress', 'get', lambda t: {'module_id': 'salud'}, None, 200, 4, 100),
+    Endpoint('sync-changes', 'get', None, lambda t: {'since': 0}, 200, 6, 100),
+    Endpoint('bootstrap', 'get', None, None, 200, 6, 250),
+    Endpoint('events-token', 'post', None, None, 200, 0, 50),
+    Endpoint('wellness-survey-questions', 'get', None, None, 200, 0, 50),
+    Endpoint('wellness-survey-answers', 'get', None, None, 200, 2, 100),
+    Endpoint('wellness-survey-answers', 'post', None, lambda t: t.survey, 201, 7, 200),
+    Endpoint('wellness-survey-benchmarks', 'get', None, None, 200, 2, 100),
+    Endpoint('wellness-survey-session', 'get', None, None, 200, 1, 50),
+    # El último intento sembrado está completado: el PATCH empieza uno nuevo
+    Endpoint('wellness-survey-session', 'patch', None, lambda t: {'current_step': 2}, 200, 3, 50),
+    Endpoint('user-list', 'get', None, None, 200, 1, 50),
+    Endpoint('user-detail', 'get', lambda t: {'pk': t.user.pk}, None, 200, 1, 50),
+    Endpoint('module-list', 'get', None, None, 200, 3, 100),
+    Endpoint('module-detail', 'get', lambda t: {'pk': 'salud'}, None, 200, 3, 100),
+    Endpoint('mission-list', 'get', None, None, 200, 3, 150),
+    Endpoint('mission-detail', 'get', lambda t: {'pk': t.mission.pk}, None, 200, 3, 100),
+    Endpoint('declaration-list', 'get', None, None, 200, 1, 250),
+    # Con los efectos en el request; con DEFERRED_TASKS ver TaskQueueTests
+    Endpoint('declaration-create', 'post', None, lambda t: {
+        'module': 'salud', 'pillar': 'Vision', 'text': 'Nueva declaración'}, 201, 54, 250),
+    # Lote offline de 20 declaraciones en 2 módulos: efectos una vez por módulo
+    Endpoint('declaration-sync', 'post', None, lambda t: {'declarations': [
+        {'client_id': f'sync-{module_id}-{i}', 'module': module_id, 'pillar': pillar, 'text': f'Offline {i}'}
+        for module_id in ('salud', 'carrera')
+        for i, (pillar, _) in enumerate(Declaration.PILLAR_CHOICES * 2 + Declaration.PILLAR_CHOICES[:2])
+    ]}, 200, 116, 300),
+    Endpoint('declaration-detail', 'get', lambda t: {'pk': t.declaration.pk}, None, 200, 1, 50),
+    Endpoint('unlockedpillar-list', 'get', None, None, 200, 1, 50),
+    Endpoint('unlockedpillar-detail', 'get', lambda t: {'pk': t.pillar.pk}, None, 200, 1, 50),
+    Endpoint('habit-list', 'get', None, None, 200, 1, 50),
+    Endpoint('habit-detail', 'get', lambda t: {'pk': t.habit.pk}, None, 200, 1, 50),
+    Endpoint('comfortwall-list', 'get', None, None, 200, 1, 50),
+    Endpoint('comfortwall-detail', 'patch', lambda t: {'pk': t.wall.pk}, lambda t: {'hp_actual': 0}, 200, 6, 50),
+    Endpoint('achievement-list', 'get', None, None, 200, 2, 50),
+    Endpoint('achievement-detail', 'get', lambda t: {'pk': t.achievement.pk}, None, 200, 2, 50),
+]
+
+# Rutas que no son endpoints de la aplicación, o conexiones abiertas (SSE)
+UNBUDGETED_ROUTES = {'api-root', 'events-stream'}
+
+
+def route_names(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from route_names(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield pattern.name
+
+
+@override_settings(
+    DOMAIN_CATALOG_CHECK_SECONDS=3600,
+    # El hash de contraseñas domina el registro y no es lo que se mide aquí
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class EndpointBudgetTests(TestCase):
+    """
+    Consultas y latencia máximas por endpoint con datos realistas de un usuario.
+    La latencia se verifica solo con API_BUDGET_TIMING=1; con
+    API_BUDGET_REPORT=<archivo> se escribe el resultado en JSON.
+    """
+    fixtures = ['initial_modules', 'initial_missions']
+    repeat = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('tester', 'tester@example.com', 'clave-segura-123')
+        ModuleProgress.objects.filter(user=cls.user, module_id__in=['personalidad', 'intelecto']).update(state='unlocked')
+        profile = cls.user.profile
+        profile.experience_points = 2000
+        profile.current_level = 21
+        profile.save()
+        modules = ['salud', 'personalidad', 'intelecto']
+        Declaration.objects.bulk_create([
+            Declaration(user=cls.user, module_id=module_id, pillar=pillar, text=f'{module_id}-{pillar}-{i}')
+            for module_id in modules
+            for pillar, _ in Declaration.PILLAR_CHOICES
+            for i in range(25)
+        ])
+        cls.declaration = Declaration.objects.filter(user=cls.user).first()
+        missions = list(Mission.objects.filter(module_id__in=modules))
+        MissionProgress.objects.bulk_create([
+            MissionProgress(user=cls.user, mission=mission, state='completed' if i % 3 == 0 else 'active')
+            for i, mission in enumerate(missions)
+        ])
+        cls.mission = next(m for i, m in enumerate(missions) if i % 3)
+        Streak.objects.bulk_create([
+            Streak(user=cls.user, module_id=module_id, current_streak=3, longest_streak=5)
+            for module_id in modules
+        ])
+        cls.pillar = UnlockedPillar.objects.create(user=cls.user, module_id='salud', pillar='Vision')
+        Habit.objects.bulk_create([
+            Habit(user=cls.user, nombre=f'Hábito {i}', dificultad='media') for i in range(10)
+        ])
+        cls.habit = Habit.objects.filter(user=cls.user).first()
+        cls.wall = ComfortWall.objects.create(user=cls.user)
+        cls.achievement = Achievement.objects.create(name='Primer paso', description='', icon='star')
+        UserAchievement.objects.create(user=cls.user, achievement=cls.achievement)
+        cls.survey = [
+            {'category': category, 'question': f'{category}-{i}', 'answer': (i * 3) % 11}
+            for category in ('Cuerpo', 'Mente', 'Relaciones', 'Trabajo')
+            for i in range(5)
+        ]
+        WellnessSurveyAnswerListSerializer.create_answers(cls.survey, cls.user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        get_catalog()
+
+    def _path(self, endpoint):
+        name = 'declaration-list' if endpoint.name == 'declaration-create' else endpoint.name
+        return reverse(name, kwargs=endpoint.kwargs(self) if endpoint.kwargs else None)
+
+    def _measure(self, endpoint):
+        """Ejecuta el endpoint `repeat` veces, revirtiendo sus escrituras cada vez."""
+        path = self._path(endpoint)
+        data = endpoint.data(self) if endpoint.data else None
+        timings = []
+        for _ in range(self.repeat):
+            with rollback_after():
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    response = getattr(self.client, endpoint.method)(path, data, format='json')
+                    timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        return path, response, len(queries), timings[len(timings) // 2]
+
+    def test_every_route_has_a_budget(self):
+        budgeted = {endpoint.name for endpoint in ENDPOINTS} | {'declaration-list'}
+        missing = set(route_names(api_urls.urlpatterns)) - budgeted - UNBUDGETED_ROUTES
+        self.assertFalse(missing, f"Rutas sin presupuesto: {sorted(missing)}")
+
+    def test_endpoint_budgets(self):
+        report = []
+        for endpoint in ENDPOINTS:
+            path, response, queries, ms = self._measure(endpoint)
+            report.append({
+                'endpoint': endpoint.name,
+                'method': endpoint.method.upper(),
+                'path': path,
+                'status': response.status_code,
+                'queries': queries,
+                'max_queries': endpoint.max_queries,
+                'ms': round(ms, 2),
+                'max_ms': endpoint.max_ms,
+            })
+            with self.subTest(endpoint=endpoint.name, method=endpoint.method):
+                self.assertEqual(response.status_code, endpoint.status, getattr(response, 'data', None))
+                self.assertLessEqual(queries, endpoint.max_queries)
+                if os.environ.get('API_BUDGET_TIMING') == '1':
+                    self.assertLessEqual(ms, endpoint.max_ms)
+
+        report_path = os.environ.get('API_BUDGET_REPORT')
+        if report_path:
+            with open(report_path, 'w', encoding='utf-8') as f:
+                json.dump({'database': connection.vendor, 'endpoints': report}, f, indent=2, ensure_ascii=False)
+
+
+
+class SyntheticDataTests(TestCase):
+    """El generador produce datos coherentes y repetibles con la misma semilla."""
+    fixtures = ['initial_modules', 'initial_missions']
+
+    def _generate(self):
+        call_command('generate_synthetic_data', users=20, batch_size=8, declarations=5, seed=7,
+                     clear=True, stdout=io.StringIO())
+        return sorted(Declaration.objects.values_list('user__username', 'module_id', 'pillar', 'text'))
+
+    def test_generated_data(self):
+        declarations = self._generate()
+        users = User.objects.filter(username__startswith='synth-')
+        self.assertEqual(users.count(), 20)
+        self.assertEqual(Profile.objects.filter(user__in=users).count(), 20)
+        self.assertEqual(ModuleProgress.objects.filter(user__in=users, module_id='salud', state='unlocked').count(), 20)
+
+        summary = UserProgressSummary.objects.get(user=users.first())
+        self.assertEqual(summary.missions_completed,
+                         MissionProgress.objects.filter(user=summary.user, state='completed').count())
+
+        self.assertEqual(self._generate(), declarations)
+
+
+class RequestMetricsTests(TestCase):
+    """Server-Timing por request y exposición de histogramas en /metrics."""
+    fixtures = ['initial_modules']
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='metrics', password='pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('progress-overview'))
+        timing = response['Server-Timing']
+        for metric in ('db;dur=', 'serialize;dur=', 'app;dur=', 'total;dur='):
+            self.assertIn(metric, timing)
+        self.assertRegex(timing, r'desc="[1-9]\d* consultas"')
+
+    def test_metrics_shared_across_processes(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            self.client.get(reverse('progress-overview'))
+            # Archivo de otro worker con su propio conteo
+            other = metrics.MmapValues(os.path.join(directory, 'metrics-1.db'))
+            other.add('dividis_requests_total{view="progress-overview",method="GET",status="200"}', 2)
+
+            body = self.client.get('/metrics').content.decode()
+            self.assertIn('# TYPE dividis_request_duration_seconds histogram', body)
+            self.assertIn('dividis_requests_total{view="progress-overview",method="GET",status="200"} 3', body)
+            self.assertIn('dividis_request_db_queries_bucket{view="progress-overview",method="GET",le="+Inf"} 1', body)
+
+    @override_settings(METRICS_TOKEN='secreto')
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(response.status_code, 200)
+
+    def test_metrics_without_token_only_for_allowed_networks(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='203.0.113.7').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.1.2.3').status_code, 403)
+        with override_settings(METRICS_ALLOWED_NETWORKS=['10.0.0.0/8']):
+            self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.1.2.3').status_code, 200)
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+        with override_settings(METRICS_TOKEN='secreto'):
+            self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='203.0.113.7',
+                                             HTTP_AUTHORIZATION='Bearer secreto').status_code, 200)
+
+
+class SlowQueryTests(TestCase):
+    """Registro de consultas lentas con su lugar en el código."""
+    fixtures = ['initial_modules']
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='lento', password='pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_normalize(self):
+        self.assertEqual(
+            slow_queries.normalize("SELECT * FROM t WHERE a IN (%s, %s, %s) AND b = 'x' LIMIT 21"),
+            "SELECT * FROM t WHERE a IN (...) AND b = ? LIMIT ?"
+        )
+
+    @override_settings(SLOW_QUERY_MS=0.0001, SLOW_QUERY_EXPLAIN_RATE=1)
+    def test_records_call_site_and_plan(self):
+        self.client.get(reverse('progress-overview'))
+        record = SlowQuery.objects.filter(call_site='api/models.py:UserProgressSummary.for_user').first()
+        self.assertIsNotNone(record)
+        self.assertIn('api_userprogresssummary', record.sql)
+        self.assertNotEqual(record.plan, '')
+
+        out = io.StringIO()
+        call_command('slow_queries', stdout=out)
+        self.assertIn('api/models.py:UserProgressSummary.for_user', out.getvalue())
+
+    @override_settings(SLOW_QUERY_MS=0.0001, SLOW_QUERY_EXPLAIN_RATE=0, DEFERRED_TASKS=True, TASKS_DELAY_SECONDS=0)
+    def test_worker_flushes_after_each_task(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('declaration-list'),
+                             {'module': 'salud', 'pillar': 'Vision', 'text': 'Lenta'}, format='json')
+        SlowQuery.objects.all().delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(tasks.run_pending(), 1)
+        # En el buffer solo quedan las consultas del último claim, que no encontró tareas
+        self.assertEqual({record['call_site'] for record in slow_queries.pending()}, {'api/utils/tasks.py:claim'})
+        slow_queries.flush()
+        self.assertTrue(SlowQuery.objects.filter(call_site__startswith='api/utils/declaration_sync.py:').exists())
+
+    @override_settings(SLOW_QUERY_MS=0)
+    def test_disabled(self):
+        self.client.get(reverse('progress-overview'))
+        self.assertFalse(SlowQuery.objects.exists())
+
+
+@override_settings(ASYNC_PARALLEL_QUERIES=False)
+class AsyncReadViewTests(TestCase):
+    """Las vistas async del modo ASGI devuelven lo mismo que las de DRF."""
+    fixtures = ['initial_modules', 'initial_missions']
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('asincrono', 'async@example.com', 'clave-segura-123')
+        for mission in Mission.objects.filter(module_id='salud'):
+            MissionProgress.objects.create(user=cls.user, mission=mission)
+        Streak.objects.create(user=cls.user, module_id='salud', current_streak=2)
+        session = WellnessSurveySession.objects.create(user=cls.user, is_completed=True, finished_at=timezone.now())
+        for category, answer in (('salud', 4), ('salud', 2), ('finanzas', 5)):
+            WellnessSurveyAnswer.objects.create(user=cls.user, session=session, category=category,
+                                                question=f'{category} {answer}', answer=answer)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.factory = AsyncRequestFactory()
+        self.token = str(AccessToken.for_user(self.user))
+
+    def call(self, view, path, token=None, **kwargs):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        request = self.factory.get(path, headers=headers)
+        request.auser = lambda: self._anonymous()
+        return async_to_sync(view)(request, **kwargs)
+
+    async def _anonymous(self):
+        return AnonymousUser()
+
+    def assertSameJson(self, view, name, **kwargs):
+        path = reverse(name, kwargs=kwargs or None)
+        expected = self.client.get(path)
+        response = self.call(view, path, self.token, **kwargs)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(json.loads(response.content), expected.json())
+
+    def test_same_payload_as_sync_views(self):
+        self.assertSameJson(async_views.user_missions, 'user-missions')
+        self.assertSameJson(async_views.progress_overview, 'progress-overview')
+        self.assertSameJson(async_views.module_progress, 'module-progress', module_id='salud')
+        self.assertSameJson(async_views.module_progress, 'module-progress', module_id='no-existe')
+        self.assertSameJson(async_views.wellness_survey_answers, 'wellness-survey-answers')
+
+    def test_gather_uses_request_connection(self):
+        def where():
+            return threading.get_ident(), id(connection.connection)
+
+        results = async_to_sync(gather)(where, where, lambda: User.objects.count())
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[2], User.objects.count())
+
+    def test_requires_authentication(self):
+        response = self.call(async_views.progress_overview, reverse('progress-overview'))
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('WWW-Authenticate', response)
+        response = self.call(async_views.progress_overview, reverse('progress-overview'), token='no-es-un-token')
+        self.assertEqual(response.status_code, 401)
+
+
+class DeclarationSyncTests(TestCase):
+    """Sincronización en lote de declaraciones offline con efectos una vez por módulo."""
+    fixtures = ['initial_modules', 'initial_missions']
+
+    def setUp(self):
+        self.user = User.objects.create_user('offline', 'offline@example.com', 'clave-segura-123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.next_module = get_catalog().next_module('salud')
+
+    def sync(self, items):
+        return self.client.post(reverse('declaration-sync'), {'declarations': items}, format='json')
+
+    def batch(self):
+        items = [
+            {'client_id': f'c-{pillar}', 'module': 'salud', 'pillar': pillar, 'text': f'Declaro {pillar}'}
+            for pillar, _ in Declaration.PILLAR_CHOICES
+        ]
+        items.append({'client_id': 'c-Vision', 'module': 'salud', 'pillar': 'Vision', 'text': 'Repetida'})
+        items.append({'client_id': 'c-otra', 'module': 'salud', 'pillar': 'Vision', 'text': 'Declaro Vision'})
+        items.append({'client_id': 'c-mala', 'module': 'no-existe', 'pillar': 'Vision', 'text': 'x'})
+        return items
+
+    def test_batch_results_and_effects(self):
+        response = self.sync(self.batch())
+        self.assertEqual(response.status_code, 200)
+        statuses = [(r['client_id'], r['status']) for r in response.data['results']]
+        self.assertEqual(statuses, [
+            ('c-Vision', 'created'), ('c-Proposito', 'created'), ('c-Creencias', 'created'),
+            ('c-Estrategias', 'created'), ('c-Vision', 'duplicate'), ('c-otra', 'duplicate'), ('c-mala', 'invalid'),
+        ])
+        results = response.data['results']
+        self.assertEqual(results[5]['id'], results[0]['id'])
+        self.assertIn('module', results[6]['errors'])
+
+        self.assertEqual(Declaration.objects.filter(user=self.user).count(), 4)
+        self.assertFalse(Declaration.objects.filter(user=self.user, synced=False).exists())
+        self.assertEqual(XPEvent.objects.filter(user=self.user, source='declaration').count(), 4)
+        self.assertEqual(Streak.objects.get(user=self.user, module_id='salud').current_streak, 1)
+        self.assertEqual(ModuleProgress.objects.get(user=self.user, module=self.next_module).state, 'unlocked')
+
+        # Reintento del mismo lote: nada nuevo
+        retry = self.sync(self.batch())
+        self.assertEqual([r['status'] for r in retry.data['results']][:4], ['duplicate'] * 4)
+        self.assertEqual(XPEvent.objects.filter(user=self.user, source='declaration').count(), 4)
+
+    def test_resumes_unsynced_rows(self):
+        # Fila insertada por un intento anterior que se cortó antes de aplicar efectos
+        Declaration.objects.create(user=self.user, module_id='salud', pillar='Vision', text='Cortada',
+                                   client_id='c-cortada', synced=False)
+        response = self.sync([{'client_id': 'c-cortada', 'module': 'salud', 'pillar': 'Vision', 'text': 'Cortada'}])
+        self.assertEqual(response.data['results'][0]['status'], 'created')
+        self.assertTrue(Declaration.objects.get(client_id='c-cortada').synced)
+        self.assertTrue(XPEvent.objects.filter(user=self.user, reference='salud:Vision').exists())
+
+    def test_synced_is_read_only(self):
+        # `synced` marca los efectos pendientes: el cliente no puede reactivarlos ni saltarlos
+        done = self.sync([{'client_id': 'c-hecha', 'module': 'salud', 'pillar': 'Vision', 'text': 'Hecha'}]).data
+        pending = Declaration.objects.create(user=self.user, module_id='salud', pillar='Proposito', text='Pendiente',
+                                             client_id='c-pendiente', synced=False)
+        for pk, value in [(done['results'][0]['id'], False), (pending.pk, True)]:
+            response = self.client.patch(reverse('declaration-detail', kwargs={'pk': pk}), {'synced': value},
+                                         format='json')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(Declaration.objects.get(pk=pk).synced, not value)
+        self.assertEqual(XPEvent.objects.filter(user=self.user, source='declaration').count(), 1)
+
+    @override_settings(DECLARATION_SYNC_MAX_ITEMS=2)
+    def test_batch_limit(self):
+        self.assertEqual(self.sync(self.batch()).status_code, 400)
+
+
+class SyncChangesTests(TestCase):
+    """Cambios incrementales del estado del usuario con tombstones."""
+    fixtures = ['initial_modules', 'initial_missions']
+
+    def setUp(self):
+        self.user = User.objects.create_user('delta', 'delta@example.com', 'clave-segura-123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def changes(self, since):
+        response = self.client.get(reverse('sync-changes'), {'since': since} if since is not None else None)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_changes_and_tombstones(self):
+        cursor = self.changes(None)['cursor']
+        habit = self.client.post(reverse('habit-list'), {'nombre': 'Leer', 'dificultad': 'media'}, format='json').data
+        self.client.post(reverse('declaration-list'),
+                         {'module': 'salud', 'pillar': 'Vision', 'text': 'Veo lejos'}, format='json')
+
+        data = self.changes(cursor)
+        self.assertFalse(data['reset'])
+        self.assertGreater(data['cursor'], cursor)
+        self.assertEqual([d['text'] for d in data['changes']['declarations']], ['Veo lejos'])
+        self.assertEqual([h['id'] for h in data['changes']['habits']], [habit['id']])
+        self.assertIn('salud', [s['module']['id'] for s in data['changes']['streaks']])
+
+        # Sin cambios nuevos la respuesta está vacía
+        cursor = data['cursor']
+        self.assertEqual(self.changes(cursor)['changes'], {})
+
+        self.client.delete(reverse('habit-detail', kwargs={'pk': habit['id']}))
+        data = self.changes(cursor)
+        self.assertEqual(data['deleted'], {'habits': [habit['id']]})
+        self.assertEqual(data['changes'], {})
+
+    def test_bulk_writes_are_recorded(self):
+        cursor = self.changes(None)['cursor']
+        self.client.post(reverse('declaration-sync'), {'declarations': [
+            {'client_id': f'c-{pillar}', 'module': 'salud', 'pillar': pillar, 'text': pillar}
+            for pillar, _ in Declaration.PILLAR_CHOICES
+        ]}, format='json')
+        data = self.changes(cursor)
+        self.assertEqual(len(data['changes']['declarations']), 4)
+        self.assertTrue(all(d['synced'] for d in data['changes']['declarations']))
+        # Misiones completadas con bulk_create y módulo siguiente desbloqueado
+        self.assertIn('mission_progress', data['changes'])
+        self.assertIn('module_progress', data['changes'])
+
+    def test_rollback_discards_the_change(self):
+        cursor = self.changes(None)['cursor']
+
+        class Abort(Exception):
+            pass
+
+        with self.assertRaises(Abort), transaction.atomic():
+            Habit.objects.create(user=self.user, nombre='Nadar', dificultad='media')
+            raise Abort
+        self.assertEqual(self.changes(cursor), {'cursor': cursor, 'reset': False, 'changes': {}, 'deleted': {}})
+
+    def test_writes_outside_a_request_are_recorded(self):
+        cursor = self.changes(None)['cursor']
+        # Como una tarea de run_tasks o un comando: sin middleware ni request
+        habit = Habit.objects.create(user=self.user, nombre='Nadar', dificultad='media')
+        self.assertTrue(UserChange.objects.filter(user=self.user, kind='habits', object_id=habit.pk).exists())
+        self.assertEqual([h['id'] for h in self.changes(cursor)['changes']['habits']], [habit.pk])
+
+    def test_reset(self):
+        self.assertTrue(self.changes(None)['reset'])
+        self.assertTrue(self.changes(10 ** 6)['reset'])
+        with override_settings(SYNC_CHANGES_MAX=1):
+            self.assertTrue(self.changes(0)['reset'])
+        self.assertEqual(self.client.get(reverse('sync-changes'), {'since': 'x'}).status_code, 400)
+
+    def test_changes_recorded_under_asgi(self):
+        cursor = self.changes(None)['cursor']
+        token = str(AccessToken.for_user(self.user))
+        response = async_to_sync(self.async_client.post)(
+            reverse('habit-list'), {'nombre': 'Correr', 'dificultad': 'media'},
+            content_type='application/json', headers={'Authorization': f'Bearer {token}'},
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([h['nombre'] for h in self.changes(cursor)['changes']['habits']], ['Correr'])
+
+
+@override_settings(DOMAIN_CATALOG_CHECK_SECONDS=3600)
+class BootstrapTests(TestCase):
+    """/bootstrap/ devuelve el mismo JSON que los cinco endpoints de la carga inicial."""
+    fixtures = ['initial_modules', 'initial_missions']
+    parts = {
+        'me': 'me',
+        'progress_overview': 'progress-overview',
+        'modules': 'module-list',
+        'user_missions': 'user-missions',
+        'unlocked_pillars': 'unlockedpillar-list',
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('inicio', 'inicio@example.com', 'clave-segura-123')
+        ModuleProgress.objects.filter(user=cls.user, module_id='personalidad').update(state='unlocked')
+        for i, mission in enumerate(Mission.objects.filter(module_id__in=['salud', 'personalidad'])):
+            MissionProgress.objects.create(user=cls.user, mission=mission, state='completed' if i % 2 else 'active')
+        Streak.objects.create(user=cls.user, module_id='salud', current_streak=3)
+        Declaration.objects.create(user=cls.user, module_id='salud', pillar='Vision', text='Hoy')
+        UnlockedPillar.objects.create(user=cls.user, module_id='salud', pillar='Vision')
+        achievement = Achievement.objects.create(name='Primer paso', description='', icon='star')
+        UserAchievement.objects.create(user=cls.user, achievement=achievement)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        get_catalog()
+
+    def test_same_payload_as_individual_endpoints(self):
+        response = self.client.get(reverse('bootstrap'))
+        self.assertEqual(response.status_code, 200)
+        body = json.loads(response.content)
+        self.assertEqual(list(body), list(self.parts))
+        for part, name in self.parts.items():
+            expected = json.loads(self.client.get(reverse(name)).content)
+            # Mismo contenido y mismo orden de claves
+            self.assertEqual(json.dumps(body[part]), json.dumps(expected), part)
+
+    def test_fewer_queries_than_five_calls(self):
+        with CaptureQueriesContext(connection) as separate:
+            for name in self.parts.values():
+                self.client.get(reverse(name))
+        with CaptureQueriesContext(connection) as combined:
+            self.client.get(reverse('bootstrap'))
+        self.assertLess(len(combined), len(separate))
+
+
+class EventStreamTests(TestCase):
+    """Los cambios de progreso se publican al confirmar y llegan al stream SSE."""
+    fixtures = ['initial_modules', 'initial_missions']
+
+    def setUp(self):
+        self.user = User.objects.create_user('eventos', 'eventos@example.com', 'clave-segura-123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.factory = AsyncRequestFactory()
+        self.sent = []
+        patcher = mock.patch.object(events, '_send', self.sent.append)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def published(self):
+        return [(event['type'], event['data']) for event in self.sent]
+
+    def test_writes_publish_on_commit(self):
+        mission = Mission.objects.filter(module_id='salud').first()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post(reverse('mission-complete', kwargs={'mission_id': mission.pk}))
+        # Nada sale antes de confirmar la transacción
+        self.assertEqual(self.sent, [])
+        for callback in callbacks:
+            callback()
+        self.assertIn((events.MISSION_COMPLETED, {'mission_id': str(mission.pk)}), self.published())
+        self.assertIn((events.XP_AWARDED, {'amount': mission.xp_reward, 'source': 'mission',
+                                            'reference': str(mission.pk)}), self.published())
+
+        next_module = get_catalog().next_module('salud')
+        with self.captureOnCommitCallbacks(execute=True):
+            for pillar, _ in Declaration.PILLAR_CHOICES:
+                self.client.post(reverse('declaration-list'),
+                                 {'module': 'salud', 'pillar': pillar, 'text': pillar}, format='json')
+        self.assertIn((events.MODULE_UNLOCKED, {'module_id': next_module.pk}), self.published())
+
+    def stream(self, path, **headers):
+        request = self.factory.get(path, headers=headers)
+        request.auser = self._anonymous
+        return async_to_sync(async_views.events_stream)(request)
+
+    async def _anonymous(self):
+        return AnonymousUser()
+
+    def stream_token(self):
+        response = self.client.post(reverse('events-token'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['expires_in'], 60)
+        return response.data['token']
+
+    @override_settings(EVENTS_HEARTBEAT_SECONDS=0.01)
+    def test_stream_delivers_user_events(self):
+        response = self.stream(f"{reverse('events-stream')}?token={self.stream_token()}")
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        broker = events.get_broker()
+
+        async def read():
+            stream = response.streaming_content
+            chunks = [await anext(stream)]
+            # Suscrito tras el primer chunk: el evento de otro usuario no llega
+            broker.dispatch({'user': self.user.pk + 1, 'type': events.XP_AWARDED, 'data': {}, 'at': 'x'})
+            chunks.append(await anext(stream))
+            broker.dispatch({'user': self.user.pk, 'type': events.MODULE_UNLOCKED,
+                             'data': {'module_id': 'salud'}, 'at': 'x'})
+            chunks.append(await anext(stream))
+            await stream.aclose()
+            return chunks
+
+        self.assertEqual(async_to_sync(read)(), [
+            b'retry: 3000\n\n',
+            b': ping\n\n',
+            b'event: module_unlocked\ndata: {"module_id": "salud", "at": "x"}\n\n',
+        ])
+
+    def test_stream_requires_authentication(self):
+        response = self.stream(reverse('events-stream'))
+        self.assertEqual(response.status_code, 401)
+        response = self.stream(f"{reverse('events-stream')}?token=no-es-un-token")
+        self.assertEqual(response.status_code, 401)
+
+    def test_stream_rejects_access_token_in_url(self):
+        access = str(AccessToken.for_user(self.user))
+        for query in (f'access_token={access}', f'token={access}'):
+            self.assertEqual(self.stream(f"{reverse('events-stream')}?{query}").status_code, 401)
+
+    def test_stream_token_expires(self):
+        token = self.stream_token()
+        with override_settings(EVENTS_TOKEN_MAX_AGE=-1):
+            self.assertEqual(self.stream(f"{reverse('events-stream')}?token={token}").status_code, 401)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.post(reverse('events-token')).status_code, 401)
+
+    def test_default_backend_follows_database(self):
+        postgres = mock.Mock(vendor='postgresql')
+        with override_settings(EVENTS_BACKEND=None):
+            self.assertEqual(events.backend_path(), 'api.utils.events.LocalBackend')
+            with mock.patch.object(events, 'connection', postgres):
+                self.assertEqual(events.backend_path(), 'api.utils.events.PostgresBackend')
+        # LocalBackend elegido con PostgreSQL: los demás workers no reciben los eventos
+        with override_settings(EVENTS_BACKEND='api.utils.events.LocalBackend'), \
+                mock.patch.object(events, 'connection', postgres), mock.patch.object(events, '_broker', None), \
+                self.assertLogs('api.utils.events', 'WARNING'):
+            self.assertIsInstance(events.get_broker().backend, events.LocalBackend)
+
+    def test_stream_requires_asgi(self):
+        token = str(AccessToken.for_user(self.user))
+        response = self.client.get(reverse('events-stream'), HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, 503)
+
+
+def failing_task(**kwargs):
+    raise RuntimeError('falla')
+
+
+@override_settings(DEFERRED_TASKS=True, TASKS_DELAY_SECONDS=0)
+class TaskQueueTests(TestCase):
+    """Efectos diferidos: se encolan al confirmar, se fusionan por usuario y se reintentan."""
+    fixtures = ['initial_modules', 'initial_missions']
+
+    def setUp(self):
+        self.user = User.objects.create_user('cola', 'cola@example.com', 'clave-segura-123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def declare(self, module_id, pillar, text=None):
+        response = self.client.post(reverse('declaration-list'),
+                                    {'module': module_id, 'pillar': pillar, 'text': text or pillar}, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response
+
+    def test_burst_of_declarations_runs_once(self):
+        next_module = get_catalog().next_module('salud')
+        with CaptureQueriesContext(connection) as deferred, self.captureOnCommitCallbacks(execute=True):
+            response = self.declare('salud', 'Vision')
+        self.assertFalse(response.data['synced'])
+        with self.captureOnCommitCallbacks(execute=True):
+            for pillar, _ in Declaration.PILLAR_CHOICES[1:]:
+                self.declare('salud', pillar)
+        self.assertEqual(list(Task.objects.values_list('key', flat=True)), [f'declarations:{self.user.pk}'])
+        self.assertFalse(XPEvent.objects.filter(user=self.user).exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(tasks.run_pending(), 1)
+        self.assertFalse(Task.objects.exists())
+        self.assertFalse(Declaration.objects.filter(user=self.user, synced=False).exists())
+        self.assertEqual(XPEvent.objects.filter(user=self.user, source='declaration').count(),
+                         len(Declaration.PILLAR_CHOICES))
+        self.assertTrue(Streak.objects.filter(user=self.user, module_id='salud').exists())
+        self.assertEqual(ModuleProgress.objects.get(user=self.user, module=next_module).state, 'unlocked')
+
+        with override_settings(DEFERRED_TASKS=False), CaptureQueriesContext(connection) as inline:
+            self.assertTrue(self.declare('salud', 'Vision', 'Otra visión').data['synced'])
+        self.assertLess(len(deferred), len(inline) / 2)
+
+    def test_mission_complete_defers_streak_and_unlocks(self):
+        mission = Mission.objects.filter(module_id='salud').first()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('mission-complete', kwargs={'mission_id': mission.pk}))
+        self.assertEqual(response.data['state'], 'completed')
+        self.assertTrue(XPEvent.objects.filter(user=self.user, source='mission').exists())
+        self.assertFalse(Streak.objects.filter(user=self.user, module_id='salud').exists())
+        tasks.run_pending()
+        self.assertTrue(Streak.objects.filter(user=self.user, module_id='salud').exists())
+
+    def test_retries_and_coalescing_while_running(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            tasks.enqueue(failing_task, 'falla')
+        running = tasks.claim()
+        # Con una tarea en curso se admite una nueva pendiente con la misma clave
+        with self.captureOnCommitCallbacks(execute=True):
+            tasks.enqueue(failing_task, 'falla')
+        self.assertEqual(Task.objects.filter(key='falla', state='pending').count(), 1)
+
+        # Al fallar, la que estaba en curso cede el trabajo a la pendiente
+        with self.assertLogs('api.utils.tasks', 'ERROR'):
+            self.assertFalse(tasks.run(running))
+        self.assertEqual(Task.objects.count(), 1)
+
+        with override_settings(TASKS_MAX_ATTEMPTS=2), self.assertLogs('api.utils.tasks', 'ERROR'):
+            self.assertFalse(tasks.run(tasks.claim()))
+            task = Task.objects.get()
+            self.assertEqual((task.state, task.attempts), ('pending', 1))
+            self.assertIn('RuntimeError', task.last_error)
+            Task.objects.update(run_after=timezone.now())
+            tasks.run_pending()
+            self.assertEqual(Task.objects.get().state, 'failed')
+
+
+class AwardXPTests(TestCase):
+    """award_xp: ledger idempotente e incrementos atómicos del perfil."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('xp', 'xp@example.com', 'clave-segura-123')
+
+    def profile(self):
+        return Profile.objects.values_list('experience_points', 'current_level').get(user=self.user)
+
+    def test_duplicate_reference_is_ignored(self):
+        self.assertTrue(xp.award_xp(self.user, 40, 'mission', 'm-1'))
+        self.assertFalse(xp.award_xp(self.user, 40, 'mission', 'm-1'))
+        self.assertTrue(xp.award_xp(self.user, 40, 'declaration', 'm-1'))
+        self.assertFalse(xp.award_xp(self.user, 0, 'mission', 'm-2'))
+        self.assertEqual(XPEvent.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(self.profile(), (80, 1))
+
+    def test_increments_do_not_overwrite(self):
+        stale = Profile.objects.get(user=self.user)
+        for i, amount in enumerate((150, 30, 20)):
+            xp.award_xp(self.user, amount, 'mission', i)
+        # La instancia cargada antes no ve los cambios: el UPDATE suma sobre el valor de la fila
+        self.assertEqual(stale.experience_points, 0)
+        self.assertEqual(self.profile(), (200, xp.level_for(200)))
+
+    def test_level_matches_level_for(self):
+        for i, amount in enumerate((99, 1, -150, -30, 1000)):
+            xp.award_xp(self.user, amount, 'ajuste', i)
+            total, level = self.profile()
+            self.assertEqual(level, xp.level_for(total), total)
+        self.assertEqual(self.profile(), (920, 10))
+
+
+class DayBitmapTests(SimpleTestCase):
+    """Operaciones de bits de los calendarios de actividad."""
+
+    def bits(self, days):
+        return sum(1 << day for day in days)
+
+    def test_run_ending_at(self):
+        bits = self.bits([0, 1, 2, 5, 6])
+        self.assertEqual(day_bitmap.run_ending_at(bits, 2), 3)
+        self.assertEqual(day_bitmap.run_ending_at(bits, 6), 2)
+        self.assertEqual(day_bitmap.run_ending_at(bits, 4), 0)
+        self.assertEqual(day_bitmap.run_ending_at(bits, 7), 0)
+        self.assertEqual(day_bitmap.run_ending_at(bits, -1), 0)
+        self.assertEqual(day_bitmap.run_ending_at(0, 3), 0)
+
+    def test_longest_run(self):
+        self.assertEqual(day_bitmap.longest_run(0), 0)
+        self.assertEqual(day_bitmap.longest_run(self.bits([3])), 1)
+        self.assertEqual(day_bitmap.longest_run(self.bits([0, 1, 2, 5, 6, 7, 8, 20])), 4)
+
+    def test_count_in_window(self):
+        bits = self.bits([0, 1, 2, 5, 6, 9])
+        self.assertEqual(day_bitmap.count_in_window(bits, 6, 7), 5)
+        self.assertEqual(day_bitmap.count_in_window(bits, 6, 2), 2)
+        self.assertEqual(day_bitmap.count_in_window(bits, 9, 3), 1)
+        # La ventana no puede empezar antes del origen
+        self.assertEqual(day_bitmap.count_in_window(bits, 2, 30), 3)
+        self.assertEqual(day_bitmap.count_in_window(bits, -1, 7), 0)
+        self.assertEqual(day_bitmap.count_in_window(bits, 6, 0), 0)
+
+    def test_bytes_round_trip(self):
+        bits = self.bits([0, 9, 400])
+        self.assertEqual(day_bitmap.from_bytes(day_bitmap.to_bytes(bits)), bits)
+        self.assertEqual(day_bitmap.to_bytes(0), b'')
+        self.assertEqual(day_bitmap.from_bytes(None), 0)
+
+
+class ActivityCalendarTests(TestCase):
+    """Rachas calculadas sobre ActivityCalendar."""
+    fixtures = ['initial_modules']
+
+    def setUp(self):
+        self.user = User.objects.create_user('calendario', 'calendario@example.com', 'clave-segura-123')
+
+    def record(self, *days):
+        for day in days:
+            calendar, _ = ActivityCalendar.record(self.user.pk, 'salud', day)
+        return calendar
+
+    def test_streak_across_year_boundary(self):
+        calendar = self.record(date(2024, 12, 30), date(2024, 12, 31), date(2025, 1, 1), date(2025, 1, 2))
+        self.assertEqual(calendar.current_streak(date(2025, 1, 2)), 4)
+        # Hoy sin actividad todavía: cuenta la racha hasta ayer
+        self.assertEqual(calendar.current_streak(date(2025, 1, 3)), 4)
+        self.assertEqual(calendar.current_streak(date(2025, 1, 4)), 0)
+        self.assertEqual(calendar.longest_streak, 4)
+
+    def test_gaps_and_earlier_days(self):
+        calendar = self.record(date(2025, 3, 10), date(2025, 3, 12), date(2025, 3, 13))
+        self.assertEqual(calendar.current_streak(date(2025, 3, 13)), 2)
+        # Un día anterior al origen lo desplaza y conserva los días ya marcados
+        calendar = self.record(date(2025, 3, 8), date(2025, 3, 9), date(2025, 3, 11))
+        self.assertEqual(calendar.origin, date(2025, 3, 8))
+        self.assertEqual(calendar.current_streak(date(2025, 3, 13)), 6)
+        self.assertEqual(calendar.active_days(date(2025, 3, 13), 3), 3)
+        self.assertEqual(calendar.last_active, date(2025, 3, 13))
+
+    def test_same_day_is_recorded_once(self):
+        day = date(2025, 5, 1)
+        _, marked = ActivityCalendar.record(self.user.pk, 'salud', day)
+        calendar, marked_again = ActivityCalendar.record(self.user.pk, 'salud', day)
+        self.assertTrue(marked)
+        self.assertFalse(marked_again)
+        self.assertEqual(calendar.current_streak(day), 1)
+        self.assertEqual(ActivityCalendar.objects.filter(user=self.user).count(), 1)
+
+    def test_concurrent_create_is_retried(self):
+        # Otro request creó el calendario después de que este no lo encontrara
+        ActivityCalendar.record(self.user.pk, None, date(2025, 5, 1))
+        real = QuerySet.get_or_create
+        calls = []
+
+        def racing(queryset, *args, **kwargs):
+            calls.append(kwargs)
+            if len(calls) == 1:
+                raise IntegrityError('unique_activity_calendar_global')
+            return real(queryset, *args, **kwargs)
+
+        with mock.patch.object(QuerySet, 'get_or_create', racing):
+            calendar, marked = ActivityCalendar.record(self.user.pk, None, date(2025, 5, 2))
+        self.assertEqual(len(calls), 2)
+        self.assertTrue(marked)
+        self.assertEqual(calendar.current_streak(date(2025, 5, 2)), 2)
+        self.assertEqual(ActivityCalendar.objects.filter(user=self.user).count(), 1)
+
+
+class WellnessSurveyQuestionsTests(TestCase):
+    """Preguntas de la encuesta servidas con ETag y versión del conjunto."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('preguntas', 'preguntas@example.com', 'clave-segura-123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.question_set = get_question_set()
+
+    def get(self, etag=None):
+        headers = {'If-None-Match': etag} if etag else {}
+        return self.client.get(reverse('wellness-survey-questions'), headers=headers)
+
+    def test_etag_and_version_headers(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], self.question_set.etag)
+        self.assertEqual(response['X-Question-Set'], self.question_set.version)
+        self.assertEqual(response.json(), self.question_set.questions)
+
+    def test_if_none_match(self):
+        for etag in (self.question_set.etag, f'"otro", {self.question_set.etag}', f'W/{self.question_set.etag}', '*'):
+            with self.subTest(etag=etag), self.assertNumQueries(0):
+                response = self.get(etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+                self.assertEqual(response['ETag'], self.question_set.etag)
+                self.assertEqual(response['X-Question-Set'], self.question_set.version)
+        self.assertEqual(self.get('"desactualizado"').status_code, 200)
+
+    def test_answers_record_question_set(self):
+        answers = [{'category': 'Mente', 'question': 'Mente-1', 'answer': 7}]
+        self.client.post(reverse('wellness-survey-answers'), answers, format='json')
+        self.client.post(reverse('wellness-survey-answers'), answers, format='json',
+                         headers={'X-Question-Set': 'qs-anterior'})
+        self.assertEqual(
+            list(WellnessSurveySession.objects.filter(user=self.user).order_by('id').values_list('question_set', flat=True)),
+            [self.question_set.version, 'qs-anterior'])
+
+
+class WellnessSurveyAttemptTests(TestCase):
+    """Intentos de la encuesta: historial, selectores y sesión en curso."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('intentos', 'intentos@example.com', 'clave-segura-123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def submit(self, answer):
+        answers = [
+            {'category': category, 'question': f'{category}-{i}', 'answer': answer}
+            for category in ('Mente', 'Cuerpo') for i in range(2)
+        ]
+        response = self.client.post(reverse('wellness-survey-answers'), answers, format='json')
+        self.assertEqual(response.status_code, 201)
+        return WellnessSurveySession.latest_completed(self.user)
+
+    def answers(self, **params):
+        return self.client.get(reverse('wellness-survey-answers'), params)
+
+    def test_history_keeps_every_attempt(self):
+        first = self.submit(4)
+        second = self.submit(8)
+        self.assertEqual(WellnessSurveySession.objects.filter(user=self.user, is_completed=True).count(), 2)
+        self.assertEqual(first.category_averages, {'Cuerpo': 4, 'Mente': 4})
+        self.assertEqual(second.values, [8, 8])
+        self.assertEqual(WellnessSurveyAnswer.objects.filter(session=first).count(), 4)
+
+        # Sin parámetros solo se lista el último intento
+        data = self.answers().json()
+        self.assertEqual(data['attempt'], second.id)
+        self.assertIsNotNone(parse_datetime(data['finished_at']))
+        self.assertEqual([c['category'] for c in data['categories']], ['Cuerpo', 'Mente'])
+        self.assertEqual(data['values'], [8, 8])
+        self.assertEqual({a['answer'] for c in data['categories'] for a in c['answers']}, {8})
+
+    def test_attempt_and_since_selectors(self):
+        first = self.submit(4)
+        second = self.submit(8)
+        data = self.answers(attempt=first.id).json()
+        self.assertEqual((data['attempt'], data['values']), (first.id, [4, 4]))
+        self.assertIsNone(self.answers(attempt=second.id + 100).json()['attempt'])
+        self.assertEqual(self.answers(attempt='x').status_code, 400)
+
+        before = (second.finished_at - timedelta(seconds=1)).isoformat()
+        self.assertEqual(self.answers(since=before).json()['attempt'], second.id)
+        self.assertIsNone(self.answers(since=second.finished_at.isoformat()).json()['attempt'])
+        self.assertEqual(self.answers(since=second.finished_at.date().isoformat()).json()['attempt'], second.id)
+        self.assertEqual(self.answers(since='ayer').status_code, 400)
+        self.assertEqual(self.answers().json()['attempt'], second.id)
+
+    def test_patch_after_completion_starts_new_attempt(self):
+        url = reverse('wellness-survey-session')
+        self.assertEqual(self.client.patch(url, {'current_step': 3}, format='json').data['current_step'], 3)
+        completed = self.submit(5)
+
+        response = self.client.patch(url, {'current_step': 2, 'is_completed': True}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['current_step'], 2)
+        self.assertFalse(response.data['is_completed'])
+        completed.refresh_from_db()
+        self.assertEqual((completed.is_completed, completed.current_step), (True, 1))
+        self.assertEqual(WellnessSurveySession.latest_completed(self.user), completed)
+        # El intento nuevo sigue en curso y es el que devuelve la sesión
+        self.assertEqual(self.client.patch(url, {'current_step': 4}, format='json').data['current_step'], 4)
+        self.assertEqual(self.client.get(url).data['current_step'], 4)
+        self.assertEqual(WellnessSurveySession.objects.filter(user=self.user, is_completed=False).count(), 2)
+
+
+class WellnessHistogramTests(TestCase):
+    """Histogramas de la población y comparativas del último intento."""
+
+    def submit(self, user, answers):
+        client = APIClient()
+        client.force_authenticate(user)
+        data = [
+            {'category': category, 'question': f'{category}-{i}', 'answer': answer}
+            for category, values in answers.items() for i, answer in enumerate(values)
+        ]
+        self.assertEqual(client.post(reverse('wellness-survey-answers'), data, format='json').status_code, 201)
+        return client
+
+    def counts(self, category, question=''):
+        counts = [0] * WellnessAnswerHistogram.BUCKETS
+        row = WellnessAnswerHistogram.objects.filter(category=category, question=question).first()
+        return row.counts if row else counts
+
+    def histogram(self, *values):
+        counts = [0] * WellnessAnswerHistogram.BUCKETS
+        for value in values:
+            counts[value] += 1
+        return counts
+
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(f'poblacion{i}', f'poblacion{i}@example.com', 'clave-segura-123')
+            for i in range(3)
+        ]
+        self.client = self.submit(self.users[0], {'Mente': [2, 4], 'Cuerpo': [10]})
+        self.submit(self.users[1], {'Mente': [6, 6], 'Cuerpo': [5]})
+        self.submit(self.users[2], {'Mente': [9, 8], 'Cuerpo': [5]})
+        # El primer usuario repite la encuesta: su intento anterior sale de los histogramas
+        self.submit(self.users[0], {'Mente': [7, 7], 'Cuerpo': [0]})
+
+    def test_migration_fills_histograms(self):
+        # Tras 0006 los intentos existentes ya cuentan; 0007 parte de ellos
+        migration = import_module('api.migrations.0007_wellness_answer_histogram')
+        expected = {(row.category, row.question): row.counts for row in WellnessAnswerHistogram.objects.all()}
+        WellnessAnswerHistogram.objects.all().delete()
+        migration.fill_histograms(django_apps, None)
+        self.assertEqual({(row.category, row.question): row.counts for row in WellnessAnswerHistogram.objects.all()},
+                         expected)
+        self.assertEqual(self.counts('Cuerpo'), self.histogram(0, 5, 5))
+
+        # Un reenvío posterior resta el intento que la migración contó
+        self.submit(self.users[1], {'Mente': [1, 1], 'Cuerpo': [1]})
+        self.assertEqual(self.counts('Cuerpo'), self.histogram(0, 1, 5))
+
+    def test_resubmission_replaces_previous_attempt(self):
+        self.assertEqual(self.counts('Mente'), self.histogram(7, 6, 9))
+        self.assertEqual(self.counts('Mente', 'Mente-0'), self.histogram(7, 6, 9))
+        self.assertEqual(self.counts('Mente', 'Mente-1'), self.histogram(7, 6, 8))
+        self.assertEqual(self.counts('Cuerpo'), self.histogram(0, 5, 5))
+        self.assertEqual(WellnessAnswerHistogram.objects.get(category='Cuerpo', question='').total, 3)
+        # Los contadores incrementales coinciden con el recálculo desde las respuestas
+        self.assertEqual(
+            {(row.category, row.question): row.counts for row in WellnessAnswerHistogram.objects.all()},
+            histograms.compute_histograms())
+
+    def test_benchmarks(self):
+        data = self.client.get(reverse('wellness-survey-benchmarks')).json()
+        self.assertEqual(data['attempt'], WellnessSurveySession.latest_completed(self.users[0]).id)
+        self.assertEqual(data['categories'], [
+            {'category': 'Cuerpo', 'value': 0, 'percentile': 16.7, 'mean': 3.33, 'median': 5.0, 'population': 3},
+            {'category': 'Mente', 'value': 7, 'percentile': 50.0, 'mean': 7.33, 'median': 7.0, 'population': 3},
+        ])
+
+    def test_median_and_percentile_edges(self):
+        self.assertEqual(histograms.median(self.histogram(1, 3)), 2.0)
+        self.assertEqual(histograms.median(self.histogram(4, 4, 9)), 4.0)
+        self.assertIsNone(histograms.median(self.histogram()))
+        self.assertIsNone(histograms.percentile(self.histogram(), 5))
+        self.assertEqual(histograms.percentile(self.histogram(10, 10), 10), 50.0)
+        # Los promedios se redondean al contador más cercano (.5 hacia arriba)
+        self.assertEqual(histograms.percentile(self.histogram(8, 9), 8.5), 75.0)
+
+
+class KeysetPaginationTests(TestCase):
+    """Paginación por cursor de los listados del usuario."""
+    fixtures = ['initial_modules']
+
+    def setUp(self):
+        self.user = User.objects.create_user('paginas', 'paginas@example.com', 'clave-segura-123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Declaration.objects.bulk_create([
+            Declaration(user=self.user, module_id=module_id, pillar=pillar, text=f'{module_id}-{pillar}-{i}')
+            for module_id in ('salud', 'carrera')
+            for pillar in ('Vision', 'Proposito')
+            for i in range(7)
+        ])
+        # Pocas marcas de tiempo distintas: la mayoría de las filas empatan en created_at
+        now = timezone.now()
+        for i, pk in enumerate(Declaration.objects.filter(user=self.user).values_list('pk', flat=True)):
+            Declaration.objects.filter(pk=pk).update(created_at=now - timedelta(minutes=i % 3))
+        UnlockedPillar.objects.bulk_create([
+            UnlockedPillar(user=self.user, module_id=module_id, pillar=pillar)
+            for module_id in ('salud', 'carrera', 'personalidad')
+            for pillar, _ in Declaration.PILLAR_CHOICES
+        ])
+        UnlockedPillar.objects.filter(user=self.user).update(unlocked_at=now)
+
+    def walk(self, name, **params):
+        ids = []
+        response = self.client.get(reverse(name), {**params, 'page_size': 4})
+        while True:
+            self.assertLessEqual(len(response.data['results']), 4)
+            ids.extend(row['id'] for row in response.data['results'])
+            if not response.data['next']:
+                return ids
+            response = self.client.get(response.data['next'])
+
+    def test_pages_follow_filters_without_gaps_or_repeats(self):
+        declarations = Declaration.objects.filter(user=self.user).order_by('-created_at', '-id')
+        for params in ({}, {'module': 'salud'}, {'module': 'carrera', 'pillar': 'Vision'}, {'pillar': 'Proposito'}):
+            with self.subTest(**params):
+                expected = declarations
+                if 'module' in params:
+                    expected = expected.filter(module_id=params['module'])
+                if 'pillar' in params:
+                    expected = expected.filter(pillar=params['pillar'])
+                self.assertEqual(self.walk('declaration-list', **params), list(expected.values_list('pk', flat=True)))
+
+        pillars = UnlockedPillar.objects.filter(user=self.user, module_id='carrera').order_by('-id')
+        self.assertEqual(self.walk('unlockedpillar-list', module='carrera'), list(pillars.values_list('pk', flat=True)))
+
+    def test_previous_page_with_tied_timestamps(self):
+        first = self.client.get(reverse('declaration-list'), {'page_size': 5})
+        second = self.client.get(first.data['next'])
+        third = self.client.get(second.data['next'])
+        # Las páginas caen dentro de filas con la misma fecha
+        self.assertEqual(len({row['created_at'] for row in first.data['results'] + second.data['results']}), 1)
+        self.assertEqual(self.client.get(second.data['previous']).data['results'], first.data['results'])
+        self.assertEqual(self.client.get(third.data['previous']).data['results'], second.data['results'])
+        self.assertIsNone(self.client.get(second.data['previous']).data['previous'])
+        self.assertEqual(self.client.get(reverse('declaration-list'), {'cursor': 'no-es-un-cursor'}).status_code, 404)
+
+    def test_without_cursor_returns_full_list(self):
+        response = self.client.get(reverse('declaration-list'), {'module': 'salud'})
+        self.assertIsInstance(response.data, list)
+        self.assertEqual(len(response.data), 14)
+        self.assertIsInstance(self.client.get(reverse('unlockedpillar-list')).data, list)
+        self.assertEqual(len(self.client.get(reverse('declaration-list'), {'page_size': 500}).data['results']), 28)
@@ -2,9 +2,10 @@
 """
 URL patterns for the API app.
 """
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import async_views, views
 from .views import UserMissionsAPIView
 
 # Create a router and register our viewsets
@@ -18,6 +19,16 @@ router.register(r'habits', views.HabitViewSet)
 router.register(r'comfortwall', views.ComfortWallViewSet)
 router.register(r'achievements', views.AchievementViewSet)  # <-- NUEVO
 
+# Vistas de lectura: async en modo ASGI (ver api/async_views.py), DRF en WSGI
+if settings.ASYNC_READ_VIEWS:
+    user_missions_view = async_views.user_missions
+    progress_overview_view = async_views.progress_overview
+    module_progress_view = async_views.module_progress
+else:
+    user_missions_view = UserMissionsAPIView.as_view()
+    progress_overview_view = views.ProgressOverviewView.as_view()
+    module_progress_view = views.ModuleProgressView.as_view()
+
 # Rutas personalizadas primero para evitar conflictos con el router DRF
 urlpatterns = [
     # Auth endpoints
@@ -30,11 +41,21 @@ urlpatterns = [
     path('missions/<uuid:mission_id>/complete/', views.MissionCompleteView.as_view(), name='mission-complete'),
 
     # User missions endpoint (unificado)
-    path('user-missions/', UserMissionsAPIView.as_view(), name='user-missions'),
+    path('user-missions/', user_missions_view, name='user-missions'),
 
     # Progress endpoints
-    path('progress/overview/', views.ProgressOverviewView.as_view(), name='progress-overview'),
-    path('progress/module/<str:module_id>/', views.ModuleProgressView.as_view(), name='module-progress'),
+    path('progress/overview/', progress_overview_view, name='progress-overview'),
+    path('progress/module/<str:module_id>/', module_progress_view, name='module-progress'),
+
+    # Eventos en tiempo real (SSE, solo bajo ASGI)
+    path('events/token/', views.EventStreamTokenView.as_view(), name='events-token'),
+    path('events/stream/', async_views.events_stream, name='events-stream'),
+
+    # Carga inicial del dashboard en un solo request
+    path('bootstrap/', views.BootstrapView.as_view(), name='bootstrap'),
+
+    # Cambios incrementales del estado del usuario
+    path('sync/changes/', views.SyncChangesView.as_view(), name='sync-changes'),
 
 # Wellness Survey URLs
     path('wellness-survey/', include('api.wellness_survey.urls')),
@@ -0,0 +1,44 @@
+"""
+Consultas de las vistas async.
+
+Por defecto `gather` ejecuta las funciones en orden con un solo salto al hilo
+sync del request, sobre su conexión: un request async usa una conexión, igual
+que uno de un worker sync.
+
+Con `ASYNC_PARALLEL_QUERIES = True` cada función corre en un hilo del pool con
+su propia conexión (`thread_sensitive=False`), así que las consultas
+independientes de una vista corren a la vez. Con `CONN_MAX_AGE = 0` cada una de
+esas conexiones se abre y se cierra en el momento: un request de N consultas
+abre N conexiones. Solo conviene activarlo con un pooler delante de PostgreSQL
+(PgBouncer en modo transaction), que reutiliza las conexiones del servidor.
+"""
+
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+
+def _with_own_connection(function):
+    def run():
+        close_old_connections()
+        try:
+            return function()
+        finally:
+            close_old_connections()
+    return run
+
+
+def _in_order(functions):
+    return [function() for function in functions]
+
+
+async def gather(*functions):
+    """Ejecuta funciones sync del ORM y devuelve sus resultados en el mismo orden."""
+    if not getattr(settings, 'ASYNC_PARALLEL_QUERIES', False) or len(functions) < 2:
+        return await sync_to_async(_in_order)(functions)
+    return await asyncio.gather(*(
+        sync_to_async(_with_own_connection(function), thread_sensitive=False)()
+        for function in functions
+    ))
@@ -0,0 +1,50 @@
+"""
+Utilidades compartidas por los comandos de benchmark.
+
+Los benchmarks siembran datos dentro de una transacción que se revierte al
+terminar, de modo que pueden ejecutarse contra cualquier base sin dejar rastro.
+"""
+
+import math
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+
+
+@contextmanager
+def rollback_after():
+    """Ejecuta el bloque dentro de una transacción que siempre se revierte."""
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def measure(fn, repeat=5):
+    """
+    Ejecuta `fn` `repeat` veces y devuelve (consultas de la última ejecución,
+    latencia mediana en milisegundos).
+    """
+    timings = []
+    counter = []
+
+    def count_query(execute, sql, params, many, context):
+        counter.append(sql)
+        return execute(sql, params, many, context)
+
+    for _ in range(repeat):
+        counter.clear()
+        with connection.execute_wrapper(count_query):
+            start = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - start) * 1000)
+    return len(counter), statistics.median(timings)
+
+
+def percentile(samples, point):
+    """Percentil `point` (0-100) de una lista ordenada, por rango más cercano."""
+    if not samples:
+        return None
+    index = max(0, min(len(samples) - 1, math.ceil(point / 100 * len(samples)) - 1))
+    return samples[index]
@@ -0,0 +1,60 @@
+"""
+Carga inicial del dashboard en un solo request (endpoint /bootstrap/).
+
+Al iniciar sesión el frontend pedía `/auth/me/`, `/progress/overview/`,
+`/modules/`, `/user-missions/` y `/unlocked-pillars/` uno tras otro, y cada
+uno volvía a autenticar el JWT y a consultar el mapa de estados de módulo, el
+progreso de misiones y las rachas. Aquí cada tabla del usuario se lee una sola
+vez, los módulos y misiones salen del catálogo en memoria, y cada parte se
+serializa con el mismo serializer que su endpoint, así que el JSON es idéntico.
+"""
+
+from django.utils import timezone
+
+from api.models import MissionProgress, ModuleProgress, Streak, UnlockedPillar, UserProgressSummary
+from api.serializers import (
+    ModuleSerializer, ProgressOverviewSerializer, UnlockedPillarSerializer, UserProfileDetailSerializer
+)
+from api.utils.catalog import get_catalog
+from api.utils.mission_board import build_mission_board_from
+from api.utils.request_loader import get_request_loader
+from api.utils.serializers_helpers import overview_data
+
+
+def build_bootstrap(request, context):
+    """Devuelve {me, progress_overview, modules, user_missions, unlocked_pillars}."""
+    user = request.user
+    catalog = get_catalog()
+
+    # Resumen de progreso y perfil (me y overview) en una consulta
+    summary = UserProgressSummary.for_user(user)
+    profile = summary.user.profile
+    module_progress = list(ModuleProgress.objects.filter(user=user))
+    mission_progress = list(MissionProgress.objects.filter(user=user).select_related('mission'))
+    streaks = list(Streak.objects.filter(user=user))
+
+    # Los serializers de /auth/me/ y /modules/ leen estos datos del RequestLoader
+    get_request_loader(request).prefetch(
+        modules=catalog.modules,
+        module_progress=module_progress,
+        streaks=streaks,
+        active_missions=[mp for mp in mission_progress if mp.state == 'active'],
+    )
+
+    missions = list(catalog.missions.values())
+    user_missions = build_mission_board_from(
+        user,
+        missions,
+        {mp.mission_id: mp for mp in mission_progress},
+        {progress.module_id for progress in module_progress if progress.state == 'unlocked'},
+        timezone.now(),
+    )
+    return {
+        'me': UserProfileDetailSerializer(profile, context=context).data,
+        'progress_overview': ProgressOverviewSerializer(overview_data(summary, profile.get_level_title())).data,
+        'modules': ModuleSerializer(list(catalog.modules.values()), many=True, context=context).data,
+        'user_missions': user_missions,
+        'unlocked_pillars': UnlockedPillarSerializer(
+            UnlockedPillar.objects.filter(user=user), many=True, context=context
+        ).data,
+    }
@@ -0,0 +1,128 @@
+"""
+Catálogo de dominio en memoria.
+
+Módulos, misiones y títulos de nivel cambian solo desde el admin o al cargar
+fixtures, así que cada proceso los carga una vez en un objeto inmutable con
+índices (orden de módulos, misiones por módulo/frecuencia/requisito, grafo de
+requisitos). Los demás workers detectan cambios comparando `CatalogVersion`
+como máximo cada `DOMAIN_CATALOG_CHECK_SECONDS` segundos; el proceso que hace
+el cambio invalida su copia al instante.
+
+Las instancias de modelo que entrega el catálogo son compartidas: se pueden
+usar como claves foráneas o para leer campos, pero no deben modificarse.
+"""
+
+import json
+import os
+import time
+from collections import defaultdict
+from types import MappingProxyType
+
+from django.conf import settings
+
+from api.models import CatalogVersion, LevelTitle, Mission, Module
+
+DEFAULT_CHECK_SECONDS = 5
+LEVEL_TITLES_FIXTURE = os.path.join(os.path.dirname(__file__), '..', 'fixtures', 'level_titles.json')
+
+
+def _freeze(index):
+    return MappingProxyType({key: tuple(values) for key, values in index.items()})
+
+
+class DomainCatalog:
+    """Foto inmutable del catálogo para una versión dada."""
+
+    def __init__(self, version, modules, missions, level_titles):
+        from api.utils.mission_logic import RequirementGraph
+
+        self.version = version
+        modules = sorted(modules, key=lambda module: module.order)
+        self.modules = MappingProxyType({module.id: module for module in modules})
+        self.module_order = tuple(module.id for module in modules)
+        self._next_module = MappingProxyType(dict(zip(self.module_order, self.module_order[1:])))
+
+        self.missions = MappingProxyType({str(mission.id): mission for mission in missions})
+        by_module = defaultdict(list)
+        by_frequency = defaultdict(list)
+        by_requirement = defaultdict(list)
+        for mission in missions:
+            by_module[mission.module_id].append(mission)
+            by_frequency[mission.frequency].append(mission)
+            for req in mission.requirements or []:
+                by_requirement[(req.get("type"), str(req.get("id")))].append(mission)
+        self.missions_by_module = _freeze(by_module)
+        self.missions_by_frequency = _freeze(by_frequency)
+        self.missions_by_requirement = _freeze(by_requirement)
+        self.requirement_graph = RequirementGraph(missions)
+
+        self.level_titles = MappingProxyType(dict(level_titles))
+
+    @classmethod
+    def build(cls, version):
+        level_titles = dict(LevelTitle.objects.values_list('level', 'title'))
+        if not level_titles:
+            # Sin títulos cargados en la base (load_level_titles): usar el fixture
+            with open(LEVEL_TITLES_FIXTURE, 'r', encoding='utf-8') as f:
+                level_titles = {item["level"]: item["title"] for item in json.load(f)}
+        return cls(
+            version,
+            list(Module.objects.all()),
+            list(Mission.objects.all()),
+            level_titles,
+        )
+
+    def module(self, module_id):
+        return self.modules.get(module_id)
+
+    def order_of(self, module_id):
+        return self.modules[module_id].order
+
+    def next_module(self, module_id):
+        """Módulo siguiente en orden, o None si es el último."""
+        next_id = self._next_module.get(module_id)
+        return self.modules[next_id] if next_id else None
+
+    def mission(self, mission_id):
+        return self.missions.get(str(mission_id))
+
+    def missions_for_module(self, module_id):
+        return self.missions_by_module.get(module_id, ())
+
+    def missions_with_frequency(self, frequency):
+        return self.missions_by_frequency.get(frequency, ())
+
+    def missions_requiring(self, kind, target_id):
+        """Misiones con un requisito del tipo dado ("mission", "module", "pillar")."""
+        return self.missions_by_requirement.get((kind, str(target_id)), ())
+
+    def level_title(self, level, default="Aventurero"):
+        return self.level_titles.get(level, default)
+
+
+_catalog = None
+_checked_at = 0.0
+
+
+def get_catalog():
+    """
+    Devuelve el catálogo del proceso. Revisa la versión compartida como máximo
+    cada `DOMAIN_CATALOG_CHECK_SECONDS` y lo reconstruye si cambió.
+    """
+    global _catalog, _checked_at
+    now = time.monotonic()
+    interval = getattr(settings, 'DOMAIN_CATALOG_CHECK_SECONDS', DEFAULT_CHECK_SECONDS)
+    if _catalog is not None and now - _checked_at < interval:
+        return _catalog
+
+    version, _ = CatalogVersion.current()
+    if _catalog is None or _catalog.version != version:
+        _catalog = DomainCatalog.build(version)
+    _checked_at = now
+    return _catalog
+
+
+def invalidate_catalog():
+    """Descarta la copia local (se llama al cambiar el catálogo en este proceso)."""
+    global _catalog
+    _catalog = None
@@ -0,0 +1,155 @@
+"""
+Registro de cambios del estado de cada usuario para `/api/sync/changes/`.
+
+Cada guardado o borrado de ModuleProgress, MissionProgress, Streak,
+Declaration, Habit, ComfortWall y UnlockedPillar se anota en `UserChange`
+(una fila por objeto) con el siguiente valor del contador `ChangeSequence`
+del usuario, dentro de la misma transacción que escribe la fila: si la
+escritura se revierte, la anotación también. Los guardados pasan por
+`UserStateModel.save`, que abre la transacción alrededor de post_save, y los
+borrados ya corren dentro de la del Collector de Django. Las escrituras en
+lote (`bulk_create`, `update`) no disparan señales: quien las hace llama a
+`record` o `record_rows` dentro de su `transaction.atomic()`.
+
+El contador se incrementa en la misma transacción que anota los cambios y
+bloquea su fila hasta el commit, así que un cliente que leyó el cursor N
+nunca se salta un cambio con número menor o igual a N que aún no estaba
+confirmado.
+"""
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save
+
+from api.models import (
+    ChangeSequence, ComfortWall, Declaration, Habit, MissionProgress, ModuleProgress, Streak, UnlockedPillar,
+    UserChange
+)
+
+# Modelo → tipo de cambio (clave de la respuesta de /sync/changes/)
+KINDS = {
+    ModuleProgress: 'module_progress',
+    MissionProgress: 'mission_progress',
+    Streak: 'streaks',
+    Declaration: 'declarations',
+    Habit: 'habits',
+    ComfortWall: 'comfort_walls',
+    UnlockedPillar: 'unlocked_pillars',
+}
+
+
+def record(user_id, kind, ids, deleted=False):
+    """
+    Anota que los objetos `ids` de un tipo cambiaron (o se borraron). Se llama
+    dentro de la transacción que escribió las filas y se confirma con ella.
+    """
+    ids = list(ids)
+    if not ids:
+        return
+    with transaction.atomic(savepoint=False):
+        seq = _next_seq(user_id)
+        UserChange.objects.bulk_create(
+            [UserChange(user_id=user_id, kind=kind, object_id=pk, seq=seq, deleted=deleted) for pk in ids],
+            update_conflicts=True,
+            unique_fields=['user', 'kind', 'object_id'],
+            update_fields=['seq', 'deleted', 'changed_at'],
+        )
+
+
+def record_rows(queryset):
+    """Anota como cambiadas las filas de `queryset` (tras escrituras en lote, en su transacción)."""
+    by_user = {}
+    for user_id, pk in queryset.order_by().values_list('user_id', 'pk'):
+        by_user.setdefault(user_id, []).append(pk)
+    kind = KINDS[queryset.model]
+    for user_id, ids in by_user.items():
+        record(user_id, kind, ids)
+
+
+def _next_seq(user_id):
+    """Incrementa (o crea) el contador del usuario y devuelve su valor en una sola consulta."""
+    quote = connection.ops.quote_name
+    table = quote(ChangeSequence._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({quote('user_id')}, {quote('value')}) VALUES (%s, 1) "
+            f"ON CONFLICT ({quote('user_id')}) DO UPDATE SET {quote('value')} = {table}.{quote('value')} + 1 "
+            f"RETURNING {quote('value')}",
+            [user_id],
+        )
+        return cursor.fetchone()[0]
+
+
+def current_cursor(user):
+    return ChangeSequence.objects.filter(user=user).values_list('value', flat=True).first() or 0
+
+
+def changes_since(user, since, context=None):
+    """
+    Filas cambiadas después del cursor `since`, serializadas por tipo, y los
+    ids borrados. Sin cursor, con uno desconocido o con más de
+    `SYNC_CHANGES_MAX` cambios responde `reset: true` y el cliente recarga todo.
+    """
+    from api.serializers import (
+        ComfortWallSerializer, DeclarationSerializer, HabitSerializer, MissionProgressSerializer,
+        ModuleProgressSerializer, StreakSerializer, UnlockedPillarSerializer
+    )
+    sources = {
+        'module_progress': (ModuleProgress.objects.select_related('module'), ModuleProgressSerializer),
+        'mission_progress': (MissionProgress.objects.select_related('mission__module'), MissionProgressSerializer),
+        'streaks': (Streak.objects.select_related('module'), StreakSerializer),
+        'declarations': (Declaration.objects.all(), DeclarationSerializer),
+        'habits': (Habit.objects.select_related('user'), HabitSerializer),
+        'comfort_walls': (ComfortWall.objects.select_related('user'), ComfortWallSerializer),
+        'unlocked_pillars': (UnlockedPillar.objects.all(), UnlockedPillarSerializer),
+    }
+
+    # El cursor se lee antes que los cambios: lo confirmado después queda para la próxima consulta
+    cursor = current_cursor(user)
+    payload = {'cursor': cursor, 'reset': False, 'changes': {}, 'deleted': {}}
+    if since is None or since > cursor:
+        payload['reset'] = True
+        return payload
+
+    limit = settings.SYNC_CHANGES_MAX
+    rows = list(UserChange.objects
+        .filter(user=user, seq__gt=since, seq__lte=cursor)
+        .values_list('kind', 'object_id', 'deleted')[:limit + 1])
+    if len(rows) > limit:
+        payload['reset'] = True
+        return payload
+
+    changed = {}
+    deleted = {}
+    for kind, pk, is_deleted in rows:
+        (deleted if is_deleted else changed).setdefault(kind, set()).add(pk)
+    for kind, ids in changed.items():
+        queryset, serializer_class = sources[kind]
+        objects = list(queryset.filter(user=user, pk__in=ids).order_by('pk'))
+        payload['changes'][kind] = serializer_class(objects, many=True, context=context or {}).data
+        # Anotado pero ya no existe (p. ej. la transacción se revirtió): se informa como borrado
+        missing = ids - {obj.pk for obj in objects}
+        if missing:
+            deleted.setdefault(kind, set()).update(missing)
+    payload['deleted'] = {kind: sorted(ids) for kind, ids in deleted.items()}
+    return payload
+
+
+def _saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        record(instance.user_id, KINDS[sender], [instance.pk])
+
+
+def _deleted(sender, instance, origin=None, **kwargs):
+    # Al borrar el usuario sus cambios se borran con él
+    if isinstance(origin, User) or getattr(origin, 'model', None) is User:
+        return
+    record(instance.user_id, KINDS[sender], [instance.pk], deleted=True)
+
+
+def install():
+    """Conecta las señales de los modelos con estado del usuario."""
+    for model in KINDS:
+        post_save.connect(_saved, sender=model, dispatch_uid=f'changes-saved-{model.__name__}')
+        post_delete.connect(_deleted, sender=model, dispatch_uid=f'changes-deleted-{model.__name__}')
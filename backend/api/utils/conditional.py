@@ -0,0 +1,94 @@
+"""
+Respuestas condicionales (ETag / Last-Modified) para vistas de lectura de DRF.
+
+El validador se arma con la versión del catálogo (`CatalogVersion`) y, en las
+vistas que incluyen estado del usuario, con la versión de su resumen de
+progreso. Si el cliente ya tiene esa versión se responde 304 sin evaluar el
+queryset ni serializar.
+"""
+
+from django.db.models import Subquery
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+from api.models import CatalogVersion, UserProgressSummary
+
+
+def catalog_validators(user=None, name=CatalogVersion.CATALOG):
+    """
+    Devuelve (etag, última modificación) del catálogo y, si se indica `user`,
+    de su estado. Se resuelve con una sola consulta.
+    """
+    if user is None:
+        version, modified = CatalogVersion.current(name)
+        return f'"{name}-{version}"', modified
+
+    catalog = CatalogVersion.objects.filter(name=name)
+    row = (UserProgressSummary.objects
+        .filter(user=user)
+        .annotate(
+            catalog_version=Subquery(catalog.values('version')[:1]),
+            catalog_modified=Subquery(catalog.values('updated_at')[:1]),
+        )
+        .values_list('version', 'updated_at', 'catalog_version', 'catalog_modified')
+        .first())
+    if row is None:
+        summary = UserProgressSummary.rebuild(user.pk)
+        version, modified = CatalogVersion.current(name)
+        row = (summary.version, summary.updated_at, version, modified)
+
+    user_version, user_modified, version, modified = row
+    modified = max(filter(None, (modified, user_modified)), default=None)
+    return f'"{name}-{version or 0}.u{user.pk}-{user_version}"', modified
+
+
+def is_not_modified(request, etag, last_modified):
+    """Evalúa If-None-Match (o, en su ausencia, If-Modified-Since)."""
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        etags = {tag.removeprefix('W/') for tag in parse_etags(if_none_match)}
+        return etag in etags or '*' in etags
+    if last_modified is not None:
+        since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        return since is not None and int(last_modified.timestamp()) <= since
+    return False
+
+
+class ConditionalGetMixin:
+    """
+    Agrega ETag/Last-Modified a `list` y `retrieve` y responde 304 cuando el
+    cliente ya tiene la versión vigente. Con `user_scoped = True` el validador
+    incluye la versión del estado del usuario (p. ej. `ModuleSerializer.state`).
+    """
+    catalog_name = CatalogVersion.CATALOG
+    user_scoped = False
+
+    def get_validators(self, request):
+        user = request.user if self.user_scoped else None
+        etag, last_modified = catalog_validators(user, self.catalog_name)
+        # El contenido depende del formato negociado (JSON o API navegable)
+        fmt = request.accepted_renderer.format
+        if fmt != 'json':
+            etag = f'{etag[:-1]}.{fmt}"'
+        return etag, last_modified
+
+    def _conditional(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        if is_not_modified(request, etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(super().retrieve, request, *args, **kwargs)
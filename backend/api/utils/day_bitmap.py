@@ -0,0 +1,45 @@
+"""
+Operaciones sobre bitmaps de días.
+
+Un calendario de actividad se representa como un entero donde el bit i indica
+actividad el día `origen + i`. Se guarda como bytes little-endian, de modo que
+un año de actividad ocupa menos de 50 bytes y las rachas se calculan con
+operaciones de bits sobre una sola lectura.
+"""
+
+
+def from_bytes(data) -> int:
+    return int.from_bytes(bytes(data or b""), "little")
+
+
+def to_bytes(bits: int) -> bytes:
+    return bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+
+
+def run_ending_at(bits: int, index: int) -> int:
+    """Largo de la secuencia de días activos consecutivos que termina en `index`."""
+    if index < 0:
+        return 0
+    mask = (1 << (index + 1)) - 1
+    gaps = ~bits & mask
+    if not gaps:
+        return index + 1
+    return index - (gaps.bit_length() - 1)
+
+
+def longest_run(bits: int) -> int:
+    """Largo de la secuencia de unos consecutivos más larga."""
+    length = 0
+    while bits:
+        bits &= bits >> 1
+        length += 1
+    return length
+
+
+def count_in_window(bits: int, end_index: int, days: int) -> int:
+    """Cantidad de días activos en los `days` días que terminan en `end_index`."""
+    if end_index < 0 or days <= 0:
+        return 0
+    start = max(0, end_index - days + 1)
+    window = (bits >> start) & ((1 << (end_index - start + 1)) - 1)
+    return window.bit_count()
@@ -0,0 +1,174 @@
+"""
+Efectos de las declaraciones y sincronización en lote de las creadas offline.
+
+Toda declaración nueva se guarda con `synced=False` y sus efectos (XP del
+primer pilar, racha, desbloqueo del módulo siguiente y misiones) los aplica
+`apply_pending_declarations` una vez por módulo, para todas las pendientes del
+usuario a la vez; al terminar cada módulo sus filas pasan a `synced=True`.
+`DeclarationViewSet.perform_create` la encola en api/utils/tasks.py, así que
+con `DEFERRED_TASKS` una ráfaga de declaraciones se procesa en una sola
+ejecución del worker.
+
+El cliente offline envía en un solo request las declaraciones de una sesión
+sin conexión, cada una con su `client_id`. Se insertan con un único
+`bulk_create(ignore_conflicts=True)` y sus efectos se aplican en el mismo
+request. Si el proceso se corta a mitad, el reintento con los mismos
+`client_id` (o el worker) encuentra las filas pendientes y completa sus
+efectos; todos son idempotentes.
+"""
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from api.models import Declaration, Streak, unlock_next_module_if_declared
+from api.serializers import DeclarationSyncItemSerializer
+from api.utils import changes, tasks
+from api.utils.catalog import get_catalog
+from api.utils.mission_logic import check_and_complete_missions
+from api.utils.module_unlocks import evaluate_module_unlocks
+from api.utils.xp import award_xp
+
+CREATED = 'created'
+DUPLICATE = 'duplicate'
+INVALID = 'invalid'
+
+
+def declaration_xp(module_id):
+    """XP de la primera declaración de un pilar: base 20 + 10 * (orden-1)."""
+    return 20 + 10 * (get_catalog().order_of(module_id) - 1)
+
+
+def _validate(items):
+    """Devuelve (resultados de los inválidos por índice, [(índice, datos válidos)])."""
+    results = {}
+    rows = []
+    for index, item in enumerate(items):
+        serializer = DeclarationSyncItemSerializer(data=item)
+        if serializer.is_valid():
+            rows.append((index, serializer.validated_data))
+        else:
+            results[index] = {
+                'client_id': item.get('client_id'),
+                'status': INVALID,
+                'errors': serializer.errors,
+            }
+    return results, rows
+
+
+def _apply_effects(user, module_id, pillars, declared_before):
+    """Efectos de las declaraciones nuevas de un módulo; devuelve las misiones completadas."""
+    for pillar in sorted(pillars):
+        if (module_id, pillar) not in declared_before:
+            award_xp(user, declaration_xp(module_id), 'declaration', f"{module_id}:{pillar}")
+    streak, _ = Streak.objects.get_or_create(user=user, module_id=module_id)
+    streak.update_streak()
+    unlock_next_module_if_declared(user, module_id)
+    return check_and_complete_missions(user, module_id)
+
+
+def apply_pending(user):
+    """
+    Aplica los efectos de las declaraciones del usuario con `synced=False` y
+    devuelve los ids de las misiones completadas.
+    """
+    pending = {}
+    for module_id, pillar, pk in (Declaration.objects
+            .filter(user=user, synced=False).values_list('module_id', 'pillar', 'id')):
+        pending.setdefault(module_id, {}).setdefault(pillar, []).append(pk)
+    if not pending:
+        return []
+
+    declared_before = set(Declaration.objects
+        .filter(user=user, module_id__in=pending, synced=True)
+        .order_by().values_list('module_id', 'pillar').distinct())
+    missions_completed = []
+    for module_id in sorted(pending, key=get_catalog().order_of):
+        ids = [pk for pks in pending[module_id].values() for pk in pks]
+        with transaction.atomic():
+            # Bloquea las filas: si otro proceso (worker o reintento del cliente)
+            # ya las aplicó no queda ninguna. Repetir efectos no es un problema
+            # porque son idempotentes; solo se evita el trabajo.
+            if not Declaration.objects.filter(id__in=ids, synced=False).update(synced=True):
+                continue
+            changes.record(user.pk, changes.KINDS[Declaration], ids)
+            missions_completed += _apply_effects(user, module_id, pending[module_id], declared_before)
+    # Reevaluar desbloqueos una sola vez tras XP, rachas y misiones
+    evaluate_module_unlocks(user)
+    return missions_completed
+
+
+def apply_pending_declarations(user_id):
+    """Tarea de la cola: efectos de las declaraciones pendientes del usuario."""
+    user = User.objects.filter(pk=user_id).first()
+    if user is not None:
+        apply_pending(user)
+
+
+def enqueue_declaration_effects(user_id):
+    """
+    Encola (o aplica, sin `DEFERRED_TASKS`) los efectos de las declaraciones
+    pendientes del usuario; una sola tarea por usuario a la vez. Devuelve True
+    si ya se aplicaron.
+    """
+    return tasks.enqueue(apply_pending_declarations, f'declarations:{user_id}', user_id=user_id)
+
+
+def requeue_pending_declarations():
+    """Encola los efectos de cada usuario con declaraciones pendientes; devuelve cuántos."""
+    user_ids = list(Declaration.objects.filter(synced=False).order_by().values_list('user_id', flat=True).distinct())
+    for user_id in user_ids:
+        enqueue_declaration_effects(user_id)
+    return len(user_ids)
+
+
+def sync_declarations(user, items):
+    """
+    Inserta el lote y aplica sus efectos. Devuelve (resultados en el orden de
+    `items`, ids de misiones completadas). Cada resultado trae `client_id`,
+    `status` (created, duplicate o invalid), `id` de la declaración en el
+    servidor y `synced`, o `errors` si el elemento no es válido.
+    """
+    results, rows = _validate(items)
+    client_ids = {data['client_id'] for _, data in rows}
+
+    already_synced = set(Declaration.objects
+        .filter(user=user, client_id__in=client_ids, synced=True)
+        .values_list('client_id', flat=True))
+    with transaction.atomic():
+        Declaration.objects.bulk_create(
+            [Declaration(user=user, module_id=data['module'], pillar=data['pillar'], text=data['text'],
+                         client_id=data['client_id'], synced=False)
+             for _, data in rows if data['client_id'] not in already_synced],
+            ignore_conflicts=True,
+        )
+
+    stored = dict(Declaration.objects
+        .filter(user=user, client_id__in=client_ids)
+        .values_list('client_id', 'id'))
+    # Incluye las de un intento anterior cortado o aún en la cola de tareas
+    missions_completed = apply_pending(user)
+
+    # Elementos sin fila propia: mismo texto que una declaración existente
+    content_ids = {}
+    if len(stored) < len(client_ids):
+        content_ids = {
+            (module_id, pillar, text): pk
+            for pk, module_id, pillar, text in Declaration.objects
+                .filter(user=user, module_id__in={data['module'] for _, data in rows},
+                        text__in={data['text'] for _, data in rows if data['client_id'] not in stored})
+                .values_list('id', 'module_id', 'pillar', 'text')
+        }
+
+    seen = set()
+    for index, data in rows:
+        client_id = data['client_id']
+        if client_id in stored and client_id not in seen:
+            status = DUPLICATE if client_id in already_synced else CREATED
+            pk = stored[client_id]
+        elif client_id in stored:
+            status, pk = DUPLICATE, stored[client_id]
+        else:
+            status, pk = DUPLICATE, content_ids.get((data['module'], data['pillar'], data['text']))
+        seen.add(client_id)
+        results[index] = {'client_id': client_id, 'status': status, 'id': pk, 'synced': True}
+    return [results[index] for index in range(len(items))], missions_completed
@@ -0,0 +1,221 @@
+"""
+Eventos en tiempo real para `/api/events/stream/` (server-sent events).
+
+Las rutas de escritura publican con `publish` los cambios que el dashboard
+antes detectaba consultando `/progress/overview/`: módulo desbloqueado,
+misión completada y XP otorgada. El evento sale cuando la transacción se
+confirma (`transaction.on_commit`), así que nunca se anuncia algo revertido.
+
+El broker de cada proceso reparte los eventos a las conexiones SSE abiertas en
+ese proceso. El backend (`EVENTS_BACKEND`) decide cómo llegan los eventos de
+los demás workers:
+
+- `LocalBackend`: solo el proceso que publica. Sirve con un worker y en
+  desarrollo.
+- `PostgresBackend`: `NOTIFY` en PostgreSQL; cada proceso con conexiones SSE
+  mantiene un hilo con `LISTEN` y reparte lo que recibe, incluidos sus propios
+  eventos.
+
+Sin `EVENTS_BACKEND` se usa `PostgresBackend` si la base es PostgreSQL y
+`LocalBackend` en otro caso. Elegir `LocalBackend` con PostgreSQL deja un aviso
+en el log: con varios workers los clientes conectados a otro proceso no
+reciben los eventos.
+
+Los eventos no se guardan: un cliente que se reconecta se pone al día con
+`/api/sync/changes/`.
+"""
+
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core import signing
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+MODULE_UNLOCKED = 'module_unlocked'
+MISSION_COMPLETED = 'mission_completed'
+XP_AWARDED = 'xp_awarded'
+
+# Eventos pendientes por conexión; si el cliente no los lee se descartan los más viejos
+QUEUE_SIZE = 100
+
+# Los tokens del stream no sirven como otras firmas del proyecto
+STREAM_TOKEN_SALT = 'api.events.stream'
+
+
+class Subscription:
+    """Cola de eventos de una conexión SSE, ligada a su event loop."""
+
+    def __init__(self, user_id, loop):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def put(self, event):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout):
+        """Siguiente evento, o None si no llega ninguno en `timeout` segundos."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class Broker:
+    """Reparte los eventos a las suscripciones del proceso, desde cualquier hilo."""
+
+    def __init__(self, backend_class):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+        self.backend = backend_class(self)
+
+    def subscribe(self, user_id):
+        subscription = Subscription(user_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+        self.backend.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def dispatch(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(event['user'], ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # Event loop ya cerrado: la conexión se está terminando
+                self.unsubscribe(subscription)
+
+
+class LocalBackend:
+    """Eventos solo dentro del proceso que los publica."""
+
+    def __init__(self, broker):
+        self.broker = broker
+
+    def start(self):
+        pass
+
+    def publish(self, event):
+        self.broker.dispatch(event)
+
+
+class PostgresBackend:
+    """Eventos entre procesos con LISTEN/NOTIFY de PostgreSQL."""
+    channel = 'dividis_events'
+    reconnect_seconds = 5
+
+    def __init__(self, broker):
+        self.broker = broker
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._listen, name='dividis-events', daemon=True)
+                self._thread.start()
+
+    def publish(self, event):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [self.channel, json.dumps(event)])
+
+    def _listen(self):
+        import psycopg2
+        from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+        while True:
+            listener = None
+            try:
+                listener = psycopg2.connect(**connection.get_connection_params())
+                listener.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+                with listener.cursor() as cursor:
+                    cursor.execute(f'LISTEN {self.channel}')
+                while True:
+                    if select.select([listener], [], [], 30) == ([], [], []):
+                        continue
+                    listener.poll()
+                    while listener.notifies:
+                        self.broker.dispatch(json.loads(listener.notifies.pop(0).payload))
+            except Exception:
+                logger.exception("Se perdió la conexión LISTEN de eventos; reintentando")
+                if listener is not None:
+                    listener.close()
+                time.sleep(self.reconnect_seconds)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def backend_path():
+    """Backend de `EVENTS_BACKEND`, o el que corresponde a la base de datos si no está definido."""
+    if settings.EVENTS_BACKEND:
+        return settings.EVENTS_BACKEND
+    if connection.vendor == 'postgresql':
+        return 'api.utils.events.PostgresBackend'
+    return 'api.utils.events.LocalBackend'
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            backend_class = import_string(backend_path())
+            if backend_class is LocalBackend and connection.vendor == 'postgresql':
+                logger.warning("EVENTS_BACKEND es LocalBackend: con varios workers los eventos solo llegan "
+                               "a las conexiones SSE del proceso que los publica")
+            _broker = Broker(backend_class)
+        return _broker
+
+
+def stream_token(user_id):
+    """Token firmado para `?token=` de /api/events/stream/; caduca en EVENTS_TOKEN_MAX_AGE segundos."""
+    return signing.dumps(user_id, salt=STREAM_TOKEN_SALT)
+
+
+def read_stream_token(token):
+    """Id del usuario de un token de `stream_token`, o None si no es válido o caducó."""
+    try:
+        return signing.loads(token, salt=STREAM_TOKEN_SALT, max_age=settings.EVENTS_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+
+
+def publish(user_id, event_type, **data):
+    """Publica un evento para el usuario cuando se confirme la transacción en curso."""
+    event = {'user': user_id, 'type': event_type, 'data': data, 'at': timezone.now().isoformat()}
+    transaction.on_commit(lambda: _send(event))
+
+
+def _send(event):
+    # Un fallo al avisar no debe romper la escritura, que ya se confirmó
+    try:
+        get_broker().backend.publish(event)
+    except Exception:
+        logger.exception("No se pudo publicar el evento %s", event['type'])
+
+
+def format_sse(event):
+    """Evento en el formato de text/event-stream."""
+    return f"event: {event['type']}\ndata: {json.dumps({**event['data'], 'at': event['at']})}\n\n"
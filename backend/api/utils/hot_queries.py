@@ -0,0 +1,87 @@
+"""
+Registro de las consultas por usuario más frecuentes.
+
+Cada entrada reproduce el filtro que usa una ruta caliente (el comentario indica
+dónde) y se usa para revisar sus planes con EXPLAIN: las pruebas fallan si
+alguna necesita un recorrido secuencial, y `explain_hot_queries` imprime los
+planes contra una base real. Al cambiar uno de esos filtros hay que actualizar
+su entrada aquí.
+"""
+
+from datetime import timedelta
+
+from django.utils import timezone
+
+from api.models import (
+    ActivityCalendar, Declaration, MissionProgress, ModuleProgress, Streak
+)
+from api.utils.mission_board import day_range
+from api.utils.module_unlocks import STREAK_MISSION_ID
+
+
+def _between(field, bounds):
+    start, end = bounds
+    return {f'{field}__gte': start, f'{field}__lt': end}
+
+
+def _today_range():
+    return day_range(timezone.now().date())
+
+
+def _week_range():
+    today = timezone.now().date()
+    week_start = today - timedelta(days=today.weekday())
+    return day_range(week_start, week_start + timedelta(days=6))
+
+
+HOT_QUERIES = {
+    # mission_board._declarations_today
+    'declarations_today': lambda user, module_id: Declaration.objects.filter(
+        user=user, **_between('created_at', _today_range())
+    ),
+    # DeclarationViewSet.perform_create (primera declaración del pilar)
+    'declaration_pillar_exists': lambda user, module_id: Declaration.objects.filter(
+        user=user, module_id=module_id, pillar='Vision'
+    ).values('pk')[:1],
+    # check_and_unlock_next_module y mission_logic.check_and_complete_missions
+    'declared_pillars': lambda user, module_id: Declaration.objects.filter(
+        user=user, module_id=module_id
+    ).order_by().values_list('pillar', flat=True).distinct(),
+    # DeclarationViewSet con paginación por cursor
+    'declarations_page': lambda user, module_id: Declaration.objects.filter(
+        user=user
+    ).order_by('-created_at', '-id')[:50],
+    'declarations_module_page': lambda user, module_id: Declaration.objects.filter(
+        user=user, module_id=module_id
+    ).order_by('-created_at', '-id')[:50],
+    # mission_board.build_mission_board y mission_logic.check_and_complete_missions
+    'mission_progress': lambda user, module_id: MissionProgress.objects.filter(user=user),
+    # serializers_helpers.get_active_missions
+    'active_missions': lambda user, module_id: MissionProgress.objects.filter(user=user, state='active'),
+    # module_unlocks.evaluate_module_unlocks_bulk y ModuleUnlockView
+    'streak_mission_completed': lambda user, module_id: MissionProgress.objects.filter(
+        user_id__in=[user.pk], mission_id=STREAK_MISSION_ID, state='completed'
+    ).values_list('user_id', flat=True),
+    # MissionViewSet, mission_board y mission_logic
+    'unlocked_modules': lambda user, module_id: ModuleProgress.objects.filter(
+        user=user, state='unlocked'
+    ).values_list('module_id', flat=True),
+    # mission_board._modules_unlocked_this_week
+    'modules_unlocked_this_week': lambda user, module_id: ModuleProgress.objects.filter(
+        user=user,
+        state='unlocked',
+        auto_unlocked=False,
+        **_between('last_activity', _week_range())
+    ),
+    # mission_board._global_streak
+    'global_calendar': lambda user, module_id: ActivityCalendar.objects.filter(
+        user=user, module__isnull=True
+    ),
+    # ModuleProgressView y DeclarationViewSet.perform_create
+    'module_streak': lambda user, module_id: Streak.objects.filter(user=user, module_id=module_id),
+}
+
+
+def explain(name, user, module_id, **options):
+    """Devuelve el plan de una consulta registrada."""
+    return HOT_QUERIES[name](user, module_id).explain(**options)
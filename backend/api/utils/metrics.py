@@ -0,0 +1,319 @@
+"""
+Métricas por request en formato Prometheus.
+
+`RequestMetricsMiddleware` mide, para cada request, la cantidad y el tiempo de
+las consultas SQL, el tiempo de serialización y el tiempo total, y los acumula
+en histogramas por vista. Con `METRICS_DIR` configurado cada proceso escribe sus
+contadores en un archivo mapeado en memoria dentro de ese directorio, y
+`/metrics` suma los archivos de todos los workers de gunicorn (el directorio se
+vacía al iniciar el servidor). Sin `METRICS_DIR` los contadores quedan en la
+memoria del proceso.
+"""
+
+import contextvars
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+# Límites de los histogramas (el bucket +Inf se agrega siempre)
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+HISTOGRAMS = {
+    'dividis_request_duration_seconds': ("Duración total del request", SECONDS_BUCKETS),
+    'dividis_request_db_queries': ("Consultas SQL por request", QUERY_BUCKETS),
+    'dividis_request_db_duration_seconds': ("Tiempo en consultas SQL por request", SECONDS_BUCKETS),
+    'dividis_request_serializer_duration_seconds': ("Tiempo serializando por request", SECONDS_BUCKETS),
+}
+COUNTERS = {
+    'dividis_requests_total': "Requests atendidos por vista, método y status",
+}
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """Tiempos acumulados durante un request."""
+
+    def __init__(self, request=None):
+        self.request = request
+        self.queries = 0
+        self.db = 0.0
+        self.serialize = 0.0
+        self._serializer_depth = 0
+        # Las vistas async pueden consultar desde varios hilos a la vez
+        self._lock = threading.Lock()
+
+    def add_query(self, seconds):
+        with self._lock:
+            self.db += seconds
+            self.queries += 1
+
+    def server_timing(self, total):
+        """Valor del header Server-Timing (duraciones en milisegundos)."""
+        return ', '.join([
+            f'db;dur={self.db * 1000:.1f};desc="{self.queries} consultas"',
+            f'serialize;dur={self.serialize * 1000:.1f}',
+            f'app;dur={max(total - self.db - self.serialize, 0) * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+
+def start_request(request):
+    """Activa la medición para el request en curso; devuelve (tiempos, token)."""
+    timings = RequestTimings(request)
+    return timings, _current.set(timings)
+
+
+def finish_request(token):
+    _current.reset(token)
+
+
+def count_query(execute, sql, params, many, context):
+    """
+    Execute wrapper instalado en cada conexión: suma la consulta al request en
+    curso. Se usa la variable de contexto, y no un wrapper por request, porque
+    el ORM async y las consultas concurrentes usan conexiones de otros hilos.
+    """
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add_query(time.perf_counter() - start)
+
+
+def _install(sender, connection, **kwargs):
+    # Al inicio de la lista: la conexión puede abrirse dentro de un
+    # `execute_wrapper()` activo, que al salir quita el último elemento
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, count_query)
+
+
+def install():
+    """Agrega `count_query` a cada conexión nueva (y a la actual, si ya está abierta)."""
+    connection_created.connect(_install, dispatch_uid='request_metrics')
+    if connection.connection is not None:
+        _install(None, connection)
+
+
+def current_view():
+    """Nombre de la vista del request en curso, si ya se resolvió la URL."""
+    timings = _current.get()
+    match = timings.request.resolver_match if timings and timings.request else None
+    return match.view_name if match else None
+
+
+def _timed_data(fget):
+    def data(serializer):
+        timings = _current.get()
+        if timings is None:
+            return fget(serializer)
+        # Solo se mide el serializador externo; los anidados ya están dentro
+        timings._serializer_depth += 1
+        start = time.perf_counter()
+        try:
+            return fget(serializer)
+        finally:
+            timings._serializer_depth -= 1
+            if not timings._serializer_depth:
+                timings.serialize += time.perf_counter() - start
+    data._metrics_timed = True
+    return data
+
+
+def instrument_serializers():
+    """
+    Envuelve `Serializer.data` y `ListSerializer.data` para sumar su tiempo al
+    request en curso. DRF no ofrece un punto de extensión para esto; se llama
+    una vez desde `ApiConfig.ready()`.
+    """
+    from rest_framework import serializers
+
+    for cls in (serializers.Serializer, serializers.ListSerializer):
+        prop = cls.__dict__['data']
+        if not getattr(prop.fget, '_metrics_timed', False):
+            cls.data = property(_timed_data(prop.fget), doc=prop.__doc__)
+
+
+class MemoryValues:
+    """Contadores en la memoria del proceso."""
+
+    def __init__(self):
+        self._values = defaultdict(float)
+
+    def add(self, key, amount):
+        self._values[key] += amount
+
+    def items(self):
+        return list(self._values.items())
+
+
+class MmapValues:
+    """
+    Contadores float64 en un archivo mapeado en memoria. El archivo empieza con
+    el largo usado (int64) y sigue con entradas [largo de la clave (int32),
+    clave UTF-8 rellenada a 8 bytes, valor float64]. Las claves nuevas se
+    escriben antes de actualizar el largo, así un lector nunca ve una entrada
+    a medias.
+    """
+    INITIAL_SIZE = 64 * 1024
+
+    def __init__(self, path):
+        self._file = open(path, 'a+b')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < self.INITIAL_SIZE:
+            self._file.truncate(self.INITIAL_SIZE)
+            size = self.INITIAL_SIZE
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self._used = struct.unpack_from('q', self._map, 0)[0] or 8
+        self._positions = {key: pos for key, _, pos in read_entries(self._map, self._used)}
+
+    def _append(self, key):
+        encoded = key.encode('utf-8')
+        padded = encoded + b' ' * (-(4 + len(encoded)) % 8)
+        entry = struct.pack(f'i{len(padded)}sd', len(padded), padded, 0.0)
+        if self._used + len(entry) > len(self._map):
+            size = max(2 * len(self._map), self._used + len(entry))
+            self._file.truncate(size)
+            self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), size)
+        self._map[self._used:self._used + len(entry)] = entry
+        self._used += len(entry)
+        struct.pack_into('q', self._map, 0, self._used)
+        self._positions[key] = self._used - 8
+        return self._used - 8
+
+    def add(self, key, amount):
+        pos = self._positions.get(key) or self._append(key)
+        value = struct.unpack_from('d', self._map, pos)[0]
+        struct.pack_into('d', self._map, pos, value + amount)
+
+    def items(self):
+        return [(key, value) for key, value, _ in read_entries(self._map, self._used)]
+
+
+def read_entries(data, used=None):
+    """Recorre las entradas (clave, valor, posición del valor) de un archivo de métricas."""
+    if used is None:
+        used = struct.unpack_from('q', data, 0)[0] if len(data) >= 8 else 0
+    pos = 8
+    while pos < used:
+        length = struct.unpack_from('i', data, pos)[0]
+        key = bytes(data[pos + 4:pos + 4 + length]).decode('utf-8').rstrip(' ')
+        value_pos = pos + 4 + length
+        yield key, struct.unpack_from('d', data, value_pos)[0], value_pos
+        pos = value_pos + 8
+
+
+_lock = threading.Lock()
+_store = None
+_store_key = None
+
+
+def _get_store():
+    global _store, _store_key
+    directory = getattr(settings, 'METRICS_DIR', None)
+    # Tras un fork (gunicorn --preload) cada worker abre su propio archivo
+    key = (os.getpid(), directory)
+    if _store is None or _store_key != key:
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            _store = MmapValues(os.path.join(directory, f'metrics-{os.getpid()}.db'))
+        else:
+            _store = MemoryValues()
+        _store_key = key
+    return _store
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _series(name, **labels):
+    rendered = ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+    return f'{name}{{{rendered}}}'
+
+
+def _observe(store, name, value, labels):
+    _, buckets = HISTOGRAMS[name]
+    for bound in buckets:
+        # Los buckets son acumulativos y deben existir aunque queden en cero
+        store.add(_series(f'{name}_bucket', **labels, le=bound), 1 if value <= bound else 0)
+    store.add(_series(f'{name}_bucket', **labels, le='+Inf'), 1)
+    store.add(_series(f'{name}_sum', **labels), value)
+    store.add(_series(f'{name}_count', **labels), 1)
+
+
+def observe_request(view, method, status, timings, total):
+    """Acumula las mediciones de un request terminado."""
+    labels = {'view': view, 'method': method}
+    with _lock:
+        store = _get_store()
+        _observe(store, 'dividis_request_duration_seconds', total, labels)
+        _observe(store, 'dividis_request_db_queries', timings.queries, labels)
+        _observe(store, 'dividis_request_db_duration_seconds', timings.db, labels)
+        _observe(store, 'dividis_request_serializer_duration_seconds', timings.serialize, labels)
+        store.add(_series('dividis_requests_total', **labels, status=status), 1)
+
+
+def collect():
+    """Suma los contadores de todos los procesos (o del actual, sin METRICS_DIR)."""
+    totals = defaultdict(float)
+    directory = getattr(settings, 'METRICS_DIR', None)
+    with _lock:
+        if not directory:
+            for key, value in _get_store().items():
+                totals[key] += value
+            return totals
+
+    if os.path.isdir(directory):
+        for filename in sorted(os.listdir(directory)):
+            if not filename.startswith('metrics-'):
+                continue
+            with open(os.path.join(directory, filename), 'rb') as f:
+                data = f.read()
+            for key, value, _ in read_entries(data):
+                totals[key] += value
+    return totals
+
+
+def _bucket_order(key):
+    # Los buckets se ordenan por su límite numérico, con +Inf al final
+    if '_bucket{' not in key:
+        return (key, 0.0)
+    series, _, le = key.rpartition(',le="')
+    bound = le.rstrip('"}')
+    return (series, float('inf') if bound == '+Inf' else float(bound))
+
+
+def _number(value):
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def render(totals=None):
+    """Texto de exposición de Prometheus."""
+    totals = collect() if totals is None else totals
+    lines = []
+    for name, (description, _) in HISTOGRAMS.items():
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} histogram')
+        series = [key for key in totals if key.startswith(f'{name}_')]
+        for suffix in ('_bucket', '_sum', '_count'):
+            for key in sorted((k for k in series if k.startswith(f'{name}{suffix}{{')), key=_bucket_order):
+                lines.append(f'{key} {_number(totals[key])}')
+    for name, description in COUNTERS.items():
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} counter')
+        for key in sorted(k for k in totals if k.startswith(f'{name}{{')):
+            lines.append(f'{key} {_number(totals[key])}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,221 @@
+"""
+Construcción del tablero de misiones del usuario (endpoint /user-missions/).
+
+Carga el catálogo de misiones y todo el progreso del usuario una sola vez y
+evalúa las misiones diarias/semanales con datos precalculados, de modo que el
+número de consultas no depende de la cantidad de misiones.
+"""
+
+from datetime import datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+
+from api.models import ActivityCalendar, Declaration, Mission, MissionProgress, ModuleProgress
+
+DAILY_DECLARATIONS_TARGET = 1
+WEEKLY_STREAK_TARGET = 5
+WEEKLY_UNLOCK_TARGET = 1
+
+
+def classify_mission(mission):
+    """
+    Devuelve el evaluador que aplica a una misión global
+    ("daily", "weekly_streak", "weekly_unlock") o None si no tiene progreso calculado.
+    """
+    title = mission.title.lower()
+    if mission.frequency == "daily":
+        return "daily"
+    if mission.frequency == "weekly" and "racha" in title:
+        return "weekly_streak"
+    if mission.frequency == "weekly" and "desbloquea" in title:
+        return "weekly_unlock"
+    return None
+
+
+def day_range(first_day, last_day=None):
+    """
+    Límites [inicio, fin) de los días dados en la zona horaria actual.
+    Equivale a un filtro `__date`, pero permite usar los índices sobre la columna.
+    """
+    last_day = last_day or first_day
+    start = timezone.make_aware(datetime.combine(first_day, time.min))
+    end = timezone.make_aware(datetime.combine(last_day + timedelta(days=1), time.min))
+    return start, end
+
+
+def _declarations_today(user, today, week_start, week_end):
+    start, end = day_range(today)
+    return Declaration.objects.filter(user=user, created_at__gte=start, created_at__lt=end).count()
+
+
+def _global_streak(user, today, week_start, week_end):
+    calendar = ActivityCalendar.objects.filter(user=user, module__isnull=True).first()
+    return calendar.current_streak(today) if calendar else 0
+
+
+def _modules_unlocked_this_week(user, today, week_start, week_end):
+    start, end = day_range(week_start, week_end)
+    return ModuleProgress.objects.filter(
+        user=user,
+        state='unlocked',
+        last_activity__gte=start,
+        last_activity__lt=end,
+        auto_unlocked=False
+    ).count()
+
+
+def _daily_progress(current):
+    target = DAILY_DECLARATIONS_TARGET
+    return {
+        "current": current,
+        "target": target,
+        "label": f"{current}/{target} declaraciones hoy"
+    }, current >= target
+
+
+def _weekly_streak_progress(current):
+    target = WEEKLY_STREAK_TARGET
+    return {
+        "current": current,
+        "target": target,
+        "label": f"{current}/{target} días de racha consecutiva"
+    }, current >= target
+
+
+def _weekly_unlock_progress(current):
+    target = WEEKLY_UNLOCK_TARGET
+    return {
+        "current": current,
+        "target": target,
+        "label": f"{current}/{target} módulos desbloqueados esta semana"
+    }, current >= target
+
+
+# Cada evaluador declara el dato que necesita y cómo convertirlo en progreso.
+# El dato se consulta una sola vez por petición y solo si alguna misión lo usa.
+EVALUATORS = {
+    "daily": (_declarations_today, _daily_progress),
+    "weekly_streak": (_global_streak, _weekly_streak_progress),
+    "weekly_unlock": (_modules_unlocked_this_week, _weekly_unlock_progress),
+}
+
+
+def _mission_row(mission, mp, mission_type, state, progress, module_id=None):
+    row = {
+        "id": str(mission.id),
+        "title": mission.title,
+        "description": mission.description,
+        "xp_reward": mission.xp_reward,
+        "frequency": mission.frequency,
+        "requirements": mission.requirements,
+        "type": mission_type,
+    }
+    if mission_type == "module":
+        row["module_id"] = module_id
+    row.update({
+        "state": state,
+        "progress": progress,
+        "started_at": mp.started_at if mp else None,
+        "completed_at": mp.completed_at if mp else None,
+    })
+    return row
+
+
+def _week(now):
+    today = now.date()
+    week_start = today - timedelta(days=today.weekday())
+    return today, week_start, week_start + timedelta(days=6)
+
+
+def _fact_loaders(user, missions, now):
+    """Consultas de los datos que necesitan las misiones globales, por evaluador."""
+    today, week_start, week_end = _week(now)
+    kinds = {classify_mission(mission) for mission in missions if mission.module_id is None}
+    return {
+        kind: (lambda fetch=EVALUATORS[kind][0]: fetch(user, today, week_start, week_end))
+        for kind in kinds if kind
+    }
+
+
+def _progress_by_mission(user):
+    return {mp.mission_id: mp for mp in MissionProgress.objects.filter(user=user)}
+
+
+def _unlocked_modules(user):
+    return set(ModuleProgress.objects.filter(
+        user=user,
+        state='unlocked'
+    ).values_list('module_id', flat=True))
+
+
+def build_mission_board(user, now=None):
+    """
+    Devuelve la lista de misiones (globales y de módulo) con el estado del usuario.
+    Ejecuta un número fijo de consultas sin importar el tamaño del catálogo.
+    """
+    return build_mission_board_from(
+        user, list(Mission.objects.all()), _progress_by_mission(user), _unlocked_modules(user), now
+    )
+
+
+def build_mission_board_from(user, missions, progress_by_mission, unlocked_modules, now=None):
+    """
+    Tablero a partir de misiones y progreso ya cargados (p. ej. por /bootstrap/);
+    solo consulta los datos de las misiones globales.
+    """
+    now = now or timezone.now()
+    facts = {kind: load() for kind, load in _fact_loaders(user, missions, now).items()}
+    return assemble_mission_board(missions, progress_by_mission, unlocked_modules, facts)
+
+
+async def abuild_mission_board(user, now=None):
+    """
+    Versión async de `build_mission_board`: las misiones salen del catálogo en
+    memoria y el progreso, los módulos desbloqueados y los datos de las
+    misiones globales se consultan con `gather` (en paralelo si
+    `ASYNC_PARALLEL_QUERIES` está activo).
+    """
+    from api.utils.async_queries import gather
+    from api.utils.catalog import get_catalog
+
+    now = now or timezone.now()
+    catalog = await sync_to_async(get_catalog)()
+    missions = list(catalog.missions.values())
+    loaders = _fact_loaders(user, missions, now)
+    progress_by_mission, unlocked_modules, *values = await gather(
+        lambda: _progress_by_mission(user),
+        lambda: _unlocked_modules(user),
+        *loaders.values(),
+    )
+    facts = dict(zip(loaders, values))
+    return assemble_mission_board(missions, progress_by_mission, unlocked_modules, facts)
+
+
+def assemble_mission_board(missions, progress_by_mission, unlocked_modules, facts):
+    """Arma las filas del tablero con los datos ya cargados (sin consultas)."""
+    global_missions = [m for m in missions if m.module_id is None]
+    module_missions = [m for m in missions if m.module_id is not None]
+
+    result = []
+    for mission in global_missions:
+        mp = progress_by_mission.get(mission.id)
+        state = mp.state if mp else "active"
+        progress = None
+        kind = classify_mission(mission)
+        if kind:
+            progress, completed = EVALUATORS[kind][1](facts[kind])
+            if completed:
+                state = "completed"
+        result.append(_mission_row(mission, mp, "global", state, progress))
+
+    for mission in module_missions:
+        mp = progress_by_mission.get(mission.id)
+        # Si el módulo está desbloqueado, usar el estado real; si no, marcar como "blocked"
+        if mission.module_id in unlocked_modules:
+            state = mp.state if mp else "active"
+        else:
+            state = "blocked"
+        result.append(_mission_row(mission, mp, "module", state, None, module_id=mission.module_id))
+
+    return result
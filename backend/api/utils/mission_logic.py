@@ -1,35 +1,125 @@
-from api.models import Mission, MissionProgress, ModuleProgress, Declaration
+"""
+Evaluación de requisitos de misiones.
+
+Los requisitos JSON de `Mission.requirements` se compilan una vez por versión
+del catálogo (ver `api.utils.catalog`) en un grafo agrupado por módulo y tipo de
+requisito. La evaluación consulta cada conjunto de hechos (misiones completadas,
+módulos desbloqueados, pilares declarados) una sola vez y completa todas las
+misiones satisfechas con una única escritura en lote.
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.utils import timezone
+
+from api.models import MissionProgress, ModuleProgress, Declaration, UserProgressSummary
+from api.utils import changes, events
+from api.utils.catalog import get_catalog
+
+
+@dataclass(frozen=True)
+class CompiledMission:
+    """Requisitos de una misión agrupados por tipo."""
+    id: str
+    module_id: str
+    missions: frozenset
+    modules: frozenset
+    pillars: frozenset
+
+    def is_satisfied(self, completed, unlocked, pillars):
+        return (self.missions <= completed
+                and self.modules <= unlocked
+                and self.pillars <= pillars)
+
+
+class RequirementGraph:
+    """Misiones de módulo compiladas e indexadas por módulo."""
+
+    def __init__(self, missions):
+        self.by_module = defaultdict(list)
+        for mission in missions:
+            if mission.module_id is None:
+                continue
+            grouped = defaultdict(set)
+            for req in mission.requirements or []:
+                if req.get("type") in ("mission", "module", "pillar"):
+                    grouped[req["type"]].add(str(req.get("id")))
+            self.by_module[mission.module_id].append(CompiledMission(
+                id=str(mission.id),
+                module_id=mission.module_id,
+                missions=frozenset(grouped["mission"]),
+                modules=frozenset(grouped["module"]),
+                pillars=frozenset(grouped["pillar"]),
+            ))
+
+    def missions_for(self, module_id):
+        return self.by_module.get(module_id, [])
+
+
+def get_requirement_graph():
+    """Devuelve el grafo compilado del catálogo del proceso."""
+    return get_catalog().requirement_graph
+
 
 def check_and_complete_missions(user, module, pillar=None):
     """
     Evalúa y completa las misiones del módulo para el usuario según requisitos.
     Si la misión requiere un pilar, solo se completa si hay declaración en ese pilar.
+    Devuelve los ids de las misiones completadas.
     """
-    module_missions = Mission.objects.filter(module=module)
-    for mission in module_missions:
-        requisitos = getattr(mission, "requirements", [])
-        cumple_requisitos = True
-        for req in requisitos:
-            if req.get("type") == "mission":
-                prev_mission_id = req.get("id")
-                prev_mp = MissionProgress.objects.filter(user=user, mission_id=prev_mission_id, state="completed").first()
-                if not prev_mp:
-                    cumple_requisitos = False
-                    break
-            if req.get("type") == "module":
-                mod_id = req.get("id")
-                mod_prog = ModuleProgress.objects.filter(user=user, module_id=mod_id, state="unlocked").first()
-                if not mod_prog:
-                    cumple_requisitos = False
-                    break
-            if req.get("type") == "pillar":
-                pillar_id = req.get("id")
-                decl = Declaration.objects.filter(user=user, module=module, pillar=pillar_id).exists()
-                if not decl:
-                    cumple_requisitos = False
-                    break
-        if cumple_requisitos:
-            mp, created = MissionProgress.objects.get_or_create(user=user, mission=mission)
-            if mp.state != "completed":
-                mp.complete()
-                mp.save()
+    module_id = getattr(module, "pk", module)
+    candidates = get_requirement_graph().missions_for(module_id)
+    if not candidates:
+        return []
+
+    progress = {
+        str(mission_id): state
+        for mission_id, state in MissionProgress.objects.filter(user=user).values_list('mission_id', 'state')
+    }
+    completed = {mission_id for mission_id, state in progress.items() if state == "completed"}
+    pending = [c for c in candidates if progress.get(c.id) not in ("completed", "failed")]
+    if not pending:
+        return []
+
+    unlocked = set()
+    if any(c.modules for c in pending):
+        unlocked = set(ModuleProgress.objects.filter(
+            user=user, state="unlocked"
+        ).values_list('module_id', flat=True))
+    pillars = set()
+    if any(c.pillars for c in pending):
+        pillars = set(Declaration.objects.filter(
+            user=user, module_id=module_id
+        ).order_by().values_list('pillar', flat=True).distinct())
+
+    # Punto fijo: una misión completada puede satisfacer a otra del mismo módulo
+    newly_completed = []
+    changed = True
+    while changed:
+        changed = False
+        for compiled in list(pending):
+            if compiled.is_satisfied(completed, unlocked, pillars):
+                pending.remove(compiled)
+                completed.add(compiled.id)
+                newly_completed.append(compiled.id)
+                changed = True
+    if not newly_completed:
+        return []
+
+    now = timezone.now()
+    with transaction.atomic():
+        rows = MissionProgress.objects.bulk_create(
+            [MissionProgress(user=user, mission_id=mission_id, state="completed", completed_at=now)
+             for mission_id in newly_completed],
+            update_conflicts=True,
+            unique_fields=['user', 'mission'],
+            update_fields=['state', 'completed_at'],
+        )
+        UserProgressSummary.bump(user.pk, missions_completed=len(newly_completed))
+        for mission_id in newly_completed:
+            events.publish(user.pk, events.MISSION_COMPLETED, mission_id=mission_id)
+        # update_conflicts devuelve las filas con su pk (PostgreSQL y SQLite >= 3.35)
+        changes.record(user.pk, changes.KINDS[MissionProgress], [row.pk for row in rows])
+    return newly_completed
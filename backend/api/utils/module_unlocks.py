@@ -0,0 +1,114 @@
+"""
+Motor de desbloqueo de módulos.
+
+Evalúa las reglas de desbloqueo de todos los módulos en una sola pasada y con
+escrituras en lote. Se invoca desde las rutas de escritura que cambian sus
+entradas (XP otorgada, misión completada, declaración creada), de modo que los
+endpoints de progreso son solo lectura.
+"""
+
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
+
+from api.models import MissionProgress, Module, ModuleProgress, Profile, Streak, UserProgressSummary
+from api.utils import changes, events
+
+# Misión global de racha de 1 día requerida para desbloquear Personalidad
+STREAK_MISSION_ID = "46e39fc7-8a77-4e39-9559-283a73655d12"
+PERSONALIDAD_XP_REQUIRED = 200
+
+
+def can_unlock(module, experience_points, streak_mission_completed):
+    """Indica si un módulo cumple los requisitos de desbloqueo."""
+    if module.id == "personalidad":
+        return experience_points >= PERSONALIDAD_XP_REQUIRED and streak_mission_completed
+    return experience_points >= module.xp_required
+
+
+def evaluate_module_unlocks_bulk(user_ids):
+    """
+    Crea el ModuleProgress faltante de cada usuario y desbloquea los módulos
+    cuyos requisitos se cumplen. Devuelve la lista de pares (user_id, module_id)
+    desbloqueados.
+    """
+    user_ids = list(user_ids)
+    modules = list(Module.objects.all())
+    if not user_ids or not modules:
+        return []
+
+    xp_by_user = dict(
+        Profile.objects.filter(user_id__in=user_ids).values_list('user_id', 'experience_points')
+    )
+    streak_mission_done = set()
+    if any(module.id == "personalidad" for module in modules):
+        streak_mission_done = set(MissionProgress.objects.filter(
+            user_id__in=user_ids,
+            mission_id=STREAK_MISSION_ID,
+            state='completed'
+        ).values_list('user_id', flat=True))
+    existing = {
+        (user_id, module_id): (pk, state)
+        for pk, user_id, module_id, state in ModuleProgress.objects.filter(
+            user_id__in=user_ids
+        ).values_list('pk', 'user_id', 'module_id', 'state')
+    }
+
+    to_create = []
+    to_unlock = []
+    unlocked = []
+    for user_id in user_ids:
+        experience_points = xp_by_user.get(user_id, 0)
+        for module in modules:
+            pk, state = existing.get((user_id, module.id), (None, None))
+            if state not in (None, 'locked'):
+                continue
+            eligible = can_unlock(module, experience_points, user_id in streak_mission_done)
+            if pk is None:
+                to_create.append(ModuleProgress(
+                    user_id=user_id,
+                    module=module,
+                    state='unlocked' if eligible else 'locked'
+                ))
+            elif eligible:
+                to_unlock.append(pk)
+            if eligible:
+                unlocked.append((user_id, module.id))
+
+    with transaction.atomic():
+        if to_create:
+            ModuleProgress.objects.bulk_create(to_create, ignore_conflicts=True)
+        if to_unlock:
+            ModuleProgress.objects.filter(pk__in=to_unlock, state='locked').update(
+                state='unlocked',
+                last_activity=timezone.now()
+            )
+        for user_id, total in Counter(user_id for user_id, _ in unlocked).items():
+            UserProgressSummary.bump(user_id, modules_unlocked=total)
+        for user_id, module_id in unlocked:
+            events.publish(user_id, events.MODULE_UNLOCKED, module_id=module_id)
+        # Las escrituras en lote no disparan señales
+        if to_create:
+            changes.record_rows(ModuleProgress.objects.filter(
+                user_id__in={progress.user_id for progress in to_create},
+                module_id__in={progress.module_id for progress in to_create},
+            ))
+        if to_unlock:
+            changes.record_rows(ModuleProgress.objects.filter(pk__in=to_unlock))
+    return unlocked
+
+
+def evaluate_module_unlocks(user):
+    """Evalúa los desbloqueos de un único usuario tras un cambio en sus datos."""
+    return evaluate_module_unlocks_bulk([user.pk])
+
+
+def apply_mission_effects(user_id, module_id):
+    """
+    Tarea de la cola tras completar una misión (ver api/utils/tasks.py): racha
+    del módulo y reevaluación de desbloqueos.
+    """
+    streak, _ = Streak.objects.get_or_create(user_id=user_id, module_id=module_id)
+    streak.update_streak()
+    evaluate_module_unlocks_bulk([user_id])
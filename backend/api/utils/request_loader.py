@@ -0,0 +1,87 @@
+"""
+Cargador de datos con alcance de petición.
+
+Precarga una sola vez por petición el mapa de estados de módulo del usuario y
+el catálogo de módulos, para que los serializers anidados (ModuleSerializer
+dentro de misiones, rachas y progreso) no consulten la base por cada fila.
+"""
+
+from api.models import Module, ModuleProgress
+
+_ATTRIBUTE = '_dividis_loader'
+
+
+class RequestLoader:
+    """Memoiza las búsquedas relacionadas que se repiten dentro de una petición."""
+
+    def __init__(self, user):
+        self.user = user
+        self._module_states = None
+        self._modules = None
+        self._prefetched = {}
+
+    def module_states(self):
+        """Mapa {module_id: estado} del usuario, cargado con una sola consulta."""
+        if self._module_states is None:
+            self._module_states = dict(
+                ModuleProgress.objects.filter(user=self.user).values_list('module_id', 'state')
+            )
+        return self._module_states
+
+    def module_state(self, module):
+        """Estado del módulo para el usuario, o el estado por defecto del módulo."""
+        return self.module_states().get(module.pk, getattr(module, "state", None))
+
+    def modules(self):
+        """Catálogo de módulos indexado por id."""
+        if self._modules is None:
+            self._modules = {module.pk: module for module in Module.objects.all()}
+        return self._modules
+
+    def attach_modules(self, objects):
+        """
+        Asigna `obj.module` desde el catálogo memoizado a cada objeto con
+        `module_id`, evitando la carga perezosa por fila. Devuelve los objetos.
+        """
+        objects = list(objects)
+        if any(obj.module_id for obj in objects):
+            modules = self.modules()
+            for obj in objects:
+                if obj.module_id:
+                    obj.module = modules[obj.module_id]
+        return objects
+
+    def prefetch(self, modules=None, **rows):
+        """
+        Registra datos del usuario ya cargados por una vista que arma varias
+        respuestas en la misma petición (/bootstrap/). `module_progress`
+        también fija el mapa de estados de módulo.
+        """
+        if modules is not None:
+            self._modules = dict(modules)
+        if 'module_progress' in rows:
+            self._module_states = {p.module_id: p.state for p in rows['module_progress']}
+        self._prefetched.update(rows)
+
+    def prefetched(self, name):
+        """Filas registradas con `prefetch`, o None si no se precargaron."""
+        return self._prefetched.get(name)
+
+
+def get_request_loader(request):
+    """Devuelve el RequestLoader de la petición, creándolo la primera vez."""
+    http_request = getattr(request, '_request', request)
+    loader = getattr(http_request, _ATTRIBUTE, None)
+    if loader is None or loader.user != request.user:
+        loader = RequestLoader(request.user)
+        setattr(http_request, _ATTRIBUTE, loader)
+    return loader
+
+
+def get_context_loader(context):
+    """RequestLoader a partir del contexto de un serializer, o None sin usuario autenticado."""
+    request = context.get('request') if context else None
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return None
+    return get_request_loader(request)
@@ -29,17 +29,49 @@ def update_user_fields(user: User, user_data: dict) -> None:
 def get_state(module, context: dict) -> Any:
     """
     Devuelve el estado del módulo para el usuario autenticado en el contexto.
+    Usa el mapa de estados precargado una vez por petición.
     """
-    user = context.get('request').user if context.get('request') else None
-    if user and user.is_authenticated:
-        from api.models import ModuleProgress
-        try:
-            progress = ModuleProgress.objects.get(user=user, module=module)
-            return progress.state
-        except ModuleProgress.DoesNotExist:
-            pass
+    from api.utils.request_loader import get_context_loader
+    loader = get_context_loader(context)
+    if loader is not None:
+        return loader.module_state(module)
     return getattr(module, "state", None)
 
+def attach_modules(objects, context: dict):
+    """
+    Asigna el módulo memoizado de la petición a cada objeto con `module_id`.
+    Sin petición en el contexto devuelve los objetos sin cambios.
+    """
+    from api.utils.request_loader import get_context_loader
+    loader = get_context_loader(context)
+    objects = list(objects)
+    if loader is not None:
+        loader.attach_modules(objects)
+    return objects
+
+def user_rows(context: dict, name: str, queryset):
+    """
+    Filas del usuario precargadas en el RequestLoader de la petición con
+    `prefetch(name=...)`, o `queryset` si nadie las precargó.
+    """
+    from api.utils.request_loader import get_context_loader
+    loader = get_context_loader(context)
+    rows = loader.prefetched(name) if loader is not None else None
+    return queryset if rows is None else rows
+
+def overview_data(summary, title: str) -> dict:
+    """Datos de /progress/overview/ a partir del resumen de progreso (con su perfil)."""
+    profile = summary.user.profile
+    return {
+        'total_xp': profile.experience_points,
+        'level': profile.current_level,
+        'modules_unlocked': summary.modules_unlocked,
+        'missions_completed': summary.missions_completed,
+        'achievements_earned': summary.achievements_earned,
+        'current_streaks': summary.current_streaks,
+        'title': title
+    }
+
 def get_active_missions(user: User):
     """
     Devuelve los MissionProgress activos para un usuario.
@@ -0,0 +1,173 @@
+"""
+Registro de consultas lentas.
+
+`capture` se instala como execute wrapper en cada conexión. Cada consulta que
+supera `SLOW_QUERY_MS` se guarda en un buffer circular del proceso con su SQL
+normalizado, la línea del proyecto que la hizo (el primer frame fuera de Django
+y de las librerías) y su duración. Una fracción `SLOW_QUERY_EXPLAIN_RATE` de
+los SELECT se repite con EXPLAIN ANALYZE (EXPLAIN QUERY PLAN en SQLite).
+`RequestMetricsMiddleware` vuelca el buffer a `SlowQuery` al terminar cada
+request, y el worker de tareas (`run_pending`) después de cada tarea.
+`python manage.py slow_queries` resume los peores lugares.
+"""
+
+import hashlib
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.backends.signals import connection_created
+
+from api.utils import metrics
+
+DEFAULT_BUFFER_SIZE = 500
+DEFAULT_MAX_ROWS = 10000
+MAX_SQL_LENGTH = 4000
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_LIST = re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)')
+
+_PROJECT_ROOT = str(settings.BASE_DIR) + os.sep
+# Este módulo, las métricas y el middleware pueden quedar entre la consulta y el código que la hizo
+_WRAPPER_FILES = {
+    os.path.abspath(__file__),
+    os.path.abspath(metrics.__file__),
+    os.path.join(_PROJECT_ROOT, 'api', 'middleware.py'),
+}
+_SKIPPED = (os.sep + 'site-packages' + os.sep, os.sep + 'migrations' + os.sep)
+
+_buffer = deque(maxlen=getattr(settings, 'SLOW_QUERY_BUFFER', DEFAULT_BUFFER_SIZE))
+_local = threading.local()
+
+
+def normalize(sql):
+    """Reemplaza literales y colapsa listas IN para agrupar consultas equivalentes."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    return _LIST.sub('(...)', ' '.join(sql.split()))
+
+
+def fingerprint(normalized_sql):
+    return hashlib.sha1(normalized_sql.encode('utf-8')).hexdigest()[:16]
+
+
+def call_site():
+    """
+    Devuelve ('ruta/relativa.py:Clase.función', línea) del frame del proyecto
+    más interno. Si la consulta sale solo de código de Django o DRF (p. ej. un
+    queryset perezoso evaluado por una vista genérica) se usa el nombre de la vista.
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if (filename.startswith(_PROJECT_ROOT) and filename not in _WRAPPER_FILES
+                and not any(part in filename for part in _SKIPPED)):
+            relative = os.path.relpath(filename, _PROJECT_ROOT)
+            name = getattr(frame.f_code, 'co_qualname', frame.f_code.co_name)
+            return f'{relative}:{name}', frame.f_lineno
+        frame = frame.f_back
+    view = metrics.current_view()
+    return (f'vista:{view}' if view else '<externo>'), 0
+
+
+def _explain(db, sql, params):
+    if db.vendor == 'postgresql':
+        prefix = 'EXPLAIN (ANALYZE, BUFFERS) '
+    elif db.vendor == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    else:
+        return ''
+    try:
+        # Savepoint propio: un error del EXPLAIN no invalida la transacción en curso
+        with transaction.atomic(using=db.alias), db.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            return '\n'.join(' '.join(str(col) for col in row) for row in cursor.fetchall())
+    except DatabaseError as exc:
+        return f'EXPLAIN falló: {exc}'
+
+
+def capture(execute, sql, params, many, context):
+    threshold = getattr(settings, 'SLOW_QUERY_MS', 0)
+    if not threshold or getattr(_local, 'active', False):
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration_ms = (time.perf_counter() - start) * 1000
+    if duration_ms >= threshold:
+        _local.active = True
+        try:
+            _record(context['connection'], sql, params, many, duration_ms)
+        finally:
+            _local.active = False
+    return result
+
+
+def _record(db, sql, params, many, duration_ms):
+    site, line = call_site()
+    normalized = normalize(sql)
+    plan = ''
+    rate = getattr(settings, 'SLOW_QUERY_EXPLAIN_RATE', 0)
+    if (not many and rate and random.random() < rate
+            and sql.lstrip().upper().startswith(('SELECT', 'WITH'))):
+        plan = _explain(db, sql, params)
+    _buffer.append({
+        'fingerprint': fingerprint(normalized),
+        'sql': normalized[:MAX_SQL_LENGTH],
+        'call_site': site[:255],
+        'line': line,
+        'duration_ms': round(duration_ms, 2),
+        'plan': plan,
+    })
+
+
+def pending():
+    """Consultas lentas aún no guardadas en este proceso."""
+    return list(_buffer)
+
+
+def flush():
+    """Guarda el buffer en `SlowQuery` y recorta la tabla a las filas más recientes."""
+    if not _buffer:
+        return 0
+    from api.models import SlowQuery
+
+    records = []
+    while _buffer:
+        records.append(SlowQuery(**_buffer.popleft()))
+    _local.active = True
+    try:
+        with transaction.atomic():
+            created = SlowQuery.objects.bulk_create(records)
+            max_rows = getattr(settings, 'SLOW_QUERY_MAX_ROWS', DEFAULT_MAX_ROWS)
+            last_id = created[-1].pk
+            if last_id is not None and last_id > max_rows:
+                SlowQuery.objects.filter(pk__lte=last_id - max_rows).delete()
+    except DatabaseError:
+        # Sin la tabla (migraciones pendientes) o con la base caída se descartan
+        pass
+    finally:
+        _local.active = False
+    return len(records)
+
+
+def _install(sender, connection, **kwargs):
+    # Al inicio de la lista: la conexión puede abrirse dentro de un
+    # `execute_wrapper()` activo, que al salir quita el último elemento
+    if capture not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, capture)
+
+
+def install():
+    """Agrega `capture` a cada conexión nueva (y a la actual, si ya está abierta)."""
+    connection_created.connect(_install, dispatch_uid='slow_queries')
+    if connection.connection is not None:
+        _install(None, connection)
@@ -0,0 +1,119 @@
+"""
+Cola de tareas en la base de datos para los efectos secundarios que no hace
+falta esperar dentro del request (XP, rachas, misiones y desbloqueos).
+
+`enqueue` registra la tarea con `transaction.on_commit`, así que solo se
+encola si la escritura que la origina se confirma. La `key` hace la tarea
+idempotente: mientras haya una pendiente con la misma clave, las nuevas se
+descartan. Por eso las funciones encoladas procesan todo el estado pendiente
+del usuario (p. ej. todas sus declaraciones sin efectos) y no un objeto
+concreto, y con la espera de `TASKS_DELAY_SECONDS` una ráfaga de requests del
+mismo usuario termina en una sola ejecución.
+
+El worker (`python manage.py run_tasks`) toma las tareas con
+`SELECT ... FOR UPDATE SKIP LOCKED`, así que pueden correr varios. Una tarea
+que falla se reintenta con espera creciente hasta `TASKS_MAX_ATTEMPTS` y luego
+queda `failed`. Una que quedó `running` porque su worker murió se retoma
+pasados `TASKS_LOCK_SECONDS`.
+
+Con `DEFERRED_TASKS` desactivado (por defecto) `enqueue` ejecuta la función
+en el momento, dentro del request, como antes de existir la cola.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from api.models import Task
+from api.utils import slow_queries
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(function, key, **kwargs):
+    """
+    Encola `function(**kwargs)` al confirmarse la transacción en curso. Los
+    argumentos deben poder guardarse como JSON. Devuelve True si la función
+    se ejecutó en el momento (`DEFERRED_TASKS` desactivado).
+    """
+    if not settings.DEFERRED_TASKS:
+        function(**kwargs)
+        return True
+    path = f'{function.__module__}.{function.__qualname__}'
+    # robust: si falla el insert la escritura ya está confirmada y el request no debe fallar
+    transaction.on_commit(lambda: _insert(path, key, kwargs), robust=True)
+    return False
+
+
+def _insert(path, key, kwargs):
+    run_after = timezone.now() + timedelta(seconds=settings.TASKS_DELAY_SECONDS)
+    # El índice único parcial sobre las pendientes descarta la tarea repetida
+    Task.objects.bulk_create([Task(key=key, function=path, kwargs=kwargs, run_after=run_after)],
+                             ignore_conflicts=True)
+
+
+def claim():
+    """Toma la siguiente tarea lista y la marca `running`; None si no hay ninguna."""
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.TASKS_LOCK_SECONDS)
+    with transaction.atomic():
+        task = (Task.objects
+            .select_for_update(skip_locked=True)
+            .filter(Q(state='pending', run_after__lte=now) | Q(state='running', locked_at__lt=stale))
+            .order_by('run_after', 'id')
+            .first())
+        if task is None:
+            return None
+        task.state = 'running'
+        task.locked_at = now
+        task.attempts += 1
+        task.save(update_fields=['state', 'locked_at', 'attempts'])
+    return task
+
+
+def run(task):
+    """Ejecuta una tarea tomada con `claim`. Devuelve True si terminó bien."""
+    try:
+        with transaction.atomic():
+            import_string(task.function)(**task.kwargs)
+    except Exception as exc:
+        logger.exception("Falló la tarea %s (intento %s)", task.key, task.attempts)
+        _retry(task, exc)
+        return False
+    task.delete()
+    return True
+
+
+def _retry(task, exc):
+    task.last_error = f'{type(exc).__name__}: {exc}'
+    if task.attempts >= settings.TASKS_MAX_ATTEMPTS:
+        task.state = 'failed'
+        task.save(update_fields=['state', 'last_error'])
+        return
+    task.state = 'pending'
+    task.run_after = timezone.now() + timedelta(seconds=settings.TASKS_DELAY_SECONDS * 2 ** task.attempts)
+    try:
+        with transaction.atomic():
+            task.save(update_fields=['state', 'run_after', 'last_error'])
+    except IntegrityError:
+        # Ya se encoló otra con la misma clave y hará el mismo trabajo
+        task.delete()
+
+
+def run_pending(limit=None):
+    """Ejecuta las tareas listas hasta vaciar la cola (o `limit`); devuelve cuántas corrió."""
+    count = 0
+    while limit is None or count < limit:
+        task = claim()
+        if task is None:
+            break
+        run(task)
+        # Sin request no pasa el middleware: las consultas lentas de la tarea se guardan aquí
+        slow_queries.flush()
+        count += 1
+    return count
@@ -0,0 +1,52 @@
+"""
+Otorgamiento de experiencia (XP).
+
+Cada recompensa se registra en el ledger `XPEvent` y el total y el nivel de
+Profile se actualizan con un único UPDATE atómico basado en F(), en la misma
+transacción. Así no se pierden actualizaciones entre workers concurrentes.
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, FloatField, IntegerField
+from django.db.models.functions import Cast, Floor
+from django.utils import timezone
+
+from api.models import Profile, XPEvent
+from api.utils import events
+
+XP_PER_LEVEL = 100
+
+
+def level_for(experience_points):
+    """Nivel correspondiente a un total de XP (misma regla que Profile.calculate_level)."""
+    return (experience_points // XP_PER_LEVEL) + 1
+
+
+def level_expression(experience_points):
+    """
+    `level_for` como expresión SQL. La división entera de SQL trunca hacia
+    cero; Floor redondea hacia abajo como `//`, también con totales negativos.
+    """
+    return Cast(Floor(Cast(experience_points, FloatField()) / XP_PER_LEVEL) + 1, IntegerField())
+
+
+def award_xp(user, amount, source, reference=''):
+    """
+    Otorga `amount` XP al usuario. Si `reference` ya fue recompensada para la
+    misma fuente no hace nada. Devuelve True si se otorgó la XP.
+    """
+    if not amount:
+        return False
+    try:
+        with transaction.atomic():
+            XPEvent.objects.create(user=user, source=source, reference=str(reference), amount=amount)
+            total = F('experience_points') + amount
+            Profile.objects.filter(user=user).update(
+                experience_points=total,
+                current_level=level_expression(total),
+                updated_at=timezone.now()
+            )
+            events.publish(user.pk, events.XP_AWARDED, amount=amount, source=source, reference=str(reference))
+    except IntegrityError:
+        return False
+    return True
@@ -2,62 +2,47 @@
 """
 Views for the Dividis API.
 """
+import ipaddress
+
 from django.contrib.auth.models import User
 from rest_framework import viewsets, generics, status, permissions
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.http import Http404, HttpResponse, HttpResponseForbidden
 from django.shortcuts import get_object_or_404
 from django.db.models import Sum, Count
-from django.utils import timezone
 from django.conf import settings
+from django.utils.crypto import constant_time_compare
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
 from uuid import UUID
 
 from .models import (
     Profile, Module, ModuleProgress, Mission, MissionProgress,
-    Achievement, UserAchievement, Streak, Declaration, UnlockedPillar
+    Achievement, Streak, Declaration, UnlockedPillar,
+    UserProgressSummary
 )
 from .serializers import (
     UserSerializer, UserRegistrationSerializer, ProfileSerializer,
     ModuleSerializer, ModuleProgressSerializer, MissionSerializer,
     MissionProgressSerializer, AchievementSerializer, UserAchievementSerializer,
     StreakSerializer, UserProfileDetailSerializer, ProgressOverviewSerializer,
-    DeclarationSerializer, UnlockedPillarSerializer,
+    DeclarationSerializer, DeclarationSyncSerializer, UnlockedPillarSerializer,
     HabitSerializer, ComfortWallSerializer,
     UserProfileUpdateSerializer
 )
-
-def sync_module_unlocks(user):
-    """
-    Sincroniza el estado de desbloqueo de módulos según XP y requisitos.
-    Desbloquea automáticamente los módulos para los que el usuario cumple los requisitos.
-    """
-    profile = user.profile
-    modules = Module.objects.all()
-    for module in modules:
-        progress, _ = ModuleProgress.objects.get_or_create(user=user, module=module)
-        if progress.state == 'locked':
-            # Lógica de requisitos personalizados
-            can_unlock = False
-            if module.id == "salud":
-                if profile.experience_points >= module.xp_required:
-                    can_unlock = True
-            elif module.id == "personalidad":
-                has_xp = profile.experience_points >= 200
-                try:
-                    mission = Mission.objects.get(id="46e39fc7-8a77-4e39-9559-283a73655d12")
-                    mp = MissionProgress.objects.filter(user=user, mission=mission, state="completed").exists()
-                except Exception:
-                    mp = False
-                if has_xp and mp:
-                    can_unlock = True
-            else:
-                if profile.experience_points >= module.xp_required:
-                    can_unlock = True
-            if can_unlock:
-                progress.unlock()
-                progress.save()
+from .pagination import KeysetPagination
+from .utils.bootstrap import build_bootstrap
+from .utils.catalog import get_catalog
+from .utils import events, metrics
+from .utils.changes import changes_since
+from .utils.conditional import ConditionalGetMixin
+from .utils.declaration_sync import enqueue_declaration_effects, sync_declarations
+from .utils.serializers_helpers import overview_data
+from .utils.module_unlocks import apply_mission_effects
+from .utils import tasks
+from .utils.xp import award_xp
 
 @extend_schema(tags=['users'])
 class UserViewSet(viewsets.ModelViewSet):
@@ -77,10 +62,9 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
     serializer_class = UserProfileDetailSerializer
     permission_classes = [permissions.IsAuthenticated]
     def get_object(self):
-        return Profile.objects.get(user=self.request.user)
+        return Profile.objects.select_related('user').get(user=self.request.user)
 
     def partial_update(self, request, *args, **kwargs):
-        print("PATCH /auth/me/ request.data:", request.data)
         profile = self.get_object()
         user = profile.user
         updated = False
@@ -101,9 +85,6 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
             user.save()
             profile = self.get_object()
             user.refresh_from_db()
-            print("Usuario actualizado:", user.email, user.first_name, user.last_name)
-        else:
-            print("No se actualizaron campos de usuario.")
 
         # Devuelve el perfil actualizado con los datos del usuario
         serializer = self.get_serializer(profile)
@@ -121,10 +102,12 @@ class UserProfileUpdateView(generics.UpdateAPIView):
         return self.request.user.profile
 
 @extend_schema(tags=['modules'])
-class ModuleViewSet(viewsets.ModelViewSet):
+class ModuleViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Module.objects.all()
     serializer_class = ModuleSerializer
     permission_classes = [permissions.IsAuthenticated]
+    user_scoped = True  # incluye el estado del módulo para el usuario
+
     def get_queryset(self):
         # Devuelve todos los módulos para el usuario autenticado
         return Module.objects.all()
@@ -145,7 +128,9 @@ class ModuleUnlockView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = ModuleProgressSerializer
     def post(self, request, module_id):
-        module = get_object_or_404(Module, id=module_id)
+        module = get_catalog().module(module_id)
+        if module is None:
+            raise Http404("Módulo no encontrado")
         user = request.user
         profile = user.profile
 
@@ -160,12 +145,10 @@ class ModuleUnlockView(APIView):
         elif module.id == "personalidad":
             # XP y misión global
             has_xp = profile.experience_points >= 200
-            try:
-                from .models import Mission, MissionProgress
-                mission = Mission.objects.get(id="46e39fc7-8a77-4e39-9559-283a73655d12")
-                mp = MissionProgress.objects.filter(user=user, mission=mission, state="completed").exists()
-            except Exception:
-                mp = False
+            mission = get_catalog().mission("46e39fc7-8a77-4e39-9559-283a73655d12")
+            mp = mission is not None and MissionProgress.objects.filter(
+                user=user, mission=mission, state="completed"
+            ).exists()
             if has_xp and mp:
                 can_unlock = True
             elif not has_xp:
@@ -198,17 +181,19 @@ class ModuleUnlockView(APIView):
         )
 
 @extend_schema(tags=['missions'])
-class MissionViewSet(viewsets.ModelViewSet):
+class MissionViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Mission.objects.all()
     serializer_class = MissionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    user_scoped = True  # filtra por los módulos desbloqueados del usuario
+
     def get_queryset(self):
         user = self.request.user
         unlocked_modules = ModuleProgress.objects.filter(
             user=user,
             state='unlocked'
         ).values_list('module_id', flat=True)
-        return Mission.objects.filter(module_id__in=unlocked_modules)
+        return Mission.objects.filter(module_id__in=unlocked_modules).select_related('module')
 
 @extend_schema(
     tags=['missions'],
@@ -254,15 +239,10 @@ class MissionCompleteView(APIView):
         if progress.state != 'completed':
             progress.complete()
             progress.save()
-            profile = user.profile
-            profile.experience_points += mission.xp_reward
-            profile.calculate_level()
-            profile.save()
-            streak, _ = Streak.objects.get_or_create(
-                user=user,
-                module=mission.module
-            )
-            streak.update_streak()
+            award_xp(user, mission.xp_reward, 'mission', mission.id)
+            # Racha y desbloqueos no cambian la respuesta: pueden ir al worker
+            tasks.enqueue(apply_mission_effects, f'mission-effects:{user.pk}:{mission.module_id}',
+                          user_id=user.pk, module_id=mission.module_id)
         return Response(
             MissionProgressSerializer(progress).data,
             status=status.HTTP_200_OK
@@ -273,35 +253,8 @@ class ProgressOverviewView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = ProgressOverviewSerializer
     def get(self, request):
-        user = request.user
-        # --- Sincroniza desbloqueo de módulos antes de devolver el progreso ---
-        sync_module_unlocks(user)
-        profile = user.profile
-        modules_unlocked = ModuleProgress.objects.filter(
-            user=user,
-            state='unlocked'
-        ).count()
-        missions_completed = MissionProgress.objects.filter(
-            user=user,
-            state='completed'
-        ).count()
-        achievements_earned = UserAchievement.objects.filter(
-            user=user
-        ).count()
-        streaks = Streak.objects.filter(user=user)
-        current_streaks = {
-            streak.module.id: streak.current_streak
-            for streak in streaks
-        }
-        data = {
-            'total_xp': profile.experience_points,
-            'level': profile.current_level,
-            'modules_unlocked': modules_unlocked,
-            'missions_completed': missions_completed,
-            'achievements_earned': achievements_earned,
-            'current_streaks': current_streaks,
-            'title': profile.get_level_title()
-        }
+        summary = UserProgressSummary.for_user(request.user)
+        data = overview_data(summary, summary.user.profile.get_level_title())
         return Response(
             ProgressOverviewSerializer(data).data,
             status=status.HTTP_200_OK
@@ -325,20 +278,17 @@ class ModuleProgressView(APIView):
     def get(self, request, module_id):
         module = get_object_or_404(Module, id=module_id)
         user = request.user
-        # --- Sincroniza desbloqueo de módulos antes de devolver el progreso de uno ---
-        sync_module_unlocks(user)
-        progress, _ = ModuleProgress.objects.get_or_create(
-            user=user,
-            module=module
-        )
+        # Solo lectura: los desbloqueos se evalúan en las rutas de escritura
+        progress = ModuleProgress.objects.filter(user=user, module=module).select_related('module').first()
+        if progress is None:
+            progress = ModuleProgress(user=user, module=module)
         missions = MissionProgress.objects.filter(
             user=user,
             mission__module=module
-        )
-        streak, _ = Streak.objects.get_or_create(
-            user=user,
-            module=module
-        )
+        ).select_related('mission__module')
+        streak = Streak.objects.filter(user=user, module=module).select_related('module').first()
+        if streak is None:
+            streak = Streak(user=user, module=module)
         data = {
             'progress': ModuleProgressSerializer(progress).data,
             'missions': MissionProgressSerializer(missions, many=True).data,
@@ -346,6 +296,56 @@ class ModuleProgressView(APIView):
         }
         return Response(data, status=status.HTTP_200_OK)
 
+@extend_schema(tags=['progress'])
+class BootstrapView(APIView):
+    """
+    Carga inicial del dashboard: `me`, `progress_overview`, `modules`,
+    `user_missions` y `unlocked_pillars` con el mismo JSON que sus endpoints,
+    en un solo request y con cada tabla del usuario leída una vez.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    def get(self, request):
+        return Response(build_bootstrap(request, {'request': request}), status=status.HTTP_200_OK)
+
+@extend_schema(tags=['events'])
+class EventStreamTokenView(APIView):
+    """
+    Token firmado para abrir /api/events/stream/ con EventSource, que no
+    permite headers. Solo sirve para el stream y caduca en
+    EVENTS_TOKEN_MAX_AGE segundos, así que no importa que quede en los logs.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    def post(self, request):
+        return Response({'token': events.stream_token(request.user.pk), 'expires_in': settings.EVENTS_TOKEN_MAX_AGE},
+                        status=status.HTTP_200_OK)
+
+@extend_schema(
+    tags=['sync'],
+    parameters=[
+        OpenApiParameter(
+            name='since',
+            type=int,
+            location=OpenApiParameter.QUERY,
+            description='Cursor devuelto por la consulta anterior; sin él se pide una recarga completa',
+            required=False
+        )
+    ]
+)
+class SyncChangesView(APIView):
+    """
+    Filas del estado del usuario cambiadas después de `since` (progreso de
+    módulos y misiones, rachas, declaraciones, hábitos, muro de confort y
+    pilares) y los ids borrados. El costo depende de los cambios, no del
+    historial del usuario.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    def get(self, request):
+        since = request.query_params.get('since')
+        if since is not None and not since.isdigit():
+            raise ValidationError({'since': 'Debe ser un cursor devuelto por este endpoint'})
+        payload = changes_since(request.user, int(since) if since is not None else None, {'request': request})
+        return Response(payload, status=status.HTTP_200_OK)
+
 # --- Pilares desbloqueados ---
 @extend_schema(tags=['pillars'])
 class UnlockedPillarViewSet(viewsets.ModelViewSet):
@@ -353,6 +353,8 @@ class UnlockedPillarViewSet(viewsets.ModelViewSet):
     queryset = UnlockedPillar.objects.all()
     serializer_class = UnlockedPillarSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    cursor_ordering = ('-unlocked_at', '-id')
 
     def get_queryset(self):
         user = self.request.user
@@ -407,6 +409,7 @@ class DeclarationViewSet(viewsets.ModelViewSet):
     queryset = Declaration.objects.all()
     serializer_class = DeclarationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
     def get_queryset(self):
         user = self.request.user
         queryset = Declaration.objects.filter(user=user)
@@ -418,34 +421,22 @@ class DeclarationViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(pillar=pillar)
         return queryset
     def perform_create(self, serializer):
-        # Guardar la declaración con el usuario actual
-        declaration = serializer.save(user=self.request.user)
-        user = self.request.user
-        module = declaration.module
-        pillar = declaration.pillar
-
-        # Verificar si ya existe una declaración previa en este pilar/módulo para este usuario
-        exists = Declaration.objects.filter(
-            user=user,
-            module=module,
-            pillar=pillar
-        ).exclude(id=declaration.id).exists()
-
-        if not exists:
-            # Calcular experiencia: base 20 + 10 * (orden-1)
-            base_xp = 20
-            xp = base_xp + 10 * (module.order - 1)
-            profile = user.profile
-            profile.experience_points += xp
-            profile.calculate_level()
-            profile.save()
-        # Actualizar streak diario al crear declaración
-        streak, _ = Streak.objects.get_or_create(user=user, module=module)
-        streak.update_streak()
-
-        # --- Lógica de misiones delegada a utils ---
-        from api.utils.mission_logic import check_and_complete_missions
-        check_and_complete_missions(user, module, pillar)
+        # XP, racha, desbloqueos y misiones se aplican a todas las pendientes
+        # del usuario juntas, en el request o en el worker (DEFERRED_TASKS)
+        declaration = serializer.save(user=self.request.user, synced=False)
+        declaration.synced = enqueue_declaration_effects(declaration.user_id)
+
+    @extend_schema(request=DeclarationSyncSerializer)
+    @action(detail=False, methods=['post'], url_path='sync')
+    def sync(self, request):
+        """
+        Sincroniza en un solo request las declaraciones creadas offline. Los
+        reintentos con los mismos `client_id` no duplican filas ni recompensas.
+        """
+        serializer = DeclarationSyncSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results, missions_completed = sync_declarations(request.user, serializer.validated_data['declarations'])
+        return Response({'results': results, 'missions_completed': missions_completed})
 
 # --- Hábitos (serpiente) ---
 @extend_schema(tags=['habits'])
@@ -453,10 +444,12 @@ class HabitViewSet(viewsets.ModelViewSet):
     """ViewSet for user habits (serpientes)."""
     serializer_class = HabitSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    cursor_ordering = ('-id',)  # fecha_creacion es solo fecha; id sigue el orden de creación
     queryset = __import__('api.models').models.Habit.objects.all()
 
     def get_queryset(self):
-        return self.queryset.filter(user=self.request.user)
+        return self.queryset.filter(user=self.request.user).select_related('user')
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -470,7 +463,7 @@ class ComfortWallViewSet(viewsets.ModelViewSet):
     queryset = __import__('api.models').models.ComfortWall.objects.all()
 
     def get_queryset(self):
-        return self.queryset.filter(user=self.request.user)
+        return self.queryset.filter(user=self.request.user).select_related('user')
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -498,7 +491,7 @@ class ComfortWallViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 # --- Achievements (logros) ---
-class AchievementViewSet(viewsets.ReadOnlyModelViewSet):
+class AchievementViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Achievement.objects.all()
     serializer_class = AchievementSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -507,115 +500,28 @@ class AchievementViewSet(viewsets.ReadOnlyModelViewSet):
 class UserMissionsAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request):
-        user = request.user
-        from .models import Mission, MissionProgress, Declaration, ModuleProgress
-        from datetime import timedelta
-
-        now = timezone.now()
-        today = now.date()
-        week_start = today - timedelta(days=today.weekday())
-        week_end = week_start + timedelta(days=6)
-
-        # Misiones globales
-        global_missions = Mission.objects.filter(module__isnull=True)
-        # Todas las misiones de módulos (desbloqueados o no)
-        module_missions = Mission.objects.filter(module__isnull=False)
-        # Módulos desbloqueados por el usuario
-        unlocked_modules = set(ModuleProgress.objects.filter(
-            user=user,
-            state='unlocked'
-        ).values_list('module_id', flat=True))
+        from api.utils.mission_board import build_mission_board
+        return Response(build_mission_board(request.user))
 
-        # Progreso de usuario
-        declarations_today = Declaration.objects.filter(user=user, created_at__date=today).count()
-        declarations_this_week = Declaration.objects.filter(user=user, created_at__date__gte=week_start, created_at__date__lte=week_end)
-        days_with_declaration = declarations_this_week.values_list('created_at__date', flat=True).distinct()
-        modules_unlocked_this_week = ModuleProgress.objects.filter(
-            user=user,
-            state='unlocked',
-            last_activity__date__gte=week_start,
-            last_activity__date__lte=week_end,
-            auto_unlocked=False
-        ).count()
-
-        result = []
-
-        # Global missions
-        for mission in global_missions:
-            mp = MissionProgress.objects.filter(user=user, mission=mission).first()
-            state = mp.state if mp else "active"
-            progress = None
-            frequency = getattr(mission, "frequency", None)
-            if hasattr(mission, "frequency"):
-                frequency = mission.frequency
-            elif hasattr(mission, "fields") and "frequency" in mission.fields:
-                frequency = mission.fields["frequency"]
-            # Daily
-            if frequency == "daily":
-                progress = {
-                    "current": declarations_today,
-                    "target": 1,
-                    "label": f"{declarations_today}/1 declaraciones hoy"
-                }
-                if declarations_today >= 1:
-                    state = "completed"
-            # Weekly streak
-            elif frequency == "weekly" and "racha" in mission.title.lower():
-                # Usar la racha real del usuario (Streak)
-                from .models import Streak
-                streak = Streak.objects.filter(user=user, module__isnull=True).first()
-                current_streak = streak.current_streak if streak else 0
-                progress = {
-                    "current": current_streak,
-                    "target": 5,
-                    "label": f"{current_streak}/5 días de racha consecutiva"
-                }
-                if current_streak >= 5:
-                    state = "completed"
-            # Weekly unlock
-            elif frequency == "weekly" and "desbloquea" in mission.title.lower():
-                progress = {
-                    "current": modules_unlocked_this_week,
-                    "target": 1,
-                    "label": f"{modules_unlocked_this_week}/1 módulos desbloqueados esta semana"
-                }
-                if modules_unlocked_this_week >= 1:
-                    state = "completed"
-            result.append({
-                "id": str(mission.id),
-                "title": mission.title,
-                "description": mission.description,
-                "xp_reward": mission.xp_reward,
-                "frequency": frequency,
-                "requirements": getattr(mission, "requirements", []),
-                "type": "global",
-                "state": state,
-                "progress": progress,
-                "started_at": mp.started_at if mp else None,
-                "completed_at": mp.completed_at if mp else None,
-            })
-
-        # Module missions
-        for mission in module_missions:
-            mp = MissionProgress.objects.filter(user=user, mission=mission).first()
-            # Si el módulo está desbloqueado, usar el estado real; si no, marcar como "blocked"
-            if mission.module and str(mission.module.id) in unlocked_modules:
-                state = mp.state if mp else "active"
-            else:
-                state = "blocked"
-            result.append({
-                "id": str(mission.id),
-                "title": mission.title,
-                "description": mission.description,
-                "xp_reward": mission.xp_reward,
-                "frequency": getattr(mission, "frequency", None),
-                "requirements": getattr(mission, "requirements", []),
-                "type": "module",
-                "module_id": str(mission.module.id) if mission.module else None,
-                "state": state,
-                "progress": None,
-                "started_at": mp.started_at if mp else None,
-                "completed_at": mp.completed_at if mp else None,
-            })
-
-        return Response(result)
+# --- Métricas (formato Prometheus) ---
+def metrics_view(request):
+    """
+    Histogramas por vista de todos los workers. Con METRICS_TOKEN se exige
+    `Authorization: Bearer <token>`; sin él, solo responde a las direcciones de
+    METRICS_ALLOWED_NETWORKS.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        if not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return HttpResponseForbidden()
+    elif not _in_networks(request.META.get('REMOTE_ADDR', ''), settings.METRICS_ALLOWED_NETWORKS):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def _in_networks(address, networks):
+    try:
+        address = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(network, strict=False) for network in networks)
@@ -0,0 +1,175 @@
+"""
+Histogramas de respuestas de la encuesta de bienestar.
+
+Las respuestas son enteros de 0 a 10, así que la distribución de la población
+cabe en 11 contadores por pregunta y por categoría. Se actualizan en cada envío
+(sumando el intento nuevo y restando el anterior del usuario), y los percentiles,
+la media y la mediana se obtienen de los contadores sin recorrer las respuestas.
+"""
+from collections import Counter
+
+from django.db.models import Count, OuterRef, Subquery
+
+from .models import WellnessAnswerHistogram, WellnessSurveyAnswer, WellnessSurveySession
+
+CATEGORY_ROW = ''
+
+
+def bucket(value):
+    """Contador que corresponde a una respuesta o promedio (redondeo hacia arriba en .5)."""
+    return min(max(int(value + 0.5), 0), WellnessAnswerHistogram.BUCKETS - 1)
+
+
+def attempt_deltas(answers, category_averages, sign=1):
+    """
+    Cambios que aporta un intento: una unidad por respuesta en su pregunta y una
+    por categoría en el contador de su promedio. `answers` son tuplas
+    (categoría, pregunta, respuesta).
+    """
+    deltas = Counter()
+    for category, question, answer in answers:
+        deltas[(category, question, bucket(answer))] += sign
+    for category, average in category_averages.items():
+        deltas[(category, CATEGORY_ROW, bucket(average))] += sign
+    return deltas
+
+
+def apply_deltas(deltas):
+    """Aplica los cambios a los histogramas, bloqueando las filas afectadas."""
+    deltas = {key: value for key, value in deltas.items() if value}
+    if not deltas:
+        return
+
+    keys = {(category, question) for category, question, _ in deltas}
+    WellnessAnswerHistogram.objects.bulk_create([
+        WellnessAnswerHistogram(
+            category=category,
+            question=question,
+            counts=[0] * WellnessAnswerHistogram.BUCKETS
+        )
+        for category, question in keys
+    ], ignore_conflicts=True)
+
+    categories = {category for category, _ in keys}
+    rows = {
+        (row.category, row.question): row
+        for row in (WellnessAnswerHistogram.objects
+            .select_for_update()
+            .filter(category__in=categories)
+            .order_by('category', 'question'))
+        if (row.category, row.question) in keys
+    }
+    for (category, question, index), value in deltas.items():
+        row = rows[(category, question)]
+        if len(row.counts) < WellnessAnswerHistogram.BUCKETS:
+            row.counts = [0] * WellnessAnswerHistogram.BUCKETS
+        row.counts[index] = max(row.counts[index] + value, 0)
+    for row in rows.values():
+        row.total = sum(row.counts)
+    WellnessAnswerHistogram.objects.bulk_update(rows.values(), ['counts', 'total', 'updated_at'])
+
+
+def record_attempt(session, answers, previous=None):
+    """Suma un intento nuevo y, si existe, resta el intento anterior del usuario."""
+    deltas = attempt_deltas(answers, session.category_averages)
+    if previous is not None:
+        deltas.update(attempt_deltas(
+            previous.answers.values_list('category', 'question', 'answer'),
+            previous.category_averages,
+            sign=-1
+        ))
+    apply_deltas(deltas)
+
+
+def percentile(counts, value):
+    """Porcentaje de la población bajo `value` (los empates cuentan la mitad)."""
+    total = sum(counts)
+    if not total:
+        return None
+    index = bucket(value)
+    below = sum(counts[:index])
+    return round(100 * (below + counts[index] / 2) / total, 1)
+
+
+def mean(counts):
+    total = sum(counts)
+    if not total:
+        return None
+    return round(sum(index * count for index, count in enumerate(counts)) / total, 2)
+
+
+def median(counts):
+    total = sum(counts)
+    if not total:
+        return None
+    seen = 0
+    for index, count in enumerate(counts):
+        seen += count
+        if 2 * seen >= total:
+            if 2 * seen == total:
+                # Número par de datos y la mitad exacta cae en este contador
+                following = next(i for i in range(index + 1, len(counts)) if counts[i])
+                return (index + following) / 2
+            return float(index)
+
+
+def benchmarks_for(session):
+    """Percentil del usuario y media/mediana de la población por categoría."""
+    histograms = {
+        row.category: row.counts
+        for row in WellnessAnswerHistogram.objects.filter(
+            category__in=list(session.category_averages),
+            question=CATEGORY_ROW
+        )
+    }
+    result = []
+    for category in sorted(session.category_averages):
+        value = session.category_averages[category]
+        counts = histograms.get(category) or [0] * WellnessAnswerHistogram.BUCKETS
+        result.append({
+            "category": category,
+            "value": value,
+            "percentile": percentile(counts, value),
+            "mean": mean(counts),
+            "median": median(counts),
+            "population": sum(counts),
+        })
+    return result
+
+
+def latest_attempts(sessions=WellnessSurveySession):
+    """Último intento completado de cada usuario."""
+    latest = (sessions.objects
+        .filter(user=OuterRef('user'), is_completed=True)
+        .order_by('-finished_at', '-id')
+        .values('id')[:1])
+    return sessions.objects.filter(id=Subquery(latest))
+
+
+def compute_histograms(answers=WellnessSurveyAnswer, sessions=WellnessSurveySession):
+    """
+    Recalcula todos los contadores desde cero. Las respuestas se cuentan con
+    un GROUP BY en la base de datos; los promedios de categoría salen de los
+    valores guardados en cada intento. Los modelos se pueden pasar para
+    usarla desde una migración.
+    """
+    attempts = latest_attempts(sessions)
+    counts = {}
+
+    def add(category, question, index, amount):
+        row = counts.setdefault((category, question), [0] * WellnessAnswerHistogram.BUCKETS)
+        row[index] += amount
+
+    grouped = (answers.objects
+        .filter(session__in=attempts.values('id'))
+        .values_list('category', 'question', 'answer')
+        .annotate(n=Count('id'))
+        .order_by())
+    for category, question, answer, n in grouped.iterator():
+        add(category, question, bucket(answer), n)
+
+    for averages in attempts.values_list('category_averages', flat=True).iterator():
+        for category, average in averages.items():
+            add(category, CATEGORY_ROW, bucket(average), 1)
+
+    return counts
@@ -3,15 +3,61 @@ from django.conf import settings
 
 class WellnessSurveyAnswer(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    session = models.ForeignKey('WellnessSurveySession', on_delete=models.CASCADE, null=True, blank=True, related_name='answers')
     category = models.CharField(max_length=50)
     question = models.CharField(max_length=255)
     answer = models.IntegerField()
+    question_set = models.CharField(max_length=32, blank=True, default='')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
 class WellnessSurveySession(models.Model):
+    """
+    Un intento de la encuesta. Cada envío crea un intento nuevo con sus
+    promedios por categoría ya calculados, de modo que las lecturas no
+    necesitan agregar la tabla de respuestas.
+    """
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     current_step = models.IntegerField(default=1)
     is_completed = models.BooleanField(default=False)
     started_at = models.DateTimeField(auto_now_add=True)
     finished_at = models.DateTimeField(null=True, blank=True)
+    question_set = models.CharField(max_length=32, blank=True, default='')
+    category_averages = models.JSONField(default=dict, blank=True)  # {categoría: promedio}
+    answer_count = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-finished_at'], name='wellness_session_user_idx'),
+        ]
+
+    @classmethod
+    def latest_completed(cls, user):
+        return (cls.objects
+            .filter(user=user, is_completed=True)
+            .order_by('-finished_at', '-id')
+            .first())
+
+    @property
+    def values(self):
+        """Promedios ordenados por categoría, en el formato del radar."""
+        return [self.category_averages[category] for category in sorted(self.category_averages)]
+
+class WellnessAnswerHistogram(models.Model):
+    """
+    Distribución de respuestas (0 a 10) de la población, una fila por pregunta.
+    La fila con question='' guarda la distribución de los promedios redondeados
+    de la categoría. Cada usuario aporta solo su último intento.
+    """
+    BUCKETS = 11
+
+    category = models.CharField(max_length=50)
+    question = models.CharField(max_length=255, blank=True, default='')
+    counts = models.JSONField(default=list)
+    total = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['category', 'question'], name='unique_wellness_histogram'),
+        ]
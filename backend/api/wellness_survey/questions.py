@@ -0,0 +1,35 @@
+"""
+Conjunto de preguntas de la encuesta de bienestar.
+
+Se carga una vez por proceso y se pre-serializa a bytes junto con su hash, que
+sirve como ETag y como identificador versionado del conjunto de preguntas.
+"""
+import hashlib
+import json
+import os
+
+QUESTIONS_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'wellnessSurveyQuestions.json')
+
+
+class QuestionSet:
+    """Preguntas serializadas con su versión."""
+
+    def __init__(self, questions):
+        self.questions = questions
+        # Mismo formato que el JSONRenderer de DRF (compacto y sin escapar unicode)
+        self.content = json.dumps(questions, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        digest = hashlib.sha256(self.content).hexdigest()
+        self.etag = f'"{digest}"'
+        self.version = f"qs-{digest[:12]}"
+
+
+_question_set = None
+
+
+def get_question_set():
+    """Devuelve el conjunto de preguntas, leyéndolo del disco solo la primera vez."""
+    global _question_set
+    if _question_set is None:
+        with open(QUESTIONS_PATH, 'r', encoding='utf-8') as f:
+            _question_set = QuestionSet(json.load(f))
+    return _question_set
@@ -1,6 +1,9 @@
 from rest_framework import serializers
 from .models import WellnessSurveyAnswer, WellnessSurveySession
+from django.contrib.auth import get_user_model
 from django.db import transaction
+from django.utils import timezone
+from . import histograms
 
 class WellnessSurveyAnswerSerializer(serializers.ModelSerializer):
     class Meta:
@@ -36,35 +39,62 @@ class WellnessSurveyAnswerListSerializer(serializers.Serializer):
     def create(self, validated_data):
         return validated_data
 
+    @staticmethod
+    def category_averages(validated_data_list):
+        """Promedio por categoría (redondeado a 2 decimales) calculado en una pasada."""
+        totals = {}
+        for data in validated_data_list:
+            total, count = totals.get(data['category'], (0, 0))
+            totals[data['category']] = (total + data['answer'], count + 1)
+        return {
+            category: round(total / count, 2)
+            for category, (total, count) in sorted(totals.items())
+        }
+
     @classmethod
-    def create_answers(cls, validated_data_list, user):
+    def create_answers(cls, validated_data_list, user, question_set=''):
         """
-        Crea o actualiza las respuestas de la encuesta para un usuario.
-        Todas las operaciones se realizan en una única transacción.
+        Registra un nuevo intento de la encuesta con sus respuestas.
+        Los intentos anteriores se conservan; las respuestas se insertan con
+        un único bulk_create y los promedios quedan guardados en el intento.
         """
-        answers = []
+        now = timezone.now()
         with transaction.atomic():
-            # Eliminar respuestas anteriores
-            WellnessSurveyAnswer.objects.filter(user=user).delete()
-            
-            # Crear nuevas respuestas
-            answers = []
-            for data in validated_data_list:
-                answer = WellnessSurveyAnswer.objects.create(
+            # Bloquea al usuario para que dos envíos simultáneos no descuenten
+            # dos veces el mismo intento anterior de los histogramas
+            get_user_model().objects.select_for_update().filter(pk=user.pk).values_list('pk').first()
+            previous = WellnessSurveySession.latest_completed(user)
+            session = WellnessSurveySession.objects.create(
+                user=user,
+                is_completed=True,
+                finished_at=now,
+                question_set=question_set,
+                category_averages=cls.category_averages(validated_data_list),
+                answer_count=len(validated_data_list)
+            )
+            WellnessSurveyAnswer.objects.bulk_create([
+                WellnessSurveyAnswer(
                     user=user,
+                    session=session,
                     category=data['category'],
                     question=data['question'],
-                    answer=data['answer']
+                    answer=data['answer'],
+                    question_set=question_set
                 )
-                answers.append(answer)
-            
-            # Ordenar las respuestas por categoría para el radar chart
-            answers.sort(key=lambda x: x.category)
-            
-        return answers
+                for data in validated_data_list
+            ])
+            # Población: se suma este intento y se descuenta el anterior
+            histograms.record_attempt(
+                session,
+                [(data['category'], data['question'], data['answer']) for data in validated_data_list],
+                previous
+            )
+
+        return session
 
 class WellnessSurveySessionSerializer(serializers.ModelSerializer):
     class Meta:
         model = WellnessSurveySession
         fields = ['current_step', 'is_completed', 'finished_at']
-        read_only_fields = ['user']
+        # Un intento se completa solo al enviar sus respuestas (create_answers)
+        read_only_fields = ['is_completed', 'finished_at']
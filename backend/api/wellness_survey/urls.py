@@ -1,8 +1,15 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+if settings.ASYNC_READ_VIEWS:
+    from api.async_views import wellness_survey_answers as answers_view
+else:
+    answers_view = views.WellnessSurveyAnswerListCreateView.as_view()
+
 urlpatterns = [
     path('questions/', views.WellnessSurveyQuestionsView.as_view(), name='wellness-survey-questions'),
-    path('answers/', views.WellnessSurveyAnswerListCreateView.as_view(), name='wellness-survey-answers'),
+    path('answers/', answers_view, name='wellness-survey-answers'),
+    path('benchmarks/', views.WellnessSurveyBenchmarksView.as_view(), name='wellness-survey-benchmarks'),
     path('session/', views.WellnessSurveySessionView.as_view(), name='wellness-survey-session'),
 ]
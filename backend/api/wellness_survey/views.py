@@ -1,4 +1,7 @@
 import logging
+from datetime import datetime, time
+from itertools import groupby
+from operator import itemgetter
 from rest_framework import generics, permissions, status
 from .models import WellnessSurveyAnswer, WellnessSurveySession
 from .serializers import (
@@ -6,24 +9,24 @@ from .serializers import (
     WellnessSurveySessionSerializer,
     WellnessSurveyAnswerListSerializer
 )
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.db import transaction
-from django.db.models import Avg
+from django.http import HttpResponse, HttpResponseNotModified
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from ..utils.conditional import is_not_modified
+from .questions import get_question_set
+from . import histograms
 
 logger = logging.getLogger(__name__)
 
 class WellnessSurveyQuestionsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
-    
+
     def get(self, request):
         try:
-            import os, json
-            path = os.path.join(os.path.dirname(__file__), 'fixtures', 'wellnessSurveyQuestions.json')
-            with open(path, 'r', encoding='utf-8') as f:
-                questions = json.load(f)
-            return Response(questions)
+            question_set = get_question_set()
         except Exception as e:
             logger.error(f"Error loading survey questions: {str(e)}")
             return Response(
@@ -31,6 +34,16 @@ class WellnessSurveyQuestionsView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+        # Un proxy que comprime la respuesta reenvía la ETag débil (W/"...")
+        if is_not_modified(request, question_set.etag, None):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(question_set.content, content_type='application/json')
+        response['ETag'] = question_set.etag
+        response['X-Question-Set'] = question_set.version
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
 class WellnessSurveyAnswerListCreateView(generics.ListCreateAPIView):
     serializer_class = WellnessSurveyAnswerSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -55,40 +68,21 @@ class WellnessSurveyAnswerListCreateView(generics.ListCreateAPIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            with transaction.atomic():
-                # Eliminar respuestas anteriores
-                WellnessSurveyAnswer.objects.filter(user=request.user).delete()
-
-                # Crear nuevas respuestas
-                answers = []
-                for data in serializer.validated_data:
-                    answer = WellnessSurveyAnswer.objects.create(
-                        user=request.user,
-                        category=data['category'],
-                        question=data['question'],
-                        answer=data['answer']
-                    )
-                    answers.append(answer)
-
-                # Actualizar sesión
-                session = WellnessSurveySession.objects.get_or_create(user=request.user)[0]
-                session.is_completed = True
-                session.finished_at = timezone.now()
-                session.save()
-
-                # Calcular promedios por categoría
-                averages = (WellnessSurveyAnswer.objects
-                    .filter(user=request.user)
-                    .values('category')
-                    .annotate(average=Avg('answer'))
-                    .order_by('category'))
-
-                return Response({
-                    "status": "success",
-                    "message": "Respuestas guardadas correctamente",
-                    "count": len(answers),
-                    "values": [round(item['average'], 2) for item in averages]
-                }, status=status.HTTP_201_CREATED)
+            # Versión del conjunto de preguntas respondido (por defecto, la vigente)
+            question_set = (request.headers.get('X-Question-Set') or get_question_set().version)[:32]
+
+            session = WellnessSurveyAnswerListSerializer.create_answers(
+                serializer.validated_data,
+                request.user,
+                question_set=question_set
+            )
+
+            return Response({
+                "status": "success",
+                "message": "Respuestas guardadas correctamente",
+                "count": session.answer_count,
+                "values": session.values
+            }, status=status.HTTP_201_CREATED)
 
         except Exception as e:
             logger.error(f"Error creating survey answers: {str(e)}")
@@ -97,31 +91,27 @@ class WellnessSurveyAnswerListCreateView(generics.ListCreateAPIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    def _select_attempt(self, request):
+        attempt, since = parse_attempt_params(request.query_params)
+        if attempt is not None:
+            return WellnessSurveySession.objects.filter(
+                user=request.user, is_completed=True, id=attempt
+            ).first()
+        session = WellnessSurveySession.latest_completed(request.user)
+        return None if is_stale(session, since) else session
+
     def list(self, request, *args, **kwargs):
         try:
-            queryset = self.get_queryset()
-            
-            # Obtener promedios por categoría
-            averages = (queryset
-                .values('category')
-                .annotate(average=Avg('answer'))
-                .order_by('category'))
-
-            # Obtener todas las respuestas
-            serializer = self.get_serializer(queryset, many=True)
-            
-            return Response({
-                "categories": [{
-                    "category": avg['category'],
-                    "average": round(avg['average'], 2),
-                    "answers": [
-                        answer for answer in serializer.data 
-                        if answer['category'] == avg['category']
-                    ]
-                } for avg in averages],
-                "values": [round(item['average'], 2) for item in averages]
-            })
+            session = self._select_attempt(request)
+            if session is None:
+                return Response(attempt_payload(None, []))
+
+            # Una sola lectura ordenada por categoría; los grupos y sus
+            # promedios se arman en la misma pasada
+            return Response(attempt_payload(session, attempt_rows(request.user, session).iterator()))
 
+        except ValidationError:
+            raise
         except Exception as e:
             logger.error(f"Error retrieving survey answers: {str(e)}")
             return Response(
@@ -129,9 +119,91 @@ class WellnessSurveyAnswerListCreateView(generics.ListCreateAPIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+
+def parse_attempt_params(params):
+    """
+    Intento a listar según los parámetros; devuelve (id de intento, desde):
+    - ?attempt=<id>: un intento concreto del usuario.
+    - ?since=<fecha ISO>: el último intento solo si terminó después de esa fecha.
+    - sin parámetros: el último intento completado.
+    """
+    attempt = params.get('attempt')
+    if attempt:
+        if not attempt.isdigit():
+            raise ValidationError({"attempt": "Debe ser el id de un intento"})
+        return int(attempt), None
+
+    since = params.get('since')
+    if not since:
+        return None, None
+    moment = parse_datetime(since)
+    if moment is None:
+        day = parse_date(since)
+        if day is None:
+            raise ValidationError({"since": "Debe ser una fecha ISO 8601"})
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return None, moment
+
+
+def is_stale(session, since):
+    """El último intento no terminó después de `since`."""
+    return bool(session and since and session.finished_at <= since)
+
+
+def attempt_rows(user, session):
+    return (WellnessSurveyAnswer.objects
+        .filter(user=user, session=session)
+        .order_by('category', 'id')
+        .values('category', 'question', 'answer'))
+
+
+def attempt_payload(session, rows):
+    """Respuestas del intento agrupadas por categoría (filas ordenadas por categoría)."""
+    if session is None:
+        return {"attempt": None, "categories": [], "values": []}
+    categories = []
+    for category, answers in groupby(rows, key=itemgetter('category')):
+        answers = list(answers)
+        total = sum(answer['answer'] for answer in answers)
+        categories.append({
+            "category": category,
+            "average": round(total / len(answers), 2),
+            "answers": answers
+        })
+    return {
+        "attempt": session.id,
+        "finished_at": session.finished_at,
+        "categories": categories,
+        "values": [category['average'] for category in categories]
+    }
+
 class WellnessSurveySessionView(generics.RetrieveUpdateAPIView):
     serializer_class = WellnessSurveySessionSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_object(self):
-        return WellnessSurveySession.objects.get_or_create(user=self.request.user)[0]
+        # El intento más reciente del usuario (se crea uno si aún no tiene)
+        session = (WellnessSurveySession.objects
+            .filter(user=self.request.user)
+            .order_by('-started_at', '-id')
+            .first())
+        if session is None or (session.is_completed and self.request.method in ('PUT', 'PATCH')):
+            # Un intento completado no se modifica: el avance es de un intento nuevo
+            return WellnessSurveySession.objects.create(user=self.request.user)
+        return session
+
+class WellnessSurveyBenchmarksView(APIView):
+    """Percentil del usuario y media/mediana de la población para cada eje del radar."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        session = WellnessSurveySession.latest_completed(request.user)
+        if session is None:
+            return Response({"attempt": None, "categories": []})
+        return Response({
+            "attempt": session.id,
+            "categories": histograms.benchmarks_for(session)
+        })
+
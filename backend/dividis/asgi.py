@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dividis.settings')
+# Bajo ASGI las vistas de lectura más usadas se sirven con sus versiones async
+os.environ.setdefault('ASYNC_READ_VIEWS', '1')
 
 application = get_asgi_application()
@@ -39,6 +39,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Después de WhiteNoise (se inserta abajo): no mide los archivos estáticos
+    'api.middleware.RequestMetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -138,6 +140,7 @@ CSRF_TRUSTED_ORIGINS = [
     'https://services-dividis.jmtqu4.easypanel.host/',
 ]
 CORS_ALLOW_ALL_ORIGINS = True
+CORS_EXPOSE_HEADERS = ['ETag', 'X-Question-Set', 'Server-Timing']
 
 # API Documentation
 SPECTACULAR_SETTINGS = {
@@ -156,6 +159,50 @@ ACTSTREAM_SETTINGS = {
 # Module Settings
 INITIAL_MODULE = os.getenv('INITIAL_MODULE', 'salud')
 DEFAULT_MISSION_POINTS = int(os.getenv('DEFAULT_MISSION_POINTS', '100'))
+# Cada cuántos segundos un worker revisa si cambió la versión del catálogo en memoria
+DOMAIN_CATALOG_CHECK_SECONDS = int(os.getenv('DOMAIN_CATALOG_CHECK_SECONDS', '5'))
+
+# Métricas: directorio compartido por los workers de gunicorn (vacío = solo en memoria)
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+# Si se define, /metrics exige el header `Authorization: Bearer <token>`
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+# Sin token, /metrics solo responde a estas redes (por defecto, la propia máquina)
+METRICS_ALLOWED_NETWORKS = [
+    network.strip()
+    for network in os.getenv('METRICS_ALLOWED_NETWORKS', '127.0.0.0/8,::1').split(',')
+    if network.strip()
+]
+# Reparto de eventos SSE entre workers: api.utils.events.LocalBackend (un proceso)
+# o api.utils.events.PostgresBackend (LISTEN/NOTIFY). Sin definir se usa
+# PostgresBackend con PostgreSQL y LocalBackend con otras bases.
+EVENTS_BACKEND = os.getenv('EVENTS_BACKEND')
+# Comentario de keep-alive en /api/events/stream/ y espera sugerida al reconectar
+EVENTS_HEARTBEAT_SECONDS = 15
+EVENTS_RETRY_MS = 3000
+# Vigencia del token de /api/events/token/ para abrir el stream con EventSource
+EVENTS_TOKEN_MAX_AGE = 60
+# Efectos secundarios de declaraciones y misiones en la cola de tareas
+# (api/utils/tasks.py). Activarlo requiere `python manage.py run_tasks`
+DEFERRED_TASKS = os.getenv('DEFERRED_TASKS', '0') == '1'
+# Espera antes de ejecutar una tarea: las ráfagas del mismo usuario se fusionan
+TASKS_DELAY_SECONDS = float(os.getenv('TASKS_DELAY_SECONDS', '1'))
+TASKS_MAX_ATTEMPTS = 5
+# Una tarea `running` más vieja que esto se considera de un worker caído
+TASKS_LOCK_SECONDS = 300
+# Con más cambios pendientes /api/sync/changes/ pide recargar todo (reset)
+SYNC_CHANGES_MAX = 1000
+# Tamaño máximo de un lote de /api/declarations/sync/
+DECLARATION_SYNC_MAX_ITEMS = 500
+# Vistas de lectura async (api/async_views.py); dividis/asgi.py las activa por defecto
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', '0') == '1'
+# Consultas independientes de las vistas async en hilos y conexiones propios.
+# Abre una conexión por consulta: activarlo solo con un pooler (PgBouncer)
+ASYNC_PARALLEL_QUERIES = os.getenv('ASYNC_PARALLEL_QUERIES', '0') == '1'
+# Consultas más lentas que esto (ms) se guardan en SlowQuery; 0 desactiva el registro
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '200'))
+# Fracción de las consultas lentas que se repite con EXPLAIN ANALYZE
+SLOW_QUERY_EXPLAIN_RATE = float(os.getenv('SLOW_QUERY_EXPLAIN_RATE', '0.05'))
+SLOW_QUERY_MAX_ROWS = int(os.getenv('SLOW_QUERY_MAX_ROWS', '10000'))
 
 
 LOGGING_CONFIG = None